@@ -5,3 +5,6 @@ class AuthConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'auth'
     label = 'custom_auth'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,124 @@
+"""
+Async-native counterparts of the hot auth endpoints.
+
+These are plain Django async views, so under Daphne they run on the event loop
+instead of occupying one of the sync worker threads. Request and response bodies
+match the DRF views in auth/views.py.
+"""
+import json
+
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from rest_framework import serializers, status
+from rest_framework.exceptions import AuthenticationFailed
+
+from voting.models import Voter, Participation
+from .jwt import VoterJWTAuthentication, voter_refresh_token
+from .serializers import VoterCredentialsSerializer, check_voter_pin
+from .throttling import VOTER_LOGIN_THROTTLES, check_throttles
+
+
+def read_json(request):
+    """Parse a JSON request body; returns (data, error_response)."""
+    if not request.body:
+        return {}, None
+    try:
+        return json.loads(request.body), None
+    except ValueError as exc:
+        return None, JsonResponse({'detail': f'JSON parse error - {exc}'}, status=status.HTTP_400_BAD_REQUEST)
+
+
+async def authenticate_voter(request):
+    """
+    Authenticate the bearer token of an async request.
+    Returns (voter, error_response) with DRF's 401 bodies on failure.
+    """
+    authenticator = VoterJWTAuthentication()
+    try:
+        result = await authenticator.aauthenticate(request)
+    except AuthenticationFailed as exc:
+        detail = exc.detail if isinstance(exc.detail, dict) else {'detail': exc.detail}
+        response = JsonResponse(detail, status=status.HTTP_401_UNAUTHORIZED)
+        response['WWW-Authenticate'] = authenticator.authenticate_header(request)
+        return None, response
+
+    if result is None:
+        response = JsonResponse(
+            {'detail': 'Authentication credentials were not provided.'}, status=status.HTTP_401_UNAUTHORIZED
+        )
+        response['WWW-Authenticate'] = authenticator.authenticate_header(request)
+        return None, response
+
+    voter, _ = result
+    request.user = voter
+    return voter, None
+
+
+@csrf_exempt
+@require_POST
+async def avoter_login(request):
+    """
+    Async voter login with voter_no
+    Returns JWT token and voting status
+    """
+    data, error = read_json(request)
+    if error is not None:
+        return error
+
+    throttled = check_throttles(request, data, VOTER_LOGIN_THROTTLES)
+    if throttled is not None:
+        return throttled
+
+    serializer = VoterCredentialsSerializer(data=data)
+    errors = None
+    if serializer.is_valid():
+        voter_no = serializer.validated_data['voter_no'].strip()
+        pin = serializer.validated_data['pin'].strip()
+        try:
+            voter = await Voter.objects.aget(voter_no=voter_no)
+            check_voter_pin(voter, pin)
+        except Voter.DoesNotExist:
+            errors = {'non_field_errors': ['Invalid voter number.']}
+        except serializers.ValidationError as exc:
+            errors = {'non_field_errors': exc.detail}
+    else:
+        errors = serializer.errors
+
+    if errors is not None:
+        return JsonResponse({
+            'success': False,
+            'message': 'Invalid voter number.',
+            'errors': errors
+        }, status=status.HTTP_401_UNAUTHORIZED)
+
+    # One lookup on (voter, election): has the voter finished the active election?
+    is_complete = await Participation.objects.filter(
+        voter=voter, election__is_active=True
+    ).values_list('is_complete', flat=True).afirst()
+    if is_complete:
+        return JsonResponse({
+            'success': False,
+            'message': 'You have already voted.'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    # Generate JWT token
+    refresh = voter_refresh_token(voter)
+
+    has_voted = is_complete is not None
+
+    return JsonResponse({
+        'success': True,
+        'message': 'Login successful' if not has_voted else 'You have already voted',
+        'data': {
+            'access': str(refresh.access_token),
+            'refresh': str(refresh),
+            'voter': {
+                'id': voter.id,
+                'voter_no': voter.voter_no,
+                'name': voter.full_name,
+                'house': voter.house,
+                'has_voted': has_voted
+            }
+        }
+    }, status=status.HTTP_200_OK)
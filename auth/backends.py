@@ -0,0 +1,35 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.db.models import Case, IntegerField, Q, Value, When
+
+
+UserModel = get_user_model()
+
+
+class EmailViewerBackend(ModelBackend):
+    """
+    Authenticate a dashboard viewer by email (or username) and password.
+
+    The user and their Viewer row come from one joined query, and every attempt
+    costs exactly one password hash: the user's, or a dummy one when there is no
+    such user, so response times don't reveal which emails exist. The Viewer row
+    is cached on the user (user.viewer) for the caller to check.
+    """
+
+    def authenticate(self, request, email=None, password=None, **kwargs):
+        if email is None or password is None:
+            return None
+
+        user = (
+            UserModel._default_manager.select_related('viewer')
+            .filter(Q(username=email) | Q(email=email))
+            # A username match wins, like the username login this replaces
+            .order_by(Case(When(username=email, then=Value(0)), default=Value(1), output_field=IntegerField()), 'pk')
+            .first()
+        )
+        if user is None:
+            UserModel().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
@@ -1,20 +1,83 @@
+from django.db import DEFAULT_DB_ALIAS
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.tokens import RefreshToken
 from voting.models import Voter
 
+from .voter_cache import get_voter_cache
+
+
+# Token claim -> Voter field carried by voter tokens
+VOTER_CLAIMS = {'voter_id': 'id', 'voter_no': 'voter_no', 'name': 'full_name', 'house': 'house'}
+
+
+def voter_refresh_token(voter):
+    """A refresh token (and, through it, an access token) carrying the voter's claims."""
+    refresh = RefreshToken()
+    for claim, field in VOTER_CLAIMS.items():
+        refresh[claim] = getattr(voter, field)
+    return refresh
+
+
+def voter_from_claims(validated_token):
+    """
+    The token's voter, built from its claims without a query, or None if a claim
+    is missing (tokens issued before the house claim existed). Fields not in the
+    token, like pin, are loaded from the database on first access.
+    """
+    if any(claim not in validated_token for claim in VOTER_CLAIMS):
+        return None
+    return Voter.from_db(
+        DEFAULT_DB_ALIAS, list(VOTER_CLAIMS.values()), [validated_token[claim] for claim in VOTER_CLAIMS]
+    )
+
 
 class VoterJWTAuthentication(JWTAuthentication):
     """
-    Custom JWT authentication for Voter model
+    Custom JWT authentication for Voter model.
+
+    The voter is rebuilt from the token's claims, so authenticating costs no query;
+    a voter's name or house edited after login takes effect at the next login.
+    Older tokens without every claim go through the voter LRU (auth/voter_cache.py).
     """
     def get_user(self, validated_token):
+        voter_id = validated_token.get('voter_id')
+        if voter_id is None:
+            raise InvalidToken('Token contained no recognizable voter identification')
+
+        voter = voter_from_claims(validated_token)
+        if voter is not None:
+            return voter
         try:
-            voter_id = validated_token.get('voter_id')
-            if voter_id is None:
-                raise InvalidToken('Token contained no recognizable voter identification')
-            
-            voter = Voter.objects.get(id=voter_id)
+            return get_voter_cache().load(voter_id)
+        except Voter.DoesNotExist:
+            raise InvalidToken('Voter not found')
+
+    async def aauthenticate(self, request):
+        """
+        Async counterpart of authenticate() for plain Django async views.
+        Token validation is CPU only; the voter is loaded with the async ORM.
+        """
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        voter_id = validated_token.get('voter_id')
+        if voter_id is None:
+            raise InvalidToken('Token contained no recognizable voter identification')
+
+        voter = voter_from_claims(validated_token)
+        if voter is not None:
             return voter
-            
+        try:
+            return await get_voter_cache().aload(voter_id)
         except Voter.DoesNotExist:
             raise InvalidToken('Voter not found')
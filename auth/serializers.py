@@ -1,29 +1,36 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
-from django.contrib.auth.hashers import check_password
 
 from voting.models import Voter
+from voting.pins import has_pin, pin_matches
 from .models import Viewer
 
-class VoterLoginSerializer(serializers.Serializer):
+def check_voter_pin(voter, pin):
+    """Raise a ValidationError unless `pin` is the voter's PIN."""
+    if not has_pin(voter):
+        raise serializers.ValidationError("A PIN has not been generated for this voter. Please contact the administrator.")
+
+    if not pin_matches(voter, pin):
+        raise serializers.ValidationError("Invalid PIN.")
+
+
+class VoterCredentialsSerializer(serializers.Serializer):
+    """Field validation of the voter login body, without touching the database."""
     voter_no = serializers.CharField(max_length=50)
     pin = serializers.CharField(max_length=6)
 
+
+class VoterLoginSerializer(VoterCredentialsSerializer):
     def validate(self, data):
         voter_no = data.get('voter_no', '').strip()
         pin = data.get('pin', '').strip()
 
         try:
-            from voting.models import Voter
             voter = Voter.objects.get(voter_no=voter_no)
         except Voter.DoesNotExist:
             raise serializers.ValidationError("Invalid voter number.")
 
-        if not voter.pin:
-            raise serializers.ValidationError("A PIN has not been generated for this voter. Please contact the administrator.")
-
-        if voter.pin != pin:
-            raise serializers.ValidationError("Invalid PIN.")
+        check_voter_pin(voter, pin)
 
         data['voter'] = voter
         return data
@@ -38,26 +45,14 @@ class ViewerLoginSerializer(serializers.Serializer):
         password = data.get('password')
         
         if email and password:
-            # Authenticate user with email
-            user = authenticate(username=email, password=password)
-            
-            if not user:
-                # Try authenticating with email field if username doesn't work
-                from django.contrib.auth import get_user_model
-                User = get_user_model()
-                try:
-                    user_obj = User.objects.get(email=email)
-                    user = authenticate(username=user_obj.username, password=password)
-                except User.DoesNotExist:
-                    pass
+            # One joined query and one password hash, see auth.backends.EmailViewerBackend.
+            # Inactive users are refused there like a wrong password, revealing nothing.
+            user = authenticate(self.context.get('request'), email=email, password=password)
             
             if user:
-                if not user.is_active:
-                    raise serializers.ValidationError("User account is disabled.")
-                
                 # Check if user is a viewer
                 try:
-                    viewer = Viewer.objects.get(user=user)
+                    viewer = user.viewer
                     data['user'] = user
                     data['viewer'] = viewer
                 except Viewer.DoesNotExist:
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from voting.models import Voter
+from .voter_cache import get_voter_cache
+
+
+@receiver(post_save, sender=Voter)
+@receiver(post_delete, sender=Voter)
+def voter_changed(sender, instance, **kwargs):
+    get_voter_cache().discard(instance.pk)
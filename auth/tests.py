@@ -1,3 +1,317 @@
-from django.test import TestCase
+import io
+import os
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+import openpyxl
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import MD5PasswordHasher
+from django.core.exceptions import ImproperlyConfigured
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from candidates.models import Candidate
+from posts.models import Election, EligibleHouse, Post
+from voting.models import Voter
+from voting.pins import HASHER_DJANGO, assign_new_pins, hmac_pin_digest, make_pin_digest, pin_matches
+from .models import Viewer
+from .throttling import SlidingWindowCounter, parse_rate, reset_login_throttles
+from .voter_cache import get_voter_cache
+
+
+User = get_user_model()
+VOTER_TABLE = f'"{Voter._meta.db_table}"'
+
+
+class VoterPrincipalTests(TestCase):
+    """Voter requests authenticate from the token's claims without loading the voter."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.election = Election.objects.create(title='Principal election', is_active=True)
+        cls.head = Post.objects.create(election=cls.election, title='Head', required_selections=1)
+        cls.captain = Post.objects.create(election=cls.election, title='Captain', required_selections=1)
+        EligibleHouse.objects.create(post=cls.captain, house='KAKUNGULU')
+        cls.candidate = Candidate.objects.create(name='Head 1', post=cls.head)
+        cls.voter = Voter.objects.create(voter_no='P1', full_name='Principal Voter', house='AFRICA', pin='123456')
+
+    def setUp(self):
+        cache.clear()
+        reset_login_throttles()
+        get_voter_cache().clear()
+        self.client = APIClient()
+        response = self.client.post(
+            '/api/auth/voter/login/', {'voter_no': 'P1', 'pin': '123456'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {response.json()["data"]["access"]}')
+
+    def assertNoVoterQueries(self, request, expected_status):
+        with CaptureQueriesContext(connection) as context:
+            response = request()
+        self.assertEqual(response.status_code, expected_status, response.content)
+        voter_queries = [query['sql'] for query in context.captured_queries if f'FROM {VOTER_TABLE}' in query['sql']]
+        self.assertEqual(voter_queries, [])
+        return response
+
+    def test_voter_status(self):
+        response = self.assertNoVoterQueries(lambda: self.client.get('/api/voter/status/'), 200)
+        self.assertEqual(response.json()['data']['voter']['house'], 'AFRICA')
+
+    def test_async_voter_status(self):
+        self.assertNoVoterQueries(lambda: self.client.get('/api/async/voter/status/'), 200)
+
+    def test_cast_bulk_votes(self):
+        self.assertNoVoterQueries(lambda: self.client.post(
+            '/api/vote/cast/', {'votes': [{'post': self.head.id, 'candidate': self.candidate.id}]}, format='json'
+        ), 201)
+
+    def test_positions_filtered_by_house(self):
+        response = self.assertNoVoterQueries(lambda: self.client.get('/api/positions/'), 200)
+        self.assertEqual([post['id'] for post in response.json()['results']], [self.head.id])
+
+    def test_token_without_house_claim_uses_voter_cache(self):
+        refresh = RefreshToken()
+        refresh['voter_id'] = self.voter.id
+        refresh['voter_no'] = self.voter.voter_no
+        refresh['name'] = self.voter.full_name
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+
+        self.assertEqual(self.client.get('/api/voter/status/').status_code, 200)
+        self.assertNoVoterQueries(lambda: self.client.get('/api/voter/status/'), 200)
+
+        self.voter.delete()
+        self.assertEqual(self.client.get('/api/voter/status/').status_code, 401)
+
+
+class VoterPinTests(TestCase):
+    """Login accepts the PIN in every stored form and nothing else."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Election.objects.create(title='PIN election', is_active=True)
+        cls.voter = Voter.objects.create(voter_no='PIN1', full_name='Pin Voter', house='AFRICA')
+
+    def setUp(self):
+        reset_login_throttles()
+
+    def login(self, pin):
+        return self.client.post(
+            '/api/auth/voter/login/', {'voter_no': 'PIN1', 'pin': pin}, content_type='application/json'
+        ).status_code
+
+    def store(self, pin=None, pin_digest=''):
+        Voter.objects.filter(pk=self.voter.pk).update(pin=pin, pin_digest=pin_digest)
+
+    def test_hmac_digest(self):
+        self.store(pin_digest=hmac_pin_digest(self.voter.id, '246810'))
+        self.assertEqual(self.login('246810'), 200)
+        self.assertEqual(self.login('246811'), 401)
+        # The digest is bound to the voter
+        self.store(pin_digest=hmac_pin_digest(self.voter.id + 1, '246810'))
+        self.assertEqual(self.login('246810'), 401)
+
+    def test_password_hasher_digest(self):
+        self.store(pin_digest=make_pin_digest(self.voter.id, '246810', hasher=HASHER_DJANGO))
+        self.assertEqual(self.login('246810'), 200)
+        self.assertEqual(self.login('246811'), 401)
+
+    def test_plaintext_pin_before_digest(self):
+        self.store(pin='246810')
+        self.assertEqual(self.login('246810'), 200)
+        self.assertEqual(self.login('246811'), 401)
+
+    def test_digest_wins_over_plaintext(self):
+        self.store(pin='111111', pin_digest=hmac_pin_digest(self.voter.id, '246810'))
+        self.assertEqual(self.login('111111'), 401)
+        self.assertEqual(self.login('246810'), 200)
+
+    def test_assign_new_pins(self):
+        pins = assign_new_pins([self.voter])
+        self.voter.refresh_from_db()
+        self.assertIsNone(self.voter.pin)
+        self.assertEqual(self.login(pins[self.voter.id]), 200)
+
+        # Legacy PIN sheets can opt in to keeping the plaintext
+        with self.settings(VOTER_PIN_STORE_PLAINTEXT=True):
+            pins = assign_new_pins([self.voter])
+        self.voter.refresh_from_db()
+        self.assertEqual(self.voter.pin, pins[self.voter.id])
+
+    def test_generate_pins_exports_new_pins(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'pins.xlsx')
+            call_command('generate_pins', '--output', output, stdout=io.StringIO())
+            sheet = openpyxl.load_workbook(output).active
+            rows = list(sheet.iter_rows(min_row=4, values_only=True))
+        self.voter.refresh_from_db()
+        self.assertIsNone(self.voter.pin)
+        self.assertEqual([row[0] for row in rows], ['PIN1'])
+        self.assertEqual(self.login(str(rows[0][3])), 200)
+
+
+class SlidingWindowCounterTests(TestCase):
+    def test_window_slides(self):
+        counter = SlidingWindowCounter(limit=3, window=60)
+        for second in (0, 1, 2):
+            self.assertEqual(counter.hit('key', now=second), (True, 0))
+        allowed, wait = counter.hit('key', now=3)
+        self.assertFalse(allowed)
+        self.assertEqual(wait, 57)
+        self.assertTrue(counter.hit('other', now=3)[0])
+
+        # Halfway through the next window half of the 3 earlier attempts still count
+        self.assertTrue(counter.hit('key', now=90)[0])
+        self.assertTrue(counter.hit('key', now=90)[0])
+        self.assertFalse(counter.hit('key', now=90)[0])
+        # A window later they have all expired
+        self.assertTrue(counter.hit('key', now=180)[0])
+
+    def test_bounded_keys(self):
+        counter = SlidingWindowCounter(limit=1, window=60, max_keys=2)
+        for key in ('a', 'b', 'c'):
+            counter.hit(key, now=0)
+        # 'a' was evicted, so it starts over
+        self.assertTrue(counter.hit('a', now=1)[0])
+        self.assertFalse(counter.hit('c', now=1)[0])
+
+
+# Hourly windows, so no test runs across a window boundary where older attempts start to expire
+LOGIN_THROTTLE = {'ENABLED': True, 'ADDRESS_RATE': '50/hour', 'VOTER_NO_RATE': '5/hour', 'VIEWER_EMAIL_RATE': '5/hour'}
+
+
+@override_settings(LOGIN_THROTTLE=LOGIN_THROTTLE)
+class LoginThrottleTests(TestCase):
+    """Throttled login attempts are refused from memory, before any query or PIN check."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Election.objects.create(title='Throttle election', is_active=True)
+        cls.voters = [
+            Voter.objects.create(voter_no=f'T{i}', full_name=f'Voter {i}', house='AFRICA', pin='123456')
+            for i in range(40)
+        ]
+
+    def setUp(self):
+        reset_login_throttles()
+
+    def login(self, voter_no, pin, address, path='/api/auth/voter/login/', client=None):
+        return (client or self.client).post(
+            path, {'voter_no': voter_no, 'pin': pin}, content_type='application/json', REMOTE_ADDR=address
+        )
+
+    def test_voter_number_limit(self):
+        for path in ('/api/auth/voter/login/', '/api/async/auth/voter/login/'):
+            reset_login_throttles()
+            for attempt in range(5):
+                self.assertEqual(self.login('T0', f'00000{attempt}', f'10.0.1.{attempt}', path).status_code, 401)
+
+            # A sixth guess is refused before the body is validated or the database is read
+            with CaptureQueriesContext(connection) as context:
+                response = self.login('t0 ', '123456', '10.0.1.9', path)
+            self.assertEqual(response.status_code, 429, response.content)
+            self.assertIn('Retry-After', response)
+            self.assertEqual(context.captured_queries, [])
+
+            self.assertEqual(self.login('T1', '123456', '10.0.1.0', path).status_code, 200)
+
+    def test_address_limit(self):
+        for i in range(50):
+            self.login(f'GUESS{i}', '000000', '10.0.2.1')
+        self.assertEqual(self.login('T0', '123456', '10.0.2.1').status_code, 429)
+        self.assertEqual(self.login('T0', '123456', '10.0.2.2').status_code, 200)
+
+    def test_viewer_email_limit(self):
+        for _ in range(5):
+            self.client.post('/api/auth/viewer/login/', {'email': 'x@example.com', 'password': 'wrong'},
+                             content_type='application/json', REMOTE_ADDR='10.0.3.1')
+        response = self.client.post('/api/auth/viewer/login/', {'email': 'X@example.com', 'password': 'wrong'},
+                                    content_type='application/json', REMOTE_ADDR='10.0.3.2')
+        self.assertEqual(response.status_code, 429)
+
+    def test_logins_under_flood(self):
+        # The attacker exhausts its address and the victim's voter number...
+        for i in range(50):
+            self.login('T0', f'{i:06d}', '10.0.4.66')
+
+        # ...and keeps guessing while real voters log in; every guess is refused
+        # without a query or a PIN check, so it costs the real voters nothing
+        with mock.patch('auth.serializers.pin_matches', wraps=pin_matches) as pin_checks:
+            for voter in self.voters[1:]:
+                with CaptureQueriesContext(connection) as context:
+                    for voter_no in ('T0', 'NOBODY', voter.voter_no):
+                        for path in ('/api/auth/voter/login/', '/api/async/auth/voter/login/'):
+                            self.assertEqual(self.login(voter_no, '000000', '10.0.4.66', path).status_code, 429)
+                self.assertEqual(context.captured_queries, [])
+                self.assertEqual(self.login(voter.voter_no, '123456', '10.0.4.2').status_code, 200)
+        self.assertEqual(pin_checks.call_count, len(self.voters) - 1)
+
+    def test_invalid_rate(self):
+        for rate in ('0/min', '-1/min', 'ten/min', '10/fortnight', '10', None):
+            with self.subTest(rate=rate), self.assertRaises(ImproperlyConfigured):
+                parse_rate(rate)
+        self.assertEqual(parse_rate('10/min'), (10, 60))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ViewerLoginTests(TestCase):
+    """Every viewer login attempt costs one joined query and one password hash."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('dashboard', 'viewer@example.com', 's3cret-pass')
+        Viewer.objects.create(user=cls.user)
+        User.objects.create_user('plain', 'plain@example.com', 's3cret-pass')
+
+    def setUp(self):
+        reset_login_throttles()
+
+    def login(self, email, password):
+        hashes = []
+        original = MD5PasswordHasher.encode
+
+        def encode(hasher, *args, **kwargs):
+            hashes.append(args)
+            return original(hasher, *args, **kwargs)
+
+        with mock.patch.object(MD5PasswordHasher, 'encode', encode), \
+                CaptureQueriesContext(connection) as context:
+            response = self.client.post(
+                '/api/auth/viewer/login/', {'email': email, 'password': password}, content_type='application/json'
+            )
+        return response, len(context.captured_queries), len(hashes)
+
+    def test_login(self):
+        response, queries, hashes = self.login('viewer@example.com', 's3cret-pass')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['data']['viewer']['username'], 'dashboard')
+        self.assertEqual((queries, hashes), (1, 1))
+
+    def test_wrong_password(self):
+        response, queries, hashes = self.login('viewer@example.com', 'wrong')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual((queries, hashes), (1, 1))
+
+    def test_unknown_email(self):
+        response, queries, hashes = self.login('nobody@example.com', 's3cret-pass')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual((queries, hashes), (1, 1))
+
+    def test_inactive_viewer(self):
+        User.objects.filter(username='dashboard').update(is_active=False)
+        response, queries, hashes = self.login('viewer@example.com', 's3cret-pass')
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('Invalid email or password', str(response.json()['errors']))
+        self.assertEqual((queries, hashes), (1, 1))
+
+    def test_user_without_viewer(self):
+        response, _, hashes = self.login('plain@example.com', 's3cret-pass')
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('not authorized as a viewer', str(response.json()['errors']))
+        self.assertEqual(hashes, 1)
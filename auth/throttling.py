@@ -0,0 +1,190 @@
+"""
+Sliding-window throttles for the login endpoints.
+
+Each limited key (a client address, a voter number, a viewer email) costs one
+small list in process memory: the attempts counted in the current and the
+previous fixed window. An attempt is refused while previous * (unexpired share
+of the previous window) + current reaches the limit, which approximates a true
+sliding window without keeping a timestamp per attempt. Refused attempts are
+answered from memory before the body is validated or the database is touched.
+
+The counters are per process, so with N worker processes a client may get up
+to N times the configured rate. Rates are set in LOGIN_THROTTLE.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.http import JsonResponse
+from rest_framework import status
+from rest_framework.throttling import BaseThrottle
+
+
+class SlidingWindowCounter:
+    """Approximate sliding-window attempt counter over at most max_keys keys (least recently used evicted)."""
+
+    def __init__(self, limit, window, max_keys=100000):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        # key -> [window number, attempts in that window, attempts in the window before]
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key, now=None):
+        """Count an attempt for key if it is allowed; returns (allowed, seconds to wait)."""
+        now = time.time() if now is None else now
+        slot, elapsed = divmod(now, self.window)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < slot - 1:
+                entry = [slot, 0, 0]
+            elif entry[0] == slot - 1:
+                entry = [slot, 0, entry[1]]
+
+            weight = 1 - elapsed / self.window
+            if entry[2] * weight + entry[1] >= self.limit:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                return False, self._wait(entry, elapsed)
+
+            entry[1] += 1
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_keys:
+                self._entries.popitem(last=False)
+        return True, 0
+
+    def _wait(self, entry, elapsed):
+        _, current, previous = entry
+        if current >= self.limit:
+            # Into the next window, until enough of this window's attempts have expired
+            return math.ceil(self.window - elapsed + self.window * (1 - self.limit / current))
+        # Until enough of the previous window's attempts have expired
+        return max(1, math.ceil(self.window * (1 - (self.limit - current) / previous) - elapsed))
+
+
+def parse_rate(rate):
+    """'10/min' -> (10, 60), in the format of DRF's throttle rates; the count must be positive."""
+    try:
+        count, period = rate.split('/')
+        limit, window = int(count), {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[period[0]]
+    except (AttributeError, ValueError, KeyError, IndexError):
+        limit = window = None
+    if not limit or limit < 0:
+        raise ImproperlyConfigured(
+            f'Invalid login throttle rate {rate!r}; expected "<attempts>/<s|min|hour|day>" with at least one attempt. '
+            f'Set LOGIN_THROTTLE["ENABLED"] to False to turn throttling off.'
+        )
+    return limit, window
+
+
+_counters = {}
+_counters_lock = threading.Lock()
+
+
+def _options():
+    return getattr(settings, 'LOGIN_THROTTLE', {})
+
+
+def get_counter(scope):
+    """The process-wide counter of a LOGIN_THROTTLE rate, e.g. 'VOTER_NO_RATE'."""
+    options = _options()
+    limit, window = parse_rate(options[scope])
+    key = (scope, limit, window, options.get('MAX_KEYS', 100000))
+    counter = _counters.get(key)
+    if counter is None:
+        with _counters_lock:
+            counter = _counters.setdefault(key, SlidingWindowCounter(limit, window, key[3]))
+    return counter
+
+
+def reset_login_throttles():
+    with _counters_lock:
+        _counters.clear()
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """A DRF throttle backed by the SlidingWindowCounter of its LOGIN_THROTTLE rate."""
+    rate_setting = None
+
+    def __init__(self):
+        self.retry_after = None
+
+    def get_key(self, request):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        if not _options().get('ENABLED', True):
+            return True
+        key = self.get_key(request)
+        if not key:
+            return True
+        allowed, self.retry_after = get_counter(self.rate_setting).hit(f'{self.rate_setting}:{key}')
+        return allowed
+
+    def wait(self):
+        return self.retry_after
+
+
+class LoginAddressThrottle(SlidingWindowThrottle):
+    """Login attempts per client address (X-Forwarded-For is trusted as far as NUM_PROXIES allows)."""
+    rate_setting = 'ADDRESS_RATE'
+
+    def get_key(self, request):
+        return self.get_ident(request)
+
+
+class VoterNumberThrottle(SlidingWindowThrottle):
+    """Login attempts per voter number, whichever address they come from."""
+    rate_setting = 'VOTER_NO_RATE'
+
+    def get_key(self, request):
+        voter_no = request.data.get('voter_no') if hasattr(request.data, 'get') else None
+        return str(voter_no).strip().lower() if voter_no else None
+
+
+class ViewerEmailThrottle(SlidingWindowThrottle):
+    """Login attempts per viewer email, whichever address they come from."""
+    rate_setting = 'VIEWER_EMAIL_RATE'
+
+    def get_key(self, request):
+        email = request.data.get('email') if hasattr(request.data, 'get') else None
+        return str(email).strip().lower() if email else None
+
+
+class _ParsedBody:
+    """Lets DRF throttles read an async view's already parsed JSON body as request.data."""
+
+    def __init__(self, request, data):
+        self.META = request.META
+        self.data = data
+
+
+def check_throttles(request, data, throttles):
+    """
+    Apply throttle classes to a plain Django (async) view's request and its parsed
+    body. Returns None, or the 429 response DRF would have sent.
+    """
+    wrapped = _ParsedBody(request, data)
+    waits = []
+    for throttle in (throttle_class() for throttle_class in throttles):
+        if not throttle.allow_request(wrapped, None):
+            waits.append(throttle.wait())
+    if not waits:
+        return None
+
+    wait = max(waits)
+    response = JsonResponse(
+        {'detail': f'Request was throttled. Expected available in {wait} second{"" if wait == 1 else "s"}.'},
+        status=status.HTTP_429_TOO_MANY_REQUESTS,
+    )
+    response['Retry-After'] = str(wait)
+    return response
+
+
+VOTER_LOGIN_THROTTLES = [LoginAddressThrottle, VoterNumberThrottle]
+VIEWER_LOGIN_THROTTLES = [LoginAddressThrottle, ViewerEmailThrottle]
@@ -1,15 +1,18 @@
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 from rest_framework_simplejwt.tokens import RefreshToken
 
-from voting.models import Voter, Vote
+from voting.models import Voter, Participation
+from .jwt import voter_refresh_token
+from .throttling import VIEWER_LOGIN_THROTTLES, VOTER_LOGIN_THROTTLES
 from .serializers import VoterLoginSerializer,ViewerLoginSerializer
 
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes(VOTER_LOGIN_THROTTLES)
 def voter_login(request):
     """
     Voter login with voter_no
@@ -20,38 +23,20 @@ def voter_login(request):
     if serializer.is_valid():
         voter = serializer.validated_data['voter']
         
-        # Check if voter has already voted for all eligible positions
-        from posts.models import Post, Election
-        from django.db.models import Count
-
-        active_election = Election.objects.filter(is_active=True).first()
-        if active_election:
-            posts = Post.objects.filter(election=active_election).prefetch_related('eligible_houses')
-            eligible_posts = [post for post in posts if post.is_voter_eligible(voter)]
-            if eligible_posts:
-                votes_by_post = {
-                    item['post']: item['vote_count']
-                    for item in Vote.objects.filter(voter=voter, post__in=eligible_posts)
-                                           .values('post')
-                                           .annotate(vote_count=Count('id'))
-                }
-                has_voted_all = all(
-                    votes_by_post.get(post.id, 0) >= (post.required_selections or 1)
-                    for post in eligible_posts
-                )
-                if has_voted_all:
-                    return Response({
-                        'success': False,
-                        'message': 'You have already voted.'
-                    }, status=status.HTTP_400_BAD_REQUEST)
+        # One lookup on (voter, election): has the voter finished the active election?
+        is_complete = Participation.objects.filter(
+            voter=voter, election__is_active=True
+        ).values_list('is_complete', flat=True).first()
+        if is_complete:
+            return Response({
+                'success': False,
+                'message': 'You have already voted.'
+            }, status=status.HTTP_400_BAD_REQUEST)
         
         # Generate JWT token
-        refresh = RefreshToken()
-        refresh['voter_id'] = voter.id
-        refresh['voter_no'] = voter.voter_no
-        refresh['name'] = voter.full_name
+        refresh = voter_refresh_token(voter)
         
-        has_voted = Vote.objects.filter(voter=voter).exists()
+        has_voted = is_complete is not None
         
         return Response({
             'success': True,
@@ -79,12 +64,13 @@ def voter_login(request):
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes(VIEWER_LOGIN_THROTTLES)
 def viewer_login(request):
     """
     Viewer login with email and password
     Returns JWT token for viewing results
     """
-    serializer = ViewerLoginSerializer(data=request.data)
+    serializer = ViewerLoginSerializer(data=request.data, context={'request': request})
     
     if serializer.is_valid():
         user = serializer.validated_data['user']
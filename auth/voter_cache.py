@@ -0,0 +1,86 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from voting.models import Voter
+
+
+class VoterCache:
+    """
+    Bounded least-recently-used cache of full Voter rows, keyed by id.
+
+    Saving or deleting a voter drops its entry in this process (see auth/signals.py);
+    the timeout bounds how long other processes may serve the old row.
+    max_entries = 0 disables the cache.
+    """
+
+    def __init__(self, max_entries=1024, timeout=60):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        options = getattr(settings, 'VOTER_CACHE', {})
+        return cls(max_entries=options.get('MAX_ENTRIES', 1024), timeout=options.get('TIMEOUT', 60))
+
+    def get(self, voter_id):
+        """The cached voter, or None if it is missing or expired."""
+        with self._lock:
+            entry = self._entries.get(voter_id)
+            if entry is None:
+                return None
+            voter, expires = entry
+            if expires < time.monotonic():
+                del self._entries[voter_id]
+                return None
+            self._entries.move_to_end(voter_id)
+            return voter
+
+    def put(self, voter):
+        if not self.max_entries:
+            return
+        with self._lock:
+            self._entries[voter.id] = (voter, time.monotonic() + self.timeout)
+            self._entries.move_to_end(voter.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, voter_id):
+        with self._lock:
+            self._entries.pop(voter_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def load(self, voter_id):
+        """The voter with this id from the cache or the database; raises Voter.DoesNotExist."""
+        voter = self.get(voter_id)
+        if voter is None:
+            voter = Voter.objects.get(id=voter_id)
+            self.put(voter)
+        return voter
+
+    async def aload(self, voter_id):
+        voter = self.get(voter_id)
+        if voter is None:
+            voter = await Voter.objects.aget(id=voter_id)
+            self.put(voter)
+        return voter
+
+
+_voter_cache = None
+_voter_cache_lock = threading.Lock()
+
+
+def get_voter_cache():
+    global _voter_cache
+    if _voter_cache is None:
+        with _voter_cache_lock:
+            if _voter_cache is None:
+                _voter_cache = VoterCache.from_settings()
+    return _voter_cache
@@ -0,0 +1,100 @@
+"""
+Database profiles, selected with DJANGO_DB_PROFILE:
+
+- sqlite (default): a plain SQLite file, as in development.
+- sqlite-tuned: SQLite for a single-host deployment. The connection_created hook
+  below switches on WAL, relaxes fsyncs to synchronous=NORMAL, waits for locks
+  instead of failing and memory-maps the file. SQLite still has one writer at a
+  time; pair it with VOTE_INGEST group mode under heavy casting.
+- postgres: PostgreSQL through psycopg 3 (pip install -r requirements-postgres.txt),
+  with a connection pool by default. Set DJANGO_DB_POOL=0 for persistent
+  per-thread connections instead; Django does not allow both at once.
+
+The SQLite test database is in memory unless DJANGO_TEST_DB_NAME names a file;
+the concurrency tests in voting/tests.py need one on disk.
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+PROFILE_SQLITE = 'sqlite'
+PROFILE_SQLITE_TUNED = 'sqlite-tuned'
+PROFILE_POSTGRES = 'postgres'
+PROFILES = (PROFILE_SQLITE, PROFILE_SQLITE_TUNED, PROFILE_POSTGRES)
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -20000,
+    'temp_store': 'MEMORY',
+}
+
+
+def _env_int(name, default):
+    return int(os.getenv(name, default))
+
+
+def _sqlite_test_settings():
+    name = os.getenv("DJANGO_TEST_DB_NAME")
+    return {'NAME': name} if name else {}
+
+
+def database_settings(profile, base_dir):
+    """The DATABASES['default'] entry of a profile."""
+    if profile == PROFILE_SQLITE:
+        return {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv("DJANGO_DB_NAME", base_dir / 'db.sqlite3'),
+            'TEST': _sqlite_test_settings(),
+        }
+
+    if profile == PROFILE_SQLITE_TUNED:
+        return {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv("DJANGO_DB_NAME", base_dir / 'db.sqlite3'),
+            'OPTIONS': {
+                'timeout': SQLITE_PRAGMAS['busy_timeout'] / 1000,
+            },
+            # Applied to every new connection by apply_sqlite_pragmas()
+            'PRAGMAS': SQLITE_PRAGMAS,
+            'TEST': _sqlite_test_settings(),
+        }
+
+    if profile == PROFILE_POSTGRES:
+        settings = {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv("DJANGO_DB_NAME", 'evoting'),
+            'USER': os.getenv("DJANGO_DB_USER", 'evoting'),
+            'PASSWORD': os.getenv("DJANGO_DB_PASSWORD", ''),
+            'HOST': os.getenv("DJANGO_DB_HOST", 'localhost'),
+            'PORT': os.getenv("DJANGO_DB_PORT", '5432'),
+            'OPTIONS': {},
+        }
+        if os.getenv("DJANGO_DB_POOL", "1") == "1":
+            settings['OPTIONS']['pool'] = {
+                'min_size': _env_int("DJANGO_DB_POOL_MIN", 2),
+                'max_size': _env_int("DJANGO_DB_POOL_MAX", 20),
+                'timeout': _env_int("DJANGO_DB_POOL_TIMEOUT", 10),
+            }
+        else:
+            settings['CONN_MAX_AGE'] = _env_int("DJANGO_DB_CONN_MAX_AGE", 600)
+            settings['CONN_HEALTH_CHECKS'] = True
+        return settings
+
+    raise ImproperlyConfigured(f'Unknown database profile "{profile}"; expected one of {", ".join(PROFILES)}')
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """Apply the PRAGMAS of a SQLite database's settings to each new connection."""
+    pragmas = connection.settings_dict.get('PRAGMAS')
+    if connection.vendor != 'sqlite' or not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
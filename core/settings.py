@@ -3,6 +3,7 @@ from datetime import timedelta
 from pathlib import Path
 from dotenv import load_dotenv
 
+from core.databases import database_settings
 
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -16,8 +17,14 @@ load_dotenv(BASE_DIR / ".env")
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = os.getenv("DJANGO_SECRET_KEY")
 
+# DJANGO_DB_PROFILE picks the database: 'sqlite' (default), 'sqlite-tuned' (WAL and
+# tuned pragmas) or 'postgres' (pooled); see core/databases.py for their variables.
+DATABASE_PROFILE = os.getenv("DJANGO_DB_PROFILE", "sqlite")
+
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# With DEBUG on, Django also keeps every query in connection.queries. It is off
+# unless DJANGO_DEBUG=1; development opts in (e.g. in .env).
+DEBUG = os.getenv("DJANGO_DEBUG", "0").lower() in ("1", "true", "yes")
 
 ALLOWED_HOSTS = ["*"]
 
@@ -77,12 +84,99 @@ ASGI_APPLICATION = 'core.asgi.application'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
 DATABASES = {
+    'default': database_settings(DATABASE_PROFILE, BASE_DIR),
+}
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
 
+# Set DJANGO_RESULTS_CACHE_DIR to share rendered results between the worker processes of one host
+RESULTS_CACHE_DIR = os.getenv("DJANGO_RESULTS_CACHE_DIR")
+if RESULTS_CACHE_DIR:
+    CACHES['results'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': RESULTS_CACHE_DIR,
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': 500},
+    }
+
+RESULTS_CACHE = {
+    'MAX_ENTRIES': 64,
+    'MAX_BYTES': 8 * 1024 * 1024,
+    'SHARED_ALIAS': 'results',
+    'SHARED_TIMEOUT': 300,
+}
+
+# Candidate photo URLs in live results snapshots are made absolute against this base
+# (e.g. https://vote.example.org/); when unset they are site-relative
+RESULTS_STREAM_BASE_URL = os.getenv("DJANGO_RESULTS_STREAM_BASE_URL", "")
+
+# Compiled ballot schemas live in the default cache and are dropped when positions,
+# candidates or eligibility change; the timeout bounds staleness in other processes
+# when the default cache is not shared between them.
+BALLOT_SCHEMA_TIMEOUT = 300
+
+# Voters are rebuilt from their token's claims without a query; only tokens missing
+# a claim load the row, through a per-process LRU of this many voters whose entries
+# expire after TIMEOUT seconds. MAX_ENTRIES = 0 disables it.
+VOTER_CACHE = {
+    'MAX_ENTRIES': 1024,
+    'TIMEOUT': 60,
+}
+
+# Login attempts allowed per client address, voter number and viewer email, counted
+# in sliding windows in each process's memory (auth/throttling.py). Voters often
+# share one school network address, so the address rate is generous.
+LOGIN_THROTTLE = {
+    'ENABLED': os.getenv("DJANGO_LOGIN_THROTTLE", "1") == "1",
+    'ADDRESS_RATE': os.getenv("DJANGO_LOGIN_THROTTLE_ADDRESS_RATE", "600/min"),
+    'VOTER_NO_RATE': '10/min',
+    'VIEWER_EMAIL_RATE': '10/min',
+    'MAX_KEYS': 100000,
+}
+
+# Voter PINs are checked against Voter.pin_digest: an HMAC-SHA256 under VOTER_PIN_KEY
+# ('hmac') or, at much higher CPU cost per login, Django's password hasher ('django').
+# New PINs are only exported when generated; DJANGO_VOTER_PIN_STORE_PLAINTEXT=1 also
+# keeps them in plaintext for re-exporting legacy PIN sheets, and
+# `manage.py hash_pins --clear-plaintext` removes stored ones. See voting/pins.py.
+VOTER_PIN_KEY = os.getenv("DJANGO_VOTER_PIN_KEY", SECRET_KEY)
+VOTER_PIN_HASHER = os.getenv("DJANGO_VOTER_PIN_HASHER", "hmac")
+VOTER_PIN_STORE_PLAINTEXT = os.getenv("DJANGO_VOTER_PIN_STORE_PLAINTEXT", "0") == "1"
+
+# How accepted ballots are stored: 'rows' (one Vote row per selection) or 'ballots'
+# (one compact Ballot row per voter and election). Switch an existing election with
+# `manage.py convert_vote_storage`.
+VOTE_STORAGE = os.getenv("DJANGO_VOTE_STORAGE", "rows")
+
+# Every accepted ballot is appended to a hash-chained ballot log; a signed checkpoint
+# of the running hash and tally is written every this many entries, and
+# `manage.py audit_verify` resumes verification from the last one.
+BALLOT_LOG_CHECKPOINT_EVERY = 1000
+
+# How accepted ballots reach the database: 'direct' (each request commits its own)
+# or 'group' (one writer thread per process commits queued ballots together, every
+# MAX_BATCH ballots or MAX_DELAY_MS; requests still wait for their commit).
+VOTE_INGEST = {
+    'MODE': os.getenv("DJANGO_VOTE_INGEST", "direct"),
+    'MAX_BATCH': 64,
+    'MAX_DELAY_MS': 5,
+    'TIMEOUT': 30,
+}
+
+
+# Viewers log in by email through EmailViewerBackend; ModelBackend serves the admin
+AUTHENTICATION_BACKENDS = [
+    'auth.backends.EmailViewerBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -0,0 +1,28 @@
+import tempfile
+from pathlib import Path
+
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase
+
+from .databases import PROFILE_SQLITE_TUNED, SQLITE_PRAGMAS, database_settings
+
+
+class SqliteTunedProfileTests(SimpleTestCase):
+    """The sqlite-tuned profile's pragmas are applied to every new connection."""
+
+    def test_pragmas_applied(self):
+        with tempfile.TemporaryDirectory() as directory:
+            tuned = database_settings(PROFILE_SQLITE_TUNED, Path(directory))
+            # A handler of its own, so the test database connections are left alone
+            connection = ConnectionHandler({'default': tuned, 'tuned': tuned})['tuned']
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute('PRAGMA journal_mode')
+                    self.assertEqual(cursor.fetchone()[0], 'wal')
+                    cursor.execute('PRAGMA busy_timeout')
+                    self.assertEqual(cursor.fetchone()[0], SQLITE_PRAGMAS['busy_timeout'])
+                    cursor.execute('PRAGMA synchronous')
+                    # NORMAL
+                    self.assertEqual(cursor.fetchone()[0], 1)
+            finally:
+                connection.close()
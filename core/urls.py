@@ -7,7 +7,9 @@ from candidates.views import CandidateViewSet
 from posts.views import PostViewSet, ElectionViewSet
 
 from auth.views import voter_login, viewer_login
-from voting.views import live_results, cast_bulk_votes, voter_status
+from auth.async_views import avoter_login
+from voting.views import live_results, results_stream, results_timeline, cast_bulk_votes, voter_status
+from voting.async_views import alive_results, acast_bulk_votes, avoter_status
 
 router = DefaultRouter()
 router.register(r'api/candidates', CandidateViewSet, basename='candidate')
@@ -20,8 +22,15 @@ urlpatterns = [
     path('api/auth/voter/login/', voter_login, name='voter-login'),
     path('api/auth/viewer/login/', viewer_login, name='viewer-login'),
     path('api/results/live/', live_results, name='live-results'),
+    path('api/results/stream/', results_stream, name='results-stream'),
+    path('api/results/timeline/', results_timeline, name='results-timeline'),
     path('api/vote/cast/', cast_bulk_votes, name='cast-vote'),
     path('api/voter/status/', voter_status, name='voter-status'),
+    # Async-native versions of the hot endpoints (same contracts)
+    path('api/async/auth/voter/login/', avoter_login, name='async-voter-login'),
+    path('api/async/results/live/', alive_results, name='async-live-results'),
+    path('api/async/vote/cast/', acast_bulk_votes, name='async-cast-vote'),
+    path('api/async/voter/status/', avoter_status, name='async-voter-status'),
 ]
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -2,11 +2,14 @@ from django.contrib import admin
 from django.shortcuts import redirect
 from django.urls import path
 from django.http import HttpResponse
-from django.db.models import Count
 from io import BytesIO
 import openpyxl
 from .models import Post, EligibleHouse, Election
-from voting.models import Vote
+from voting.ballot_store import unpack_selections
+from voting.audit import logging_removals
+from voting.models import Ballot, IdempotencyKey, Vote
+from voting.results import build_election_results, turnout_statistics
+from voting.tallies import rebuild_tallies
 
 
 class EligibleHouseInline(admin.TabularInline):
@@ -16,15 +19,19 @@ class EligibleHouseInline(admin.TabularInline):
     verbose_name_plural = 'Eligible Houses (leave empty = open to all)'
 
 
-def generate_results_excel(elections):
+def generate_results_excel(elections, breakdown=None):
     """
     Generate an Excel workbook with results for the given elections.
+    With breakdown='house', each candidate row also gets one votes column per voter house.
     Returns a BytesIO object containing the xlsx file.
     """
     from openpyxl import Workbook
     from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+    from openpyxl.utils import get_column_letter
     from django.utils import timezone
-    from voting.models import Voter, Vote
+    from voting.models import Voter
+
+    house_labels = dict(Voter.HOUSE_CHOICES)
 
     wb = Workbook()
     # Remove the default sheet
@@ -77,25 +84,30 @@ def generate_results_excel(elections):
             clean_title = f"Election {election.id}"
         ws = wb.create_sheet(title=clean_title)
 
+        positions = build_election_results(election, breakdown=breakdown)
+        houses = list(positions[0]['houses']) if breakdown == 'house' and positions else []
+        last_col = 7 + len(houses)
+
         # Explicitly make gridlines visible
         ws.views.sheetView[0].showGridLines = True
 
         # 1. Title Banner
         ws.row_dimensions[1].height = 30
         ws.row_dimensions[2].height = 20
-        ws.merge_cells('A1:G1')
-        ws.merge_cells('A2:G2')
+        ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=last_col)
+        ws.merge_cells(start_row=2, start_column=1, end_row=2, end_column=last_col)
 
         # Style all cells in the title merged ranges
-        style_range(ws, 1, 1, 1, 7, font=font_title, fill=fill_title, alignment=align_center)
-        style_range(ws, 2, 1, 2, 7, font=font_subtitle, fill=fill_subtitle, alignment=align_center)
+        style_range(ws, 1, 1, 1, last_col, font=font_title, fill=fill_title, alignment=align_center)
+        style_range(ws, 2, 1, 2, last_col, font=font_subtitle, fill=fill_subtitle, alignment=align_center)
 
         ws['A1'].value = "KSS STUDENT BALLOT ELECTION RESULTS"
         ws['A2'].value = f"Election: {election.title} {'(Demo)' if election.is_demo else ''}"
 
         # 2. Statistics Summary Cards
-        total_voters = Voter.objects.count()
-        voted_count = Voter.objects.filter(vote__post__election=election).distinct().count()
+        statistics = turnout_statistics(election)
+        total_voters = statistics['total_voters']
+        voted_count = statistics['voted_count']
         turnout_pct = (voted_count / total_voters * 100) if total_voters > 0 else 0.0
 
         ws.row_dimensions[4].height = 16
@@ -109,12 +121,12 @@ def generate_results_excel(elections):
         ]
 
         # Merge for dates to span columns D to G
-        ws.merge_cells('D4:G4')
-        ws.merge_cells('D5:G5')
+        ws.merge_cells(start_row=4, start_column=4, end_row=4, end_column=last_col)
+        ws.merge_cells(start_row=5, start_column=4, end_row=5, end_column=last_col)
 
         # Style the headers range
         style_range(ws, 4, 1, 4, 3, font=font_stats_lbl, fill=fill_stats, alignment=align_center, border=thin_border)
-        style_range(ws, 4, 4, 4, 7, font=font_stats_lbl, fill=fill_stats, alignment=align_center, border=thin_border)
+        style_range(ws, 4, 4, 4, last_col, font=font_stats_lbl, fill=fill_stats, alignment=align_center, border=thin_border)
 
         ws["A4"] = "Total Registered Voters"
         ws["B4"] = "Total Votes Cast"
@@ -129,56 +141,34 @@ def generate_results_excel(elections):
         ws["D5"] = generation_time
 
         style_range(ws, 5, 1, 5, 3, font=font_stats_val, fill=fill_stats, alignment=align_center, border=thin_border)
-        style_range(ws, 5, 4, 5, 7, font=font_stats_val, fill=fill_stats, alignment=align_center, border=thin_border)
+        style_range(ws, 5, 4, 5, last_col, font=font_stats_val, fill=fill_stats, alignment=align_center, border=thin_border)
 
         # 3. Position Results Section
         current_row = 7
-        posts = election.posts.all().prefetch_related('candidates')
-
-        for post in posts:
-            candidates = post.candidates.all()
-            candidate_votes = Vote.objects.filter(post=post).values('candidate_id').annotate(vote_count=Count('id'))
-            votes_map = {item['candidate_id']: item['vote_count'] for item in candidate_votes}
-            total_post_votes = sum(votes_map.values())
-
-            candidate_results = []
-            for candidate in candidates:
-                votes = votes_map.get(candidate.id, 0)
-                percentage = (votes / total_post_votes) if total_post_votes > 0 else 0.0
-                candidate_results.append({
-                    'name': candidate.name,
-                    'class': candidate._class,
-                    'stream': candidate.stream,
-                    'votes': votes,
-                    'percentage': percentage,
-                })
-
-            # Sort by vote count descending, then name alphabetically
-            candidate_results.sort(key=lambda x: (-x['votes'], x['name']))
-
-            # Assign Rank and Status (Winner vs Runner-up)
-            for rank, res in enumerate(candidate_results, start=1):
-                res['rank'] = rank
-                res['status'] = 'Winner' if rank <= post.required_selections and res['votes'] > 0 else ('Runner-up' if res['votes'] > 0 else '-')
+
+        for position in positions:
+            # Sort by rank (vote count descending, then name alphabetically)
+            candidate_results = sorted(position['candidates'], key=lambda x: x['rank'])
 
             # Render Position Title Bar
             ws.row_dimensions[current_row].height = 24
-            ws.merge_cells(start_row=current_row, start_column=1, end_row=current_row, end_column=7)
+            ws.merge_cells(start_row=current_row, start_column=1, end_row=current_row, end_column=last_col)
             style_range(
                 ws,
-                current_row, 1, current_row, 7,
+                current_row, 1, current_row, last_col,
                 font=font_section,
                 fill=fill_section,
                 alignment=align_left,
                 border=Border(bottom=Side(border_style="medium", color="1F4E78"))
             )
-            ws.cell(row=current_row, column=1).value = f"Position: {post.title} (Required Selections: {post.required_selections})"
+            ws.cell(row=current_row, column=1).value = f"Position: {position['title']} (Required Selections: {position['required_selections']})"
 
             current_row += 1
 
             # Render Table Headers
             ws.row_dimensions[current_row].height = 20
             headers = ["Rank", "Candidate Name", "Class", "Stream", "Votes Received", "Percentage", "Result"]
+            headers += [f"Votes: {house_labels.get(house, house or 'No House')}" for house in houses]
             for col_idx, text in enumerate(headers, start=1):
                 cell = ws.cell(row=current_row, column=col_idx)
                 cell.value = text
@@ -192,10 +182,10 @@ def generate_results_excel(elections):
             # Render Candidates list
             if not candidate_results:
                 ws.row_dimensions[current_row].height = 18
-                ws.merge_cells(start_row=current_row, start_column=1, end_row=current_row, end_column=7)
+                ws.merge_cells(start_row=current_row, start_column=1, end_row=current_row, end_column=last_col)
                 style_range(
                     ws,
-                    current_row, 1, current_row, 7,
+                    current_row, 1, current_row, last_col,
                     font=Font(italic=True, color="7F7F7F"),
                     alignment=align_center,
                     border=thin_border
@@ -213,12 +203,16 @@ def generate_results_excel(elections):
                     cells = [
                         (1, res['rank'], align_center),
                         (2, res['name'], align_left),
-                        (3, res['class'], align_center),
+                        (3, res['_class'], align_center),
                         (4, res['stream'], align_left),
                         (5, res['votes'], align_right),
-                        (6, res['percentage'], align_right),
+                        (6, res['percentage'] / 100, align_right),
                         (7, res['status'], align_center)
                     ]
+                    cells += [
+                        (8 + offset, res['houses'][house], align_right)
+                        for offset, house in enumerate(houses)
+                    ]
 
                     for col_idx, val, align in cells:
                         cell = ws.cell(row=current_row, column=col_idx)
@@ -230,7 +224,7 @@ def generate_results_excel(elections):
                         cell.border = thin_border
 
                         # Formats
-                        if col_idx == 5:
+                        if col_idx == 5 or col_idx > 7:
                             cell.number_format = '#,##0'
                         elif col_idx == 6:
                             cell.number_format = '0.0%'
@@ -248,6 +242,8 @@ def generate_results_excel(elections):
         ws.column_dimensions['E'].width = 18
         ws.column_dimensions['F'].width = 15
         ws.column_dimensions['G'].width = 15
+        for col_idx in range(8, last_col + 1):
+            ws.column_dimensions[get_column_letter(col_idx)].width = 16
 
     output = BytesIO()
     wb.save(output)
@@ -260,7 +256,7 @@ class ElectionAdmin(admin.ModelAdmin):
     list_display = ('title', 'is_active', 'is_demo', 'created_at', 'export_results_link')
     list_filter = ('is_active', 'is_demo')
     search_fields = ('title',)
-    actions = ['reset_election_votes', 'export_election_results_action']
+    actions = ['reset_election_votes', 'export_election_results_action', 'export_election_results_by_house_action']
 
     def get_urls(self):
         urls = super().get_urls()
@@ -278,7 +274,8 @@ class ElectionAdmin(admin.ModelAdmin):
             self.message_user(request, "Election not found.", messages.ERROR)
             return redirect('..')
 
-        output = generate_results_excel([election])
+        breakdown = request.GET.get('breakdown')
+        output = generate_results_excel([election], breakdown='house' if breakdown == 'house' else None)
         response = HttpResponse(
             output.read(),
             content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
@@ -287,12 +284,12 @@ class ElectionAdmin(admin.ModelAdmin):
         return response
 
     @admin.action(description="Export selected elections results to Excel")
-    def export_election_results_action(self, request, queryset):
+    def export_election_results_action(self, request, queryset, breakdown=None):
         """Admin action to export results for all selected elections."""
         if not queryset.exists():
             return
 
-        output = generate_results_excel(list(queryset))
+        output = generate_results_excel(list(queryset), breakdown=breakdown)
         response = HttpResponse(
             output.read(),
             content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
@@ -301,6 +298,10 @@ class ElectionAdmin(admin.ModelAdmin):
         response['Content-Disposition'] = f'attachment; filename="{filename}"'
         return response
 
+    @admin.action(description="Export selected elections results to Excel (votes per house)")
+    def export_election_results_by_house_action(self, request, queryset):
+        return self.export_election_results_action(request, queryset, breakdown='house')
+
     def export_results_link(self, obj):
         from django.urls import reverse
         from django.utils.html import format_html
@@ -313,8 +314,16 @@ class ElectionAdmin(admin.ModelAdmin):
         deleted_count = 0
         for election in queryset:
             votes = Vote.objects.filter(post__election=election)
-            count = votes.count()
-            votes.delete()
+            ballots = Ballot.objects.filter(election=election)
+            count = votes.count() + sum(
+                len(unpack_selections(selections)) for selections in ballots.values_list('selections', flat=True)
+            )
+            # The ballot log is append-only: the reset is logged as removals, never erased
+            with logging_removals(votes, ballots):
+                votes.delete()
+                ballots.delete()
+            IdempotencyKey.objects.filter(election=election).delete()
+            rebuild_tallies(election)
             deleted_count += count
         self.message_user(request, f"Successfully reset {queryset.count()} election(s). Deleted {deleted_count} vote(s).")
 
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-18 00:25
+
+from django.db import migrations, models
+
+
+def create_versions(apps, schema_editor):
+    Election = apps.get_model('posts', 'Election')
+    DataVersion = apps.get_model('posts', 'DataVersion')
+    DataVersion.objects.bulk_create(
+        [DataVersion(key='elections', version=1)]
+        + [DataVersion(key=f'election:{pk}', version=1) for pk in Election.objects.values_list('pk', flat=True)]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0004_post_required_selections'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataVersion',
+            fields=[
+                ('key', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_versions, migrations.RunPython.noop),
+    ]
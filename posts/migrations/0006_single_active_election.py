@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-18 00:56
+
+from django.db import migrations, models
+
+
+def keep_one_active_election(apps, schema_editor):
+    # Election.save() already allows a single active election; repair rows written around it
+    Election = apps.get_model('posts', 'Election')
+    latest = Election.objects.filter(is_active=True).order_by('-created_at', '-id').values_list('id', flat=True).first()
+    if latest is not None:
+        Election.objects.filter(is_active=True).exclude(id=latest).update(is_active=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_dataversion'),
+    ]
+
+    operations = [
+        migrations.RunPython(keep_one_active_election, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='election',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_active', True)), fields=('is_active',), name='single_active_election'),
+        ),
+    ]
@@ -1,6 +1,24 @@
 from django.db import models
 
 
+class ElectionQuerySet(models.QuerySet):
+    # At most one election is active, so these lookups need no ORDER BY and are
+    # answered from the single_active_election index.
+
+    def get_active(self):
+        """The active election, or None."""
+        return next(iter(self.filter(is_active=True)[:1]), None)
+
+    async def aget_active(self):
+        async for election in self.filter(is_active=True)[:1]:
+            return election
+        return None
+
+    def get_active_id(self):
+        """Id of the active election, or None."""
+        return next(iter(self.filter(is_active=True).values_list('id', flat=True)[:1]), None)
+
+
 class Election(models.Model):
     title = models.CharField(max_length=200, unique=True)
     description = models.TextField(blank=True)
@@ -8,6 +26,16 @@ class Election(models.Model):
     is_demo = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = ElectionQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            # Backs save()'s single-active rule and indexes the active-election lookup
+            models.UniqueConstraint(
+                fields=['is_active'], condition=models.Q(is_active=True), name='single_active_election'
+            ),
+        ]
+
     def save(self, *args, **kwargs):
         # Enforce single active election
         if self.is_active:
@@ -39,12 +67,15 @@ class Post(models.Model):
         """Check if a voter is eligible to vote for this post.
         No rules = open to all voters.
         """
-        eligible_houses = self.eligible_houses.all()
-        if not eligible_houses.exists():
-            return True
-        if not voter.house:
-            return False
-        return eligible_houses.filter(house=voter.house).exists()
+        return self.is_house_eligible(voter.house)
+
+    def is_house_eligible(self, house):
+        """Same rule as is_voter_eligible for a house, answered from the election's cached eligibility matrix."""
+        if self.election_id is None:
+            houses = [rule.house for rule in self.eligible_houses.all()]
+            return not houses or (bool(house) and house in houses)
+        from voting.ballot_schema import get_ballot_schema
+        return get_ballot_schema(self.election_id).is_eligible(self.id, house)
 
     def __str__(self):
         return f"{self.title} ({self.election.title})"
@@ -69,3 +100,15 @@ class EligibleHouse(models.Model):
     def __str__(self):
         return f"{self.get_house_display()} → {self.post.title}"
 
+
+
+class DataVersion(models.Model):
+    """
+    Monotonically increasing change counter behind the API ETags.
+    Keys are 'election:<id>' for one election's data and 'elections' for the election list.
+    """
+    key = models.CharField(max_length=50, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.key} v{self.version}"
@@ -0,0 +1,147 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from candidates.models import Candidate
+from voting.ballot_schema import invalidate_ballot_schemas
+from voting.models import CandidateTally, Voter
+from voting.tallies import refresh_completion
+from .models import Election, Post, EligibleHouse
+from .versioning import ELECTIONS_KEY, bump_all_election_versions, bump_version, election_key
+
+
+@receiver(post_save, sender=Election)
+def election_saved(sender, instance, **kwargs):
+    if instance.is_active:
+        # Activating an election deactivates every other one
+        bump_all_election_versions()
+    bump_version(election_key(instance.pk), ELECTIONS_KEY)
+    invalidate_ballot_schemas(instance.pk)
+
+
+@receiver(post_delete, sender=Election)
+def election_deleted(sender, instance, **kwargs):
+    bump_version(ELECTIONS_KEY)
+    invalidate_ballot_schemas(instance.pk)
+
+
+def _refresh_completion_on_commit(election_id):
+    if election_id:
+        transaction.on_commit(lambda: refresh_completion(election_id))
+
+
+def _post_election_id(post_id):
+    return Post.objects.filter(pk=post_id).values_list('election_id', flat=True).first()
+
+
+@receiver(pre_save, sender=Post)
+@receiver(pre_save, sender=EligibleHouse)
+def remember_completion_fields(sender, instance, **kwargs):
+    # The fields that decide who has finished voting, as stored before this save
+    fields = ('election_id', 'required_selections') if sender is Post else ('post_id', 'house')
+    instance._stored_completion_fields = (
+        sender.objects.filter(pk=instance.pk).values_list(*fields).first() if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    if instance.election_id:
+        bump_version(election_key(instance.election_id))
+        invalidate_ballot_schemas(instance.election_id)
+
+    # A new, moved or resized position changes who has finished voting; a new title or description doesn't
+    stored = instance._stored_completion_fields
+    if stored != (instance.election_id, instance.required_selections):
+        _refresh_completion_on_commit(instance.election_id)
+    if stored is not None and stored[0] != instance.election_id:
+        if stored[0]:
+            bump_version(election_key(stored[0]))
+            invalidate_ballot_schemas(stored[0])
+        _refresh_completion_on_commit(stored[0])
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    if instance.election_id:
+        bump_version(election_key(instance.election_id))
+        invalidate_ballot_schemas(instance.election_id)
+        _refresh_completion_on_commit(instance.election_id)
+
+
+@receiver(post_save, sender=Candidate)
+@receiver(post_delete, sender=Candidate)
+@receiver(post_save, sender=EligibleHouse)
+@receiver(post_delete, sender=EligibleHouse)
+def post_child_changed(sender, instance, **kwargs):
+    election_id = _post_election_id(instance.post_id)
+    if election_id:
+        bump_version(election_key(election_id))
+        invalidate_ballot_schemas(election_id)
+
+
+@receiver(pre_save, sender=Candidate)
+def remember_candidate_election(sender, instance, **kwargs):
+    instance._stored_election_id = (
+        Candidate.objects.filter(pk=instance.pk).values_list('post__election_id', flat=True).first()
+        if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=Candidate)
+def candidate_saved(sender, instance, **kwargs):
+    # A candidate moved to another election's position also leaves the old election's results
+    stored = instance._stored_election_id
+    if stored and stored != _post_election_id(instance.post_id):
+        bump_version(election_key(stored))
+        invalidate_ballot_schemas(stored)
+
+
+@receiver(pre_delete, sender=Candidate)
+def remember_candidate_votes(sender, instance, **kwargs):
+    instance._had_votes = CandidateTally.objects.filter(candidate_id=instance.pk, votes__gt=0).exists()
+
+
+@receiver(post_delete, sender=Candidate)
+def candidate_deleted(sender, instance, **kwargs):
+    # The candidate's votes were deleted with it, which may leave ballots incomplete
+    if getattr(instance, '_had_votes', False):
+        _refresh_completion_on_commit(_post_election_id(instance.post_id))
+
+
+@receiver(post_save, sender=EligibleHouse)
+def eligible_house_saved(sender, instance, **kwargs):
+    stored = instance._stored_completion_fields
+    if stored != (instance.post_id, instance.house):
+        _refresh_completion_on_commit(_post_election_id(instance.post_id))
+    if stored is not None and stored[0] != instance.post_id:
+        election_id = _post_election_id(stored[0])
+        if election_id:
+            bump_version(election_key(election_id))
+            invalidate_ballot_schemas(election_id)
+        _refresh_completion_on_commit(election_id)
+
+
+@receiver(post_delete, sender=EligibleHouse)
+def eligible_house_deleted(sender, instance, **kwargs):
+    _refresh_completion_on_commit(_post_election_id(instance.post_id))
+
+
+@receiver(pre_save, sender=Voter)
+def remember_voter_house(sender, instance, update_fields=None, **kwargs):
+    if instance.pk and (update_fields is None or 'house' in update_fields):
+        instance._stored_house = Voter.objects.filter(pk=instance.pk).values_list('house', flat=True).first()
+    else:
+        instance._stored_house = instance.house
+
+
+@receiver(post_save, sender=Voter)
+def voter_saved(sender, instance, created, **kwargs):
+    # The registered voter count per house is part of every election's statistics
+    if created or instance._stored_house != instance.house:
+        bump_all_election_versions()
+
+
+@receiver(post_delete, sender=Voter)
+def voter_deleted(sender, instance, **kwargs):
+    bump_all_election_versions()
@@ -0,0 +1,130 @@
+import hashlib
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.http import HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework import status
+
+from .models import DataVersion
+
+
+ELECTIONS_KEY = 'elections'
+ELECTION_KEY_PREFIX = 'election:'
+
+
+def election_key(election_id):
+    return f'{ELECTION_KEY_PREFIX}{election_id}'
+
+
+def bump_version(*keys):
+    """Increment the data version of each key, creating the counter on first use."""
+    for key in keys:
+        if DataVersion.objects.filter(key=key).update(version=F('version') + 1):
+            continue
+        try:
+            with transaction.atomic():
+                DataVersion.objects.create(key=key, version=1)
+        except IntegrityError:
+            DataVersion.objects.filter(key=key).update(version=F('version') + 1)
+
+
+def bump_all_election_versions():
+    """Invalidate every election at once, e.g. when the active election or the voter roll changes."""
+    DataVersion.objects.filter(key__startswith=ELECTION_KEY_PREFIX).update(version=F('version') + 1)
+    bump_version(ELECTIONS_KEY)
+
+
+def get_versions(*keys):
+    """Current version of each key in one query (0 for keys never bumped)."""
+    versions = dict(DataVersion.objects.filter(key__in=keys).values_list('key', 'version'))
+    return tuple(versions.get(key, 0) for key in keys)
+
+
+async def aget_versions(*keys):
+    versions = {key: version async for key, version in DataVersion.objects.filter(key__in=keys).values_list('key', 'version')}
+    return tuple(versions.get(key, 0) for key in keys)
+
+
+def get_election_version(election_id):
+    return get_versions(election_key(election_id))[0]
+
+
+def version_fingerprint(request, keys, variant=''):
+    """
+    Split identity of the representation of `request` built from the data behind `keys`:
+    (versions tag, digest of path, Accept header and variant).
+    The version is read before the response is built, so a concurrent change can only
+    make the tag older than the body, never newer.
+    """
+    return _fingerprint(request, get_versions(*keys), variant)
+
+
+async def aversion_fingerprint(request, keys, variant=''):
+    return _fingerprint(request, await aget_versions(*keys), variant)
+
+
+def _fingerprint(request, versions, variant):
+    fingerprint = '|'.join([
+        request.get_full_path(),
+        request.META.get('HTTP_ACCEPT', ''),
+        str(variant),
+    ])
+    digest = hashlib.sha1(fingerprint.encode()).hexdigest()[:16]
+    return '.'.join(str(version) for version in versions), digest
+
+
+def make_etag(request, keys, variant=''):
+    """Strong ETag for the representation of `request` built from the data behind `keys`."""
+    return etag_from_fingerprint(*version_fingerprint(request, keys, variant))
+
+
+def etag_from_fingerprint(versions, digest):
+    return '"%s-%s"' % (versions, digest)
+
+
+def etag_matches(request, etag):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if not if_none_match:
+        return False
+    etags = parse_etags(if_none_match)
+    return '*' in etags or etag in etags
+
+
+def not_modified(etag):
+    response = HttpResponseNotModified()
+    response['ETag'] = etag
+    return response
+
+
+def set_etag(response, etag):
+    if response.status_code == status.HTTP_200_OK:
+        response['ETag'] = etag
+        patch_vary_headers(response, ('Accept', 'Authorization'))
+    return response
+
+
+class VersionedETagMixin:
+    """
+    Answer If-None-Match with 304 Not Modified from the data versions alone,
+    before the queryset is evaluated or any serializer runs.
+    """
+
+    def get_version_keys(self):
+        raise NotImplementedError
+
+    def get_etag_variant(self):
+        return ''
+
+    def _versioned(self, handler, request, *args, **kwargs):
+        etag = make_etag(request, self.get_version_keys(), self.get_etag_variant())
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        return set_etag(handler(request, *args, **kwargs), etag)
+
+    def list(self, request, *args, **kwargs):
+        return self._versioned(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._versioned(super().retrieve, request, *args, **kwargs)
@@ -1,13 +1,33 @@
 from rest_framework import viewsets
 from rest_framework.permissions import AllowAny
-from django.db.models import Q
 
 from posts.models import Post, Election
+from voting.ballot_schema import get_ballot_schema
 from voting.models import Voter
 from .serializers import PostWithCandidatesSerializer, ElectionSerializer
+from .versioning import ELECTIONS_KEY, VersionedETagMixin, election_key
 
 
-class ElectionViewSet(viewsets.ReadOnlyModelViewSet):
+class ElectionScopedMixin:
+    """
+    Resolve the election a list is scoped to: ?election_id= if provided,
+    otherwise the active election (None when there is none).
+    """
+
+    def get_election_id(self):
+        if not hasattr(self, '_election_id'):
+            election_id = self.request.query_params.get('election_id')
+            if not election_id:
+                election_id = Election.objects.get_active_id()
+            self._election_id = election_id
+        return self._election_id
+
+    def get_version_keys(self):
+        election_id = self.get_election_id()
+        return [election_key(election_id) if election_id else ELECTIONS_KEY]
+
+
+class ElectionViewSet(VersionedETagMixin, viewsets.ReadOnlyModelViewSet):
     """
     List all elections
     """
@@ -16,8 +36,11 @@ class ElectionViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [AllowAny]
     pagination_class = None
 
+    def get_version_keys(self):
+        return [ELECTIONS_KEY]
 
-class PostViewSet(viewsets.ReadOnlyModelViewSet):
+
+class PostViewSet(ElectionScopedMixin, VersionedETagMixin, viewsets.ReadOnlyModelViewSet):
     """
     List positions with candidate count.
     Defaults to the active election. Filters by ?election_id= if provided.
@@ -26,27 +49,26 @@ class PostViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = PostWithCandidatesSerializer
     permission_classes = [AllowAny]
 
+    def get_etag_variant(self):
+        user = self.request.user
+        if user and user.is_authenticated and isinstance(user, Voter):
+            return f'house:{user.house}'
+        return ''
+
     def get_queryset(self):
         queryset = Post.objects.all().prefetch_related('candidates')
-        election_id = self.request.query_params.get('election_id')
+        election_id = self.get_election_id()
         if election_id:
             queryset = queryset.filter(election_id=election_id)
         else:
-            active_election = Election.objects.filter(is_active=True).first()
-            if active_election:
-                queryset = queryset.filter(election=active_election)
-            else:
-                queryset = queryset.none()
+            queryset = queryset.none()
 
         # Filter by voter's house eligibility rules if the user is authenticated as a Voter
         user = self.request.user
-        if user and user.is_authenticated and isinstance(user, Voter):
-            if user.house:
-                queryset = queryset.filter(
-                    Q(eligible_houses__isnull=True) | Q(eligible_houses__house=user.house)
-                ).distinct()
-            else:
-                queryset = queryset.filter(eligible_houses__isnull=True).distinct()
+        if election_id and user and user.is_authenticated and isinstance(user, Voter):
+            schema = get_ballot_schema(election_id)
+            if schema is not None:
+                queryset = queryset.filter(id__in=schema.eligible_post_ids(user.house))
 
         return queryset
 
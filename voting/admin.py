@@ -6,8 +6,13 @@ from django.http import HttpResponse
 from django.db import transaction
 import pandas as pd
 from io import BytesIO
-from .models import Voter, Vote
+from candidates.models import Candidate
+from .audit import logging_removals
+from .ballot_store import unpack_selections
+from .models import Voter, Vote, Ballot
 from .forms import ExcelImportForm
+from .pins import assign_new_pins, has_pin, voters_without_pin
+from .tallies import rebuild_election_tallies
 
 
 @admin.register(Voter)
@@ -25,32 +30,30 @@ class VoterAdmin(admin.ModelAdmin):
 
     @admin.display(boolean=True, description='PIN Generated')
     def pin_generated(self, obj):
-        return bool(obj.pin)
+        return has_pin(obj)
 
     @admin.display(description='PIN Status')
     def pin_status(self, obj):
-        if obj and obj.pin:
+        if obj and has_pin(obj):
             return "Generated"
         return "Not Generated"
 
     @admin.action(description="Generate & Export PINs (Overwrite)")
     def generate_and_export_selected_pins(self, request, queryset):
-        import random
-        import string
         from io import BytesIO
         import pandas as pd
         from django.http import HttpResponse
 
         with transaction.atomic():
             voters = list(queryset)
-            for voter in voters:
-                voter.pin = "".join(random.choices(string.digits, k=6))
-            Voter.objects.bulk_update(voters, ['pin'])
+            pins = assign_new_pins(voters)
 
         # Optimize dataframe construction to prevent instantiating/looping model instances
         selected_ids = [v.id for v in voters]
-        voters_data = Voter.objects.filter(id__in=selected_ids).values('voter_no', 'full_name', 'house', 'pin').order_by('full_name')
-        df = pd.DataFrame(list(voters_data))
+        voters_data = list(Voter.objects.filter(id__in=selected_ids).values('id', 'voter_no', 'full_name', 'house').order_by('full_name'))
+        for row in voters_data:
+            row['pin'] = pins[row['id']]
+        df = pd.DataFrame(voters_data)
         df = df[['voter_no', 'full_name', 'house', 'pin']]
         df = df.rename(columns={
             'voter_no': 'Voter Number',
@@ -108,25 +111,23 @@ class VoterAdmin(admin.ModelAdmin):
 
     def export_voter_pins(self, request):
         """Generate PINs for voters missing them, and export all voters with PINs to Excel."""
-        import random
-        import string
         from io import BytesIO
         import pandas as pd
         from django.http import HttpResponse
-        from django.db.models import Q
 
         # Generate PINs for voters missing them
-        missing_voters = Voter.objects.filter(Q(pin__isnull=True) | Q(pin=""))
+        pins = {}
+        missing_voters = voters_without_pin()
         if missing_voters.exists():
             with transaction.atomic():
-                voters_list = list(missing_voters)
-                for voter in voters_list:
-                    voter.pin = "".join(random.choices(string.digits, k=6))
-                Voter.objects.bulk_update(voters_list, ['pin'])
-
-        # Export ALL voters using values() to prevent model instantiation and minimize memory usage
-        voters_data = Voter.objects.values('voter_no', 'full_name', 'house', 'pin').order_by('full_name')
-        df = pd.DataFrame(list(voters_data))
+                pins = assign_new_pins(list(missing_voters))
+
+        # Export ALL voters using values() to prevent model instantiation and minimize memory usage;
+        # PINs only stored as digests can't be exported, only those generated just now
+        voters_data = list(Voter.objects.values('id', 'voter_no', 'full_name', 'house', 'pin').order_by('full_name'))
+        for row in voters_data:
+            row['pin'] = pins.get(row['id'], row['pin'])
+        df = pd.DataFrame(voters_data)
         df = df[['voter_no', 'full_name', 'house', 'pin']]
         df = df.rename(columns={
             'voter_no': 'Voter Number',
@@ -368,11 +369,27 @@ class VoterAdmin(admin.ModelAdmin):
     def delete_all_voters(self, request, queryset):
         """Delete all voters (use with caution)"""
         count = queryset.count()
-        queryset.delete()
+        with logging_removals(
+            Vote.objects.filter(voter__in=queryset), Ballot.objects.filter(voter__in=queryset)
+        ) as election_ids:
+            queryset.delete()
+        rebuild_election_tallies(election_ids)
         self.message_user(request, f"{count} voters deleted.", messages.WARNING)
 
     delete_all_voters.short_description = "Delete selected voters"
 
+    def delete_model(self, request, obj):
+        with logging_removals(Vote.objects.filter(voter=obj), Ballot.objects.filter(voter=obj)) as election_ids:
+            super().delete_model(request, obj)
+        rebuild_election_tallies(election_ids)
+
+    def delete_queryset(self, request, queryset):
+        with logging_removals(
+            Vote.objects.filter(voter__in=queryset), Ballot.objects.filter(voter__in=queryset)
+        ) as election_ids:
+            super().delete_queryset(request, queryset)
+        rebuild_election_tallies(election_ids)
+
 
 @admin.register(Vote)
 class VoteAdmin(admin.ModelAdmin):
@@ -389,3 +406,48 @@ class VoteAdmin(admin.ModelAdmin):
     def has_change_permission(self, request, obj=None):
         # Prevent vote modification through admin
         return False
+
+    def delete_model(self, request, obj):
+        with logging_removals(votes=Vote.objects.filter(pk=obj.pk)) as election_ids:
+            super().delete_model(request, obj)
+        rebuild_election_tallies(election_ids)
+
+    def delete_queryset(self, request, queryset):
+        with logging_removals(votes=queryset) as election_ids:
+            super().delete_queryset(request, queryset)
+        rebuild_election_tallies(election_ids)
+
+
+@admin.register(Ballot)
+class BallotAdmin(admin.ModelAdmin):
+    list_display = ['voter', 'election', 'house', 'selection_count', 'created_at']
+    list_filter = ['election', 'house']
+    search_fields = ['voter__full_name', 'voter__voter_no']
+    fields = ['voter', 'election', 'house', 'candidates', 'created_at']
+    readonly_fields = fields
+    date_hierarchy = 'created_at'
+
+    def selection_count(self, obj):
+        return len(unpack_selections(obj.selections))
+    selection_count.short_description = 'Votes'
+
+    def candidates(self, obj):
+        names = dict(Candidate.objects.filter(id__in=unpack_selections(obj.selections)).values_list('id', 'name'))
+        return ', '.join(names.get(candidate_id, f'#{candidate_id}') for candidate_id in unpack_selections(obj.selections))
+
+    def has_add_permission(self, request):
+        # Ballots are only written by the voting endpoints
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def delete_model(self, request, obj):
+        with logging_removals(ballots=Ballot.objects.filter(pk=obj.pk)) as election_ids:
+            super().delete_model(request, obj)
+        rebuild_election_tallies(election_ids)
+
+    def delete_queryset(self, request, queryset):
+        with logging_removals(ballots=queryset) as election_ids:
+            super().delete_queryset(request, queryset)
+        rebuild_election_tallies(election_ids)
@@ -0,0 +1,189 @@
+"""
+Async-native counterparts of the hot voting endpoints.
+
+Reads go through the async ORM on the event loop. Casting a ballot still needs a
+database transaction, which Django only offers to sync code, so validation and
+the write run in one sync_to_async call; authentication and parsing stay async.
+"""
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+
+from auth.async_views import authenticate_voter, read_json
+from posts.models import Election
+from posts.versioning import ELECTIONS_KEY, aversion_fingerprint, election_key, etag_from_fingerprint, etag_matches, not_modified, set_etag
+from voting.ballot_store import avoted_post_counts
+from voting.models import Participation
+from .ballot_schema import get_ballot_schema
+from .ballots import VOTER_NOT_FOUND_BODY, BallotRejected, VoterNotFound
+from .idempotency import IdempotentReplay, astored_response, cast_success_body, get_idempotency_key, request_hash
+from .ingest import INGEST_TIMEOUT_BODY, IngestTimeout
+from .results import BREAKDOWNS, aresolve_results_election, election_results_payload
+from .results_cache import get_results_cache
+from .serializers import BulkVoteSerializer
+
+
+@require_GET
+async def alive_results(request):
+    """
+    Async live voting results grouped by position for a specific or active election.
+    Pass ?breakdown=house to also get each candidate's votes per voter house.
+    """
+    breakdown = request.GET.get('breakdown') or None
+    if breakdown is not None and breakdown not in BREAKDOWNS:
+        return JsonResponse({
+            'success': False,
+            'message': f'Unsupported breakdown "{breakdown}". Supported: {", ".join(BREAKDOWNS)}.'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        election = await aresolve_results_election(request.GET.get('election_id'))
+    except Election.DoesNotExist:
+        return JsonResponse({
+            'success': False,
+            'message': 'Election not found.'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    versions, digest = await aversion_fingerprint(
+        request, [election_key(election.id) if election else ELECTIONS_KEY], variant=request.build_absolute_uri('/')
+    )
+    etag = etag_from_fingerprint(versions, digest)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    cache = get_results_cache()
+    body = cache.peek(digest, versions)
+    if body is None:
+        # Building the results is a handful of grouped queries; do it in one thread hop
+        def build():
+            return JSONRenderer().render({
+                'success': True,
+                'data': election_results_payload(election, request=request, breakdown=breakdown)
+            })
+        body = await sync_to_async(cache.get_or_build)(digest, versions, build)
+
+    return set_etag(HttpResponse(body, content_type='application/json'), etag)
+
+
+@require_GET
+async def avoter_status(request):
+    """
+    Async voting status of the current voter for the active election
+    """
+    voter, error = await authenticate_voter(request)
+    if error is not None:
+        return error
+
+    voter_data = {
+        'id': voter.id,
+        'voter_no': voter.voter_no,
+        'name': voter.full_name,
+        'house': voter.house,
+    }
+    active_election = await Election.objects.aget_active()
+
+    if not active_election:
+        return JsonResponse({
+            'success': True,
+            'data': {
+                'voter': voter_data,
+                'active_election': None,
+                'eligible_positions': [],
+                'voted_positions': [],
+                'votes_cast': 0,
+                'ballot_complete': False
+            }
+        }, status=status.HTTP_200_OK)
+
+    participation = await Participation.objects.filter(
+        voter=voter, election=active_election
+    ).only('votes_cast', 'is_complete').afirst()
+    schema = await sync_to_async(get_ballot_schema)(active_election.id)
+    eligible_positions = schema.eligible_positions(voter.house)
+    if participation is None:
+        voted_post_ids = set()
+    elif participation.is_complete:
+        # A complete ballot covers every eligible position, nothing left to count
+        voted_post_ids = {position['id'] for position in eligible_positions}
+    else:
+        voted_post_ids = set(await avoted_post_counts(voter, active_election.id))
+    voted_positions = [title for post_id, (title, _) in schema.posts.items() if post_id in voted_post_ids]
+
+    return JsonResponse({
+        'success': True,
+        'data': {
+            'voter': voter_data,
+            'active_election': {
+                'id': active_election.id,
+                'title': active_election.title,
+                'is_demo': active_election.is_demo
+            },
+            'eligible_positions': eligible_positions,
+            'voted_positions': voted_positions,
+            'votes_cast': participation.votes_cast if participation else 0,
+            'ballot_complete': bool(participation and participation.is_complete)
+        }
+    }, status=status.HTTP_200_OK)
+
+
+def _cast_ballot(request, data, idempotency_key=None, body_hash=''):
+    """Returns (created votes, None) or (None, error body); raises IdempotentReplay."""
+    serializer = BulkVoteSerializer(data=data, context={'request': request})
+    if not serializer.is_valid():
+        return None, {
+            'success': False,
+            'message': 'Failed to cast votes',
+            'errors': serializer.errors
+        }
+    try:
+        return serializer.save(idempotency_key=idempotency_key, request_hash=body_hash), None
+    except BallotRejected as exc:
+        return None, exc.as_error_body()
+    except VoterNotFound:
+        return None, VOTER_NOT_FOUND_BODY
+    except IngestTimeout:
+        return None, INGEST_TIMEOUT_BODY
+
+
+@csrf_exempt
+@require_POST
+async def acast_bulk_votes(request):
+    """
+    Async bulk vote casting; same request body as cast_bulk_votes
+    Voter must be authenticated via JWT
+    """
+    voter, error = await authenticate_voter(request)
+    if error is not None:
+        return error
+
+    idempotency_key, error_body = get_idempotency_key(request)
+    if error_body is not None:
+        return JsonResponse(error_body, status=status.HTTP_400_BAD_REQUEST)
+
+    data, error = read_json(request)
+    if error is not None:
+        return error
+
+    body_hash = ''
+    if idempotency_key:
+        body_hash = request_hash(data)
+        stored = await astored_response(voter, idempotency_key, body_hash)
+        if stored is not None:
+            status_code, body, headers = stored
+            return JsonResponse(body, status=status_code, headers=headers)
+
+    try:
+        created_votes, error_body = await sync_to_async(_cast_ballot)(request, data, idempotency_key, body_hash)
+    except IdempotentReplay as replay:
+        return JsonResponse(replay.body, status=replay.status_code, headers=replay.headers)
+    if error_body is INGEST_TIMEOUT_BODY:
+        return JsonResponse(error_body, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    if error_body is VOTER_NOT_FOUND_BODY:
+        return JsonResponse(error_body, status=status.HTTP_401_UNAUTHORIZED)
+    if error_body is not None:
+        return JsonResponse(error_body, status=status.HTTP_400_BAD_REQUEST)
+
+    return JsonResponse(cast_success_body(len(created_votes)), status=status.HTTP_201_CREATED)
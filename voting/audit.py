@@ -0,0 +1,271 @@
+"""
+Append-only, hash-chained ballot log.
+
+Every accepted ballot is appended to its election's log inside the ballot's own
+transaction. Each entry stores the hash of the entry before it and its own hash
+covers that link plus the ballot, so altering, removing or reordering an entry
+breaks the chain from there on. Every BALLOT_LOG_CHECKPOINT_EVERY entries a
+checkpoint records the running hash and the candidate tally, signed with
+SECRET_KEY. verify_ballot_log() resumes from the last checkpoint an earlier run
+has verified instead of replaying the whole log; full=True walks it from the
+start again.
+
+Votes an administrator deletes are not taken out of the log: a removal entry
+recording them is appended instead (see logging_removals), so the log's tally
+keeps matching the stored votes and the deletion stays on record.
+"""
+import hashlib
+import hmac
+import json
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from candidates.models import Candidate
+from .ballot_store import pack_selections, unpack_selections
+from .models import BallotLogCheckpoint, BallotLogEntry, BallotLogHead, CandidateTally
+
+
+GENESIS_HASH = '0' * 64
+MAX_REPORTED_ERRORS = 50
+
+
+def _checkpoint_every():
+    return getattr(settings, 'BALLOT_LOG_CHECKPOINT_EVERY', 1000)
+
+
+def entry_hash(prev_hash, seq, election_id, voter_id, house, created_at, candidate_ids, removed=False):
+    """Hash of a log entry; created_at is taken to the second so it survives any database's datetime precision."""
+    fields = [
+        prev_hash, str(seq), str(election_id), str(voter_id), house or '',
+        str(int(created_at.timestamp())), ','.join(str(candidate_id) for candidate_id in candidate_ids),
+    ]
+    if removed:
+        fields.append('removed')
+    return hashlib.sha256('|'.join(fields).encode()).hexdigest()
+
+
+def _count(tally, candidate_ids, removed):
+    if removed:
+        tally.subtract(candidate_ids)
+    else:
+        tally.update(candidate_ids)
+
+
+def tally_digest(tally):
+    """Hash of a candidate id -> votes tally, independent of key order, key type and zero counts."""
+    canonical = json.dumps(sorted((int(candidate_id), votes) for candidate_id, votes in tally.items() if votes))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _sign(election_id, seq, chain_hash, digest):
+    message = f'{election_id}|{seq}|{chain_hash}|{digest}'
+    return hmac.new(settings.SECRET_KEY.encode(), message.encode(), hashlib.sha256).hexdigest()
+
+
+def append_to_ballot_log(election_id, ballots):
+    """
+    Append accepted ballots, a list of (voter, votes), to an election's log.
+    Must be called inside the ballots' transaction; the log head row is locked
+    so concurrent appends to one election queue up.
+    """
+    _append(election_id, [
+        (voter.id, voter.house or '', [vote.candidate_id for vote in votes], votes[0].timestamp)
+        for voter, votes in ballots
+    ])
+
+
+def _append(election_id, rows, removed=False):
+    """Append (voter id, house, candidate ids, created_at) rows to an election's log."""
+    head, _ = BallotLogHead.objects.select_for_update().get_or_create(
+        election_id=election_id, defaults={'hash': GENESIS_HASH}
+    )
+    seq, chain = head.seq, head.hash
+    entries = []
+    for voter_id, house, candidate_ids, created_at in rows:
+        seq += 1
+        digest = entry_hash(chain, seq, election_id, voter_id, house, created_at, candidate_ids, removed)
+        entries.append(BallotLogEntry(
+            election_id=election_id, seq=seq, voter_id=voter_id, house=house, removed=removed,
+            selections=pack_selections(candidate_ids), created_at=created_at, prev_hash=chain, hash=digest,
+        ))
+        chain = digest
+
+    BallotLogEntry.objects.bulk_create(entries)
+    BallotLogHead.objects.filter(pk=head.pk).update(seq=seq, hash=chain)
+
+    every = _checkpoint_every()
+    if every and seq // every > head.seq // every:
+        write_checkpoint(election_id, seq, chain)
+
+
+@contextmanager
+def logging_removals(votes=None, ballots=None):
+    """
+    Delete votes inside this block and log it: the Vote and Ballot rows of the given
+    querysets (e.g. of the voters about to be deleted) are read first, and once the
+    block has deleted them one removal entry per voter and election is appended,
+    all in one transaction. Yields the ids of the elections whose votes are deleted.
+    """
+    # election id -> voter id -> [house, candidate ids]
+    removals = defaultdict(lambda: defaultdict(lambda: ['', []]))
+    with transaction.atomic():
+        if votes is not None:
+            for election_id, voter_id, house, candidate_id in votes.order_by('id').values_list(
+                'post__election_id', 'voter_id', 'voter__house', 'candidate_id'
+            ):
+                removal = removals[election_id][voter_id]
+                removal[0] = house or ''
+                removal[1].append(candidate_id)
+        if ballots is not None:
+            for election_id, voter_id, house, selections in ballots.values_list(
+                'election_id', 'voter_id', 'house', 'selections'
+            ):
+                removal = removals[election_id][voter_id]
+                removal[0] = house
+                removal[1].extend(unpack_selections(selections))
+        yield set(removals)
+
+        now = timezone.now()
+        for election_id, voters in removals.items():
+            if BallotLogHead.objects.filter(election_id=election_id).exists():
+                _append(election_id, [
+                    (voter_id, house, candidate_ids, now) for voter_id, (house, candidate_ids) in sorted(voters.items())
+                ], removed=True)
+
+
+def write_checkpoint(election_id, seq, chain_hash):
+    """Record the log's tally up to seq, from the previous checkpoint plus the entries since."""
+    previous = BallotLogCheckpoint.objects.filter(election_id=election_id, seq__lt=seq).order_by('-seq').first()
+    tally = Counter()
+    if previous is not None:
+        tally.update({int(candidate_id): votes for candidate_id, votes in previous.tally.items()})
+    entries = BallotLogEntry.objects.filter(
+        election_id=election_id, seq__gt=previous.seq if previous else 0, seq__lte=seq
+    ).values_list('selections', 'removed')
+    for selections, removed in entries.iterator():
+        _count(tally, unpack_selections(bytes(selections)), removed)
+
+    digest = tally_digest(tally)
+    return BallotLogCheckpoint.objects.create(
+        election_id=election_id, seq=seq, chain_hash=chain_hash,
+        tally={str(candidate_id): votes for candidate_id, votes in sorted(tally.items())},
+        tally_digest=digest, signature=_sign(election_id, seq, chain_hash, digest),
+    )
+
+
+def verify_ballot_log(election, full=False, chunk_size=2000, log=None):
+    """
+    Check an election's ballot log: checkpoint signatures, the hash chain, the
+    log head, the checkpoint tallies and finally the maintained candidate tallies.
+    Starts from the last checkpoint verified by an earlier run unless full is set,
+    streams entries chunk_size at a time and, if everything checks out, marks the
+    checkpoints it passed as verified. Returns a report dict; report['errors']
+    lists what failed.
+    """
+    log = log or (lambda message: None)
+    started = time.perf_counter()
+    errors = []
+
+    def fail(message):
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append(message)
+
+    # seq -> (chain hash, tally digest) of every checkpoint with a valid signature
+    checkpoints = {}
+    verified = []
+    rows = BallotLogCheckpoint.objects.filter(election=election).order_by('seq').values_list(
+        'seq', 'chain_hash', 'tally_digest', 'signature', 'verified_at'
+    )
+    for seq, chain_hash, digest, signature, verified_at in rows:
+        if hmac.compare_digest(signature, _sign(election.id, seq, chain_hash, digest)):
+            checkpoints[seq] = (chain_hash, digest)
+            if verified_at is not None:
+                verified.append(seq)
+        else:
+            fail(f'Checkpoint {seq} has an invalid signature')
+
+    start_seq, chain, tally = 0, GENESIS_HASH, Counter()
+    if not full and verified:
+        start_seq = verified[-1]
+        chain, digest = checkpoints[start_seq]
+        stored_tally = BallotLogCheckpoint.objects.filter(
+            election=election, seq=start_seq
+        ).values_list('tally', flat=True).get()
+        tally = Counter({int(candidate_id): votes for candidate_id, votes in stored_tally.items()})
+        if tally_digest(tally) != digest:
+            fail(f'Checkpoint {start_seq} tally does not match its digest')
+        anchor = BallotLogEntry.objects.filter(election=election, seq=start_seq).values_list('hash', flat=True).first()
+        if anchor != chain:
+            fail(f'Entry {start_seq} does not match checkpoint {start_seq}')
+        # Entries before the checkpoint were verified earlier; only check that none went missing since
+        if BallotLogEntry.objects.filter(election=election, seq__lte=start_seq).count() != start_seq:
+            fail(f'Entries up to checkpoint {start_seq} have been removed')
+
+    entries = BallotLogEntry.objects.filter(election=election, seq__gt=start_seq).order_by('seq').values_list(
+        'seq', 'voter_id', 'house', 'selections', 'created_at', 'removed', 'prev_hash', 'hash'
+    )
+    seq = start_seq
+    count = 0
+    for row in entries.iterator(chunk_size=chunk_size):
+        entry_seq, voter_id, house, selections, created_at, removed, prev_hash, stored_hash = row
+        if entry_seq != seq + 1:
+            fail(f'Entries {seq + 1} to {entry_seq - 1} are missing')
+        if prev_hash != chain:
+            fail(f'Entry {entry_seq} is not linked to entry {seq}')
+        candidate_ids = unpack_selections(bytes(selections))
+        if entry_hash(chain, entry_seq, election.id, voter_id, house, created_at, candidate_ids, removed) != stored_hash:
+            fail(f'Entry {entry_seq} has been altered')
+        # Continue from the stored hash so one bad entry is reported once
+        chain, seq = stored_hash, entry_seq
+        _count(tally, candidate_ids, removed)
+        count += 1
+
+        if seq in checkpoints:
+            checkpoint_hash, checkpoint_digest = checkpoints[seq]
+            if checkpoint_hash != chain or checkpoint_digest != tally_digest(tally):
+                fail(f'Log does not match checkpoint {seq}')
+        if count % 100000 == 0:
+            log(f'{count} entries verified...')
+
+    head = BallotLogHead.objects.filter(election=election).values_list('seq', 'hash').first()
+    if head is None:
+        if seq:
+            fail('The log has entries but no head')
+    elif head != (seq, chain):
+        fail(f'The log ends at entry {seq} but its head records entry {head[0]}')
+
+    maintained = Counter(dict(
+        CandidateTally.objects.filter(post__election=election).values_list('candidate_id', 'votes')
+    ))
+    # A deleted candidate's votes are deleted with it, so only existing candidates are compared
+    candidate_ids = set(Candidate.objects.filter(post__election=election).values_list('id', flat=True))
+    differing = sorted(
+        candidate_id for candidate_id in candidate_ids | set(maintained)
+        if maintained[candidate_id] != tally[candidate_id]
+    )
+    if differing:
+        fail(f'Candidate tallies differ from the log for candidates {", ".join(map(str, differing[:20]))}')
+
+    if not errors:
+        BallotLogCheckpoint.objects.filter(
+            election=election, seq__gt=start_seq, seq__lte=seq
+        ).update(verified_at=timezone.now())
+
+    elapsed = time.perf_counter() - started
+    return {
+        'election': election.id,
+        'mode': 'full' if full else 'incremental',
+        'from_seq': start_seq,
+        'to_seq': seq,
+        'entries': count,
+        'checkpoints': len(checkpoints),
+        'tally_digest': tally_digest(tally),
+        'seconds': round(elapsed, 3),
+        'entries_per_second': round(count / elapsed, 1) if elapsed > 0 else 0,
+        'errors': errors,
+    }
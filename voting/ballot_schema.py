@@ -0,0 +1,122 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from candidates.models import Candidate
+from posts.models import Election, EligibleHouse, Post
+
+
+ACTIVE_ELECTION_KEY = 'ballot-schema:active-election'
+NO_ACTIVE_ELECTION = 0
+
+
+def _schema_key(election_id):
+    return f'ballot-schema:{election_id}'
+
+
+def _timeout():
+    return getattr(settings, 'BALLOT_SCHEMA_TIMEOUT', 300)
+
+
+class BallotSchema:
+    """
+    Everything needed to validate a ballot for one election, compiled into plain
+    dicts and sets so validation needs no queries:
+
+    - posts: post id -> (title, required_selections)
+    - post_houses: post id -> houses allowed to vote for it (empty = open to all)
+    - candidates: candidate id -> (post id, name)
+    - eligibility: house -> frozenset of the post ids open to it, for every
+      house in EligibleHouse.HOUSE_CHOICES and '' (a voter without a house)
+    """
+
+    def __init__(self, election_id, posts, post_houses, candidates):
+        self.election_id = election_id
+        self.posts = posts
+        self.post_houses = post_houses
+        self.candidates = candidates
+        self.eligibility = {
+            house: self._open_to(house) for house in ['', *(house for house, _ in EligibleHouse.HOUSE_CHOICES)]
+        }
+
+    @classmethod
+    def build(cls, election_id):
+        posts = {}
+        post_houses = {}
+        for post in Post.objects.filter(election_id=election_id).prefetch_related('eligible_houses'):
+            posts[post.id] = (post.title, post.required_selections)
+            post_houses[post.id] = frozenset(rule.house for rule in post.eligible_houses.all())
+        candidates = {
+            candidate_id: (post_id, name)
+            for candidate_id, post_id, name in Candidate.objects.filter(post__election_id=election_id)
+                                                            .values_list('id', 'post_id', 'name')
+        }
+        return cls(election_id, posts, post_houses, candidates)
+
+    def _open_to(self, house):
+        # No rules = open to all voters; a voter without a house gets only those
+        return frozenset(
+            post_id for post_id, houses in self.post_houses.items()
+            if not houses or (house and house in houses)
+        )
+
+    def eligible_post_ids(self, house):
+        """The ids of the positions a voter of `house` may vote for."""
+        eligible = self.eligibility.get(house or '')
+        if eligible is None:
+            # A house outside HOUSE_CHOICES (e.g. legacy data) is not precomputed
+            eligible = self._open_to(house)
+        return eligible
+
+    def is_eligible(self, post_id, house):
+        """True if a voter of `house` may vote for the position."""
+        return post_id in self.eligible_post_ids(house)
+
+    def eligible_positions(self, house):
+        """[{'id', 'title'}] of the positions open to `house`, in position order."""
+        eligible = self.eligible_post_ids(house)
+        return [{'id': post_id, 'title': title} for post_id, (title, _) in self.posts.items() if post_id in eligible]
+
+    def is_complete(self, house, votes_by_post):
+        """True if votes_by_post (post id -> votes) fills every position open to `house`; False if none is."""
+        eligible = self.eligible_post_ids(house)
+        return bool(eligible) and all(
+            votes_by_post.get(post_id, 0) >= (self.posts[post_id][1] or 1) for post_id in eligible
+        )
+
+
+def get_active_election_id():
+    """Id of the active election (None if there is none), cached until an election changes."""
+    election_id = cache.get(ACTIVE_ELECTION_KEY)
+    if election_id is None:
+        election_id = Election.objects.get_active_id() or NO_ACTIVE_ELECTION
+        cache.set(ACTIVE_ELECTION_KEY, election_id, _timeout())
+    return election_id or None
+
+
+def get_ballot_schema(election_id=None):
+    """The compiled ballot schema of an election (default: the active one), or None if there is no active election."""
+    if election_id is None:
+        election_id = get_active_election_id()
+        if election_id is None:
+            return None
+    key = _schema_key(election_id)
+    schema = cache.get(key)
+    if schema is None:
+        schema = BallotSchema.build(election_id)
+        cache.set(key, schema, _timeout())
+    return schema
+
+
+def invalidate_ballot_schemas(election_id=None):
+    """
+    Drop the cached active election id and, if given, the schema of an election.
+    Repeated once the current transaction commits, so a request running in
+    between cannot leave a schema of uncommitted data behind.
+    """
+    keys = [ACTIVE_ELECTION_KEY]
+    if election_id is not None:
+        keys.append(_schema_key(election_id))
+
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
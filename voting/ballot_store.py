@@ -0,0 +1,91 @@
+"""
+Ballot-level vote storage.
+
+With VOTE_STORAGE = 'ballots' an accepted ballot is one Ballot row holding the
+packed candidate ids instead of one Vote row per selection. Everything derived
+from the votes (tallies, turnout, timeline, "already voted" checks) reads both
+stores, so an election may hold a mix while it is being converted.
+"""
+import struct
+from collections import Counter
+
+from django.conf import settings
+from django.db.models import Count
+
+from candidates.models import Candidate
+from voting.models import Ballot, Vote
+
+
+STORAGE_ROWS = 'rows'
+STORAGE_BALLOTS = 'ballots'
+
+
+def vote_storage():
+    return getattr(settings, 'VOTE_STORAGE', STORAGE_ROWS)
+
+
+def pack_selections(candidate_ids):
+    """Encode candidate ids as little-endian unsigned 32-bit integers."""
+    return struct.pack(f'<{len(candidate_ids)}I', *candidate_ids)
+
+
+def unpack_selections(data):
+    data = bytes(data)
+    return list(struct.unpack(f'<{len(data) // 4}I', data))
+
+
+def candidate_posts(election=None):
+    """Map candidate id -> post id, for one election or all of them."""
+    candidates = Candidate.objects.all()
+    if election is not None:
+        candidates = candidates.filter(post__election=election)
+    return dict(candidates.values_list('id', 'post_id'))
+
+
+def iter_ballot_votes(ballots, posts_by_candidate):
+    """
+    Decode ballots into (ballot, candidate_id, post_id) tuples.
+    Candidates that no longer exist are skipped, like their cascaded Vote rows would be.
+    """
+    for ballot in ballots:
+        for candidate_id in unpack_selections(ballot.selections):
+            post_id = posts_by_candidate.get(candidate_id)
+            if post_id is not None:
+                yield ballot, candidate_id, post_id
+
+
+def voted_post_counts(voter, election_id):
+    """Map post id -> number of votes the voter cast for it in the election, from both stores."""
+    counts = Counter(dict(
+        Vote.objects.filter(voter=voter, post__election_id=election_id)
+        .values_list('post_id')
+        .annotate(vote_count=Count('id'))
+        .order_by()
+    ))
+    ballot = Ballot.objects.filter(voter=voter, election_id=election_id).only('selections').first()
+    if ballot is not None:
+        posts_by_candidate = candidate_posts(election_id)
+        for _, _, post_id in iter_ballot_votes([ballot], posts_by_candidate):
+            counts[post_id] += 1
+    return counts
+
+
+async def avoted_post_counts(voter, election_id):
+    """Async counterpart of voted_post_counts()."""
+    counts = Counter({
+        post_id: vote_count
+        async for post_id, vote_count in Vote.objects.filter(voter=voter, post__election_id=election_id)
+                                                       .values_list('post_id')
+                                                       .annotate(vote_count=Count('id'))
+                                                       .order_by()
+    })
+    ballot = await Ballot.objects.filter(voter=voter, election_id=election_id).only('selections').afirst()
+    if ballot is not None:
+        posts_by_candidate = {
+            candidate_id: post_id
+            async for candidate_id, post_id in Candidate.objects.filter(post__election_id=election_id)
+                                                                .values_list('id', 'post_id')
+        }
+        for _, _, post_id in iter_ballot_votes([ballot], posts_by_candidate):
+            counts[post_id] += 1
+    return counts
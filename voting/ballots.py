@@ -0,0 +1,219 @@
+from collections import Counter, defaultdict
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from posts.models import Post
+from posts.versioning import bump_version, election_key
+from voting.audit import append_to_ballot_log
+from voting.ballot_schema import get_ballot_schema
+from voting.ballot_store import (
+    STORAGE_BALLOTS, pack_selections, unpack_selections, vote_storage, voted_post_counts
+)
+from voting.idempotency import IdempotentReplay, cast_success_body, remember_response, stored_response
+from voting.models import Ballot, Participation, Vote, Voter
+from voting.streams import notify_results_changed
+from voting.tallies import record_participation, record_timeline, record_votes
+
+
+class BallotRejected(Exception):
+    """The database refused a ballot because the voter already voted for some of its positions."""
+
+    def __init__(self, positions):
+        self.positions = positions
+        super().__init__(', '.join(title for _, title in positions))
+
+    def as_error_body(self):
+        return {
+            'success': False,
+            'message': 'Failed to cast votes',
+            'errors': {
+                'non_field_errors': [f'You have already voted for position: {title}' for _, title in self.positions]
+            },
+            'rejected_positions': [{'id': post_id, 'title': title} for post_id, title in self.positions],
+        }
+
+
+class VoterNotFound(Exception):
+    """The ballot's voter was deleted after their token was issued."""
+
+
+VOTER_NOT_FOUND_BODY = {
+    'success': False,
+    'message': 'Voter not found.'
+}
+
+
+def record_ballot(voter, election_id, selections, idempotency_key=None, request_hash=''):
+    """
+    Persist an accepted ballot and everything derived from it in one transaction:
+    the votes, the candidate tallies, the voter's participation, the turnout
+    timeline and the election's data version. selections is a list of (post_id, candidate_id).
+
+    With the default row storage the votes are inserted with one bulk INSERT and
+    the (voter, post, seat) unique constraint rejects positions the voter already
+    voted for; with VOTE_STORAGE = 'ballots' they go into the voter's single Ballot
+    row instead. Either way a rejected ballot writes nothing and BallotRejected
+    names the positions concerned. With an idempotency_key the success response
+    is stored under it, with the request_hash of the body, in the same transaction;
+    if another request stored that key first, IdempotentReplay carries its
+    response instead (see voting.idempotency). VoterNotFound means the voter
+    was deleted since logging in.
+    Returns the votes (unsaved Vote instances with ballot storage).
+    """
+    result, = record_ballots([(voter, election_id, selections, idempotency_key, request_hash)])
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+def record_ballots(ballots):
+    """
+    Persist several ballots in one transaction; ballots is a list of (voter,
+    election_id, selections, idempotency_key, request_hash). Each ballot is inserted in its own savepoint,
+    so a rejected one leaves the others intact, while the tally, timeline and
+    version updates are applied once for all accepted ballots.
+    Returns one entry per ballot: its votes, or the BallotRejected, IdempotentReplay
+    or VoterNotFound it raised.
+    """
+    try:
+        return _record_ballots(ballots)
+    except IntegrityError:
+        # Voters are rebuilt from their token's claims without a query, so one deleted
+        # since login only fails the deferred foreign key checks when the batch commits
+        voter_ids = {voter.pk for voter, *_ in ballots}
+        existing = set(Voter.objects.filter(pk__in=voter_ids).values_list('pk', flat=True))
+        if existing == voter_ids:
+            raise
+    remaining = iter(_record_ballots([ballot for ballot in ballots if ballot[0].pk in existing]))
+    return [next(remaining) if ballot[0].pk in existing else VoterNotFound() for ballot in ballots]
+
+
+def _record_ballots(ballots):
+    results = []
+    accepted = []
+    with transaction.atomic():
+        for voter, election_id, selections, idempotency_key, request_hash in ballots:
+            try:
+                votes, first = _insert_ballot(voter, election_id, selections, idempotency_key, request_hash)
+            except (BallotRejected, IdempotentReplay) as exc:
+                results.append(exc)
+            else:
+                results.append(votes)
+                accepted.append((voter, election_id, votes, first))
+        if accepted:
+            _record_derived(accepted)
+    return results
+
+
+def _insert_ballot(voter, election_id, selections, idempotency_key=None, request_hash=''):
+    """
+    Store one ballot's votes and the voter's participation, or raise BallotRejected
+    or IdempotentReplay. Returns the votes and whether this is the voter's first ballot.
+    """
+    seats = Counter()
+    votes = []
+    for post_id, candidate_id in selections:
+        seats[post_id] += 1
+        votes.append(Vote(voter=voter, post_id=post_id, candidate_id=candidate_id, seat=seats[post_id]))
+
+    try:
+        with transaction.atomic():
+            if vote_storage() == STORAGE_BALLOTS:
+                created_votes = _store_in_ballot(voter, election_id, votes)
+            else:
+                created_votes = Vote.objects.bulk_create(votes)
+            first = _record_participation(voter, election_id, seats, len(created_votes))
+            if idempotency_key:
+                remember_response(
+                    voter, election_id, idempotency_key, 201, cast_success_body(len(created_votes)), request_hash
+                )
+    except IntegrityError:
+        _replay_stored_response(voter, idempotency_key, request_hash)
+        rejected = sorted(set(seats) & set(voted_post_counts(voter, election_id)))
+        if not rejected:
+            raise
+        raise BallotRejected(list(Post.objects.filter(id__in=rejected).order_by('id').values_list('id', 'title')))
+    except BallotRejected:
+        _replay_stored_response(voter, idempotency_key, request_hash)
+        raise
+    return created_votes, first
+
+
+def _replay_stored_response(voter, idempotency_key, request_hash):
+    """Raise IdempotentReplay if a request with the same key has stored its ballot first."""
+    if idempotency_key:
+        # A retry racing the request it repeats: that one has committed the key by now
+        replay = stored_response(voter, idempotency_key, request_hash)
+        if replay is not None:
+            raise IdempotentReplay(replay)
+
+
+def _record_participation(voter, election_id, seats, votes_cast):
+    """Record the voter's participation and whether this ballot completes it; True for their first ballot."""
+    schema = get_ballot_schema(election_id)
+    first = record_participation(voter, election_id, votes_cast, schema.is_complete(voter.house, seats))
+    if not first and not schema.is_complete(voter.house, seats):
+        # A ballot adding to an earlier one may complete the pair
+        if schema.is_complete(voter.house, voted_post_counts(voter, election_id)):
+            Participation.objects.filter(voter=voter, election_id=election_id).update(is_complete=True)
+    return first
+
+
+def _record_derived(accepted):
+    """Apply accepted ballots to the tallies, the turnout timeline, the ballot log and the data versions."""
+    votes_by_house = defaultdict(list)
+    buckets = defaultdict(lambda: [0, 0])
+    for voter, election_id, votes, first in accepted:
+        house = voter.house or ''
+        votes_by_house[house].extend(votes)
+        bucket = buckets[(election_id, house, votes[0].timestamp.replace(second=0, microsecond=0))]
+        # The timeline counts voters once, with their first ballot
+        bucket[0] += first
+        bucket[1] += len(votes)
+
+    for house, votes in votes_by_house.items():
+        record_votes(votes, house=house)
+    for (election_id, house, minute), (ballot_count, vote_count) in buckets.items():
+        record_timeline(house, election_id, vote_count, when=minute, ballots=ballot_count)
+
+    ballots_by_election = defaultdict(list)
+    for voter, election_id, votes, _ in accepted:
+        ballots_by_election[election_id].append((voter, votes))
+    for election_id, ballots in ballots_by_election.items():
+        append_to_ballot_log(election_id, ballots)
+        bump_version(election_key(election_id))
+        transaction.on_commit(lambda election_id=election_id: notify_results_changed(election_id))
+
+
+def _store_in_ballot(voter, election_id, votes):
+    """
+    Add the votes to the voter's Ballot row for the election, creating it if needed.
+    The INSERT comes first and the (voter, election) constraint decides between
+    concurrent first ballots; on SQLite it also takes the write lock before any
+    read, so racing requests wait for each other instead of failing as locked.
+    """
+    candidate_ids = [vote.candidate_id for vote in votes]
+    post_ids = {vote.post_id for vote in votes}
+    try:
+        with transaction.atomic():
+            Ballot.objects.create(
+                voter=voter, election_id=election_id, house=voter.house or '', selections=pack_selections(candidate_ids)
+            )
+    except IntegrityError:
+        # The voter already has a ballot; lock it, then it may be completed but never revisit a position
+        ballot = Ballot.objects.select_for_update().get(voter=voter, election_id=election_id)
+        rejected = sorted(set(voted_post_counts(voter, election_id)) & post_ids)
+        if not rejected:
+            ballot.selections = pack_selections(unpack_selections(ballot.selections) + candidate_ids)
+            ballot.save(update_fields=['selections'])
+    else:
+        # Votes stored as rows before the election was converted still count
+        rejected = sorted(set(Vote.objects.filter(voter=voter, post_id__in=post_ids).values_list('post_id', flat=True)))
+    if rejected:
+        raise BallotRejected(list(Post.objects.filter(id__in=rejected).order_by('id').values_list('id', 'title')))
+
+    now = timezone.now()
+    for vote in votes:
+        vote.timestamp = now
+    return votes
@@ -0,0 +1,36 @@
+import os
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+
+@contextmanager
+def throwaway_database(on_disk=False):
+    """
+    Run the block against a freshly migrated test database that is destroyed afterwards.
+    With on_disk=True a SQLite test database is a temporary file instead of in-memory,
+    so file sizes and cross-connection locking behave like production. Login
+    throttling is off, since benchmarks log in far faster than any voter would.
+    """
+    setup_test_environment(debug=False)
+    temp_dir = None
+    if on_disk and connection.vendor == 'sqlite':
+        temp_dir = tempfile.TemporaryDirectory()
+        connection.settings_dict['TEST']['NAME'] = os.path.join(temp_dir.name, 'bench.sqlite3')
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        with override_settings(LOGIN_THROTTLE={**getattr(settings, 'LOGIN_THROTTLE', {}), 'ENABLED': False}):
+            yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+        if temp_dir is not None:
+            temp_dir.cleanup()
+
+
+def database_profile():
+    """The DJANGO_DB_PROFILE the benchmark ran against, for its report."""
+    return getattr(settings, 'DATABASE_PROFILE', connection.vendor)
@@ -0,0 +1,89 @@
+"""
+A small closed-loop HTTP load generator for benchmarking a running server.
+
+Each worker thread keeps one keep-alive connection open and sends its next
+request as soon as the previous response has been read, so `concurrency` is the
+number of requests in flight at any time.
+"""
+import http.client
+import json
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from .stats import summarize
+
+
+class HttpTarget:
+    def __init__(self, base_url, timeout=30):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme or 'http'
+        self.host = parts.hostname or '127.0.0.1'
+        self.port = parts.port or (443 if self.scheme == 'https' else 80)
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+
+    def connect(self):
+        connection_class = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+        return connection_class(self.host, self.port, timeout=self.timeout)
+
+    def request(self, connection, method, path, body=None, headers=None):
+        """Send one request on `connection`; returns (status, body bytes)."""
+        headers = dict(headers or {})
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+        connection.request(method, self.prefix + path, body=payload, headers=headers)
+        response = connection.getresponse()
+        return response.status, response.read()
+
+
+def run_load(target, method, path, total, concurrency, body=None, headers=None, per_request=None):
+    """
+    Send `total` requests with `concurrency` workers and summarize them. They are
+    identical unless `per_request` gives a (body, headers) pair for each of them.
+    """
+    latencies = []
+    statuses = Counter()
+    errors = Counter()
+    lock = threading.Lock()
+    remaining = [total]
+
+    def worker():
+        connection = target.connect()
+        try:
+            while True:
+                with lock:
+                    if remaining[0] <= 0:
+                        return
+                    remaining[0] -= 1
+                    index = total - remaining[0] - 1
+                request_body, request_headers = per_request[index] if per_request else (body, headers)
+                started = time.perf_counter()
+                try:
+                    status, _ = target.request(connection, method, path, body=request_body, headers=request_headers)
+                except (OSError, http.client.HTTPException) as exc:
+                    connection.close()
+                    connection = target.connect()
+                    with lock:
+                        errors[type(exc).__name__] += 1
+                    continue
+                elapsed = time.perf_counter() - started
+                with lock:
+                    latencies.append(elapsed)
+                    statuses[status] += 1
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    summary = summarize(latencies, time.perf_counter() - started, statuses)
+    if errors:
+        summary['errors'] = dict(errors)
+    return summary
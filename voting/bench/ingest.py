@@ -0,0 +1,92 @@
+"""
+Concurrent ballot ingestion on the same synthetic election, once with every
+thread committing its own ballots and once through the group-commit writer.
+"""
+import random
+import threading
+import time
+from collections import Counter
+
+from django.db import connection
+from django.test.utils import override_settings
+
+from voting.ingest import INGEST_DIRECT, INGEST_GROUP, submit_ballot
+from voting.models import Ballot, Vote, Voter
+from voting.tallies import rebuild_tallies
+from .database import database_profile
+from .seed import random_ballot, seed_election
+from .stats import summarize
+
+
+def _ingest(ballots, election_id, concurrency):
+    latencies = []
+    errors = Counter()
+    lock = threading.Lock()
+    shares = [ballots[index::concurrency] for index in range(concurrency)]
+
+    def worker(share):
+        try:
+            for voter, selections in share:
+                started = time.perf_counter()
+                try:
+                    submit_ballot(voter, election_id, selections)
+                except Exception as exc:
+                    with lock:
+                        errors[f'{type(exc).__name__}: {exc}'[:80]] += 1
+                    continue
+                elapsed = time.perf_counter() - started
+                with lock:
+                    latencies.append(elapsed)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker, args=(share,)) for share in shares]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    summary = summarize(latencies, time.perf_counter() - started)
+    summary['errors'] = dict(errors)
+    return summary
+
+
+def run_ingest_bench(voters=2000, posts=8, candidates=4, concurrency=16, max_batch=64, max_delay_ms=5, seed=0,
+                     log=None):
+    log = log or (lambda message: None)
+    election = seed_election(voters=voters, posts=posts, candidates=candidates, seed=seed)
+    rng = random.Random(seed)
+    ballots = [
+        (voter, [(vote['post'], vote['candidate']) for vote in random_ballot(election, voter, rng)])
+        for voter in Voter.objects.order_by('id')
+    ]
+    log(f'Prepared {len(ballots)} ballots')
+
+    results = {}
+    for mode in (INGEST_DIRECT, INGEST_GROUP):
+        options = {'MODE': mode, 'MAX_BATCH': max_batch, 'MAX_DELAY_MS': max_delay_ms, 'TIMEOUT': 60}
+        with override_settings(VOTE_INGEST=options):
+            results[mode] = _ingest(ballots, election.id, concurrency)
+        stored = Voter.objects.filter(participations__election=election).count()
+        results[mode]['stored_ballots'] = stored
+        log(f'{mode}: {results[mode]["throughput_rps"]} ballots/s, p50 {results[mode]["p50_ms"]} ms, '
+            f'p99 {results[mode]["p99_ms"]} ms, {sum(results[mode]["errors"].values())} errors')
+
+        Vote.objects.filter(post__election=election).delete()
+        Ballot.objects.filter(election=election).delete()
+        rebuild_tallies(election)
+
+    return {
+        'database': connection.vendor,
+        'database_profile': database_profile(),
+        'parameters': {
+            'voters': voters,
+            'posts': posts,
+            'candidates': candidates,
+            'concurrency': concurrency,
+            'max_batch': max_batch,
+            'max_delay_ms': max_delay_ms,
+            'seed': seed,
+        },
+        'ingest': results,
+    }
@@ -0,0 +1,94 @@
+"""
+Voter login throughput with each way of storing PINs.
+
+Logins run one after another in this thread, so requests/s is what one core
+sustains. Every scheme goes through the real login endpoint; `verify_per_second`
+isolates the PIN check itself.
+"""
+import time
+
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.db import connection
+from django.test import Client
+
+from voting.models import Voter
+from voting.pins import hmac_pin_digest, pin_matches
+from .database import database_profile
+from .seed import seed_election
+from .stats import summarize
+
+
+PIN = '123456'
+SCHEMES = ['plaintext', 'hmac', 'pbkdf2']
+
+
+def _store_pins(scheme, voters):
+    if scheme == 'plaintext':
+        for voter in voters:
+            voter.pin, voter.pin_digest = PIN, ''
+    elif scheme == 'hmac':
+        for voter in voters:
+            voter.pin, voter.pin_digest = None, hmac_pin_digest(voter.id, PIN)
+    else:
+        # One salted hash for everyone: verifying it costs the same, and seeding stays fast
+        encoded = make_password(PIN, hasher='pbkdf2_sha256')
+        for voter in voters:
+            voter.pin, voter.pin_digest = None, encoded
+    Voter.objects.bulk_update(voters, ['pin', 'pin_digest'], batch_size=1000)
+
+
+def _verify_rate(voter, seconds=0.5):
+    count = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        if not pin_matches(voter, PIN):
+            raise AssertionError(f'PIN check failed for voter {voter.id}')
+        count += 1
+    return round(count / (time.perf_counter() - started), 1)
+
+
+def _logins(voters, iterations):
+    client = Client()
+    latencies = []
+    statuses = {}
+    started = time.perf_counter()
+    for i in range(iterations):
+        voter = voters[i % len(voters)]
+        begin = time.perf_counter()
+        response = client.post(
+            '/api/auth/voter/login/', {'voter_no': voter.voter_no, 'pin': PIN}, content_type='application/json'
+        )
+        latencies.append(time.perf_counter() - begin)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+    return summarize(latencies, time.perf_counter() - started, statuses)
+
+
+def run_pin_bench(voters=500, iterations=500, slow_iterations=20, schemes=None, log=None):
+    """
+    Measure voter logins with PINs stored in each scheme. PBKDF2 runs only
+    slow_iterations logins, since each one costs as much CPU as hundreds of the others.
+    """
+    log = log or (lambda message: None)
+    seed_election(voters=voters, posts=2, candidates=2, restricted_posts=0, multi_seat_posts=0)
+    bench_voters = list(Voter.objects.order_by('id'))
+
+    results = {}
+    for scheme in schemes or SCHEMES:
+        _store_pins(scheme, bench_voters)
+        result = _logins(bench_voters, slow_iterations if scheme == 'pbkdf2' else iterations)
+        result['verify_per_second'] = _verify_rate(Voter.objects.get(id=bench_voters[0].id))
+        results[scheme] = result
+        log(f'{scheme}: {result["throughput_rps"]} logins/s, p50 {result["p50_ms"]} ms, '
+            f'{result["verify_per_second"]} PIN checks/s')
+
+    return {
+        'database': connection.vendor,
+        'database_profile': database_profile(),
+        'parameters': {
+            'voters': voters,
+            'iterations': iterations,
+            'slow_iterations': slow_iterations,
+            'pbkdf2_iterations': get_hasher('pbkdf2_sha256').iterations,
+        },
+        'logins': results,
+    }
@@ -0,0 +1,63 @@
+import random
+
+from candidates.models import Candidate
+from posts.models import Election, Post, EligibleHouse
+from voting.ballot_schema import get_ballot_schema
+from voting.models import Voter
+
+
+HOUSES = [house for house, _ in Voter.HOUSE_CHOICES]
+
+
+def seed_election(voters=1000, posts=6, candidates=4, restricted_posts=2, multi_seat_posts=1, seed=0):
+    """
+    Create a synthetic active election with its voters.
+
+    The first `multi_seat_posts` positions need two selections; the last
+    `restricted_posts` positions are each open to a single house (round robin).
+    Voters are spread evenly over the houses and all get PIN 123456.
+    Returns the election.
+    """
+    rng = random.Random(seed)
+    election = Election.objects.create(title=f'Benchmark election {seed}', is_active=True)
+
+    for index in range(posts):
+        post = Post.objects.create(
+            election=election,
+            title=f'Position {index + 1}',
+            required_selections=2 if index < multi_seat_posts else 1,
+        )
+        Candidate.objects.bulk_create([
+            Candidate(
+                post=post,
+                name=f'Candidate {index + 1}.{number + 1}',
+                _class=rng.choice(['S1', 'S2', 'S3', 'S4', 'S5', 'S6']),
+                stream=rng.choice(['East', 'West', 'North', 'South']),
+                slogan='Benchmark',
+            )
+            for number in range(max(candidates, post.required_selections))
+        ])
+        if index >= posts - restricted_posts:
+            EligibleHouse.objects.create(post=post, house=HOUSES[index % len(HOUSES)])
+
+    Voter.objects.bulk_create([
+        Voter(
+            voter_no=f'BENCH{number:06d}',
+            full_name=f'Bench Voter {number}',
+            house=HOUSES[number % len(HOUSES)],
+            pin='123456',
+        )
+        for number in range(voters)
+    ], batch_size=1000)
+    return election
+
+
+def random_ballot(election, voter, rng):
+    """A complete valid ballot for the voter: the required number of distinct candidates per eligible position."""
+    ballot = []
+    eligible = get_ballot_schema(election.id).eligible_post_ids(voter.house)
+    posts = Post.objects.filter(election=election, id__in=eligible).prefetch_related('candidates').order_by('id')
+    for post in posts:
+        chosen = rng.sample(list(post.candidates.all()), post.required_selections)
+        ballot.extend({'post': post.id, 'candidate': candidate.id} for candidate in chosen)
+    return ballot
@@ -0,0 +1,27 @@
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list (0 for an empty one)."""
+    if not sorted_values:
+        return 0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, elapsed, statuses=None):
+    """
+    Latency percentiles (ms) and throughput of one measured run.
+    `latencies` are seconds per request, `elapsed` the wall time of the whole run.
+    """
+    ordered = sorted(latencies)
+    summary = {
+        'requests': len(ordered),
+        'seconds': round(elapsed, 3),
+        'throughput_rps': round(len(ordered) / elapsed, 1) if elapsed > 0 else 0,
+        'mean_ms': round(sum(ordered) / len(ordered) * 1000, 2) if ordered else 0,
+        'p50_ms': round(percentile(ordered, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(ordered, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(ordered, 0.99) * 1000, 2),
+        'max_ms': round(ordered[-1] * 1000, 2) if ordered else 0,
+    }
+    if statuses is not None:
+        summary['statuses'] = {str(code): count for code, count in sorted(statuses.items())}
+    return summary
@@ -0,0 +1,114 @@
+"""
+Compare the two vote storage layouts on the same synthetic election:
+ballot insert throughput through record_ballot() and the on-disk size of the
+vote tables (from SQLite's dbstat virtual table or PostgreSQL's size functions).
+"""
+import random
+import time
+
+from django.db import connection
+from django.test.utils import override_settings
+
+from voting.ballot_store import STORAGE_BALLOTS, STORAGE_ROWS
+from voting.ballots import record_ballot
+from voting.models import Ballot, Vote, Voter
+from voting.tallies import rebuild_tallies
+from .database import database_profile
+from .seed import random_ballot, seed_election
+
+
+VOTE_TABLES = {
+    STORAGE_ROWS: Vote._meta.db_table,
+    STORAGE_BALLOTS: Ballot._meta.db_table,
+}
+
+
+def _table_bytes(table):
+    """Bytes used by a table and its indexes, or None when the database cannot tell."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT pg_total_relation_size(%s)', [table])
+            return cursor.fetchone()[0]
+        if connection.vendor != 'sqlite':
+            return None
+        cursor.execute('VACUUM')
+        cursor.execute(
+            "SELECT SUM(d.pgsize) FROM dbstat d JOIN sqlite_master m ON d.name = m.name "
+            "WHERE m.tbl_name = %s",
+            [table],
+        )
+        return cursor.fetchone()[0] or 0
+
+
+def _database_bytes():
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT pg_database_size(current_database())')
+            return cursor.fetchone()[0]
+        if connection.vendor != 'sqlite':
+            return None
+        cursor.execute('VACUUM')
+        cursor.execute('PRAGMA page_count')
+        page_count = cursor.fetchone()[0]
+        cursor.execute('PRAGMA page_size')
+        return page_count * cursor.fetchone()[0]
+
+
+def run_storage_bench(voters=2000, posts=10, candidates=4, restricted_posts=2, multi_seat_posts=3, seed=0, log=None):
+    log = log or (lambda message: None)
+    election = seed_election(
+        voters=voters, posts=posts, candidates=candidates,
+        restricted_posts=restricted_posts, multi_seat_posts=multi_seat_posts, seed=seed,
+    )
+    rng = random.Random(seed)
+    ballots = [
+        (voter, [(vote['post'], vote['candidate']) for vote in random_ballot(election, voter, rng)])
+        for voter in Voter.objects.order_by('id')
+    ]
+    selections = sum(len(selection) for _, selection in ballots)
+    log(f'Prepared {len(ballots)} ballots with {selections} selections')
+
+    results = {}
+    for storage in (STORAGE_ROWS, STORAGE_BALLOTS):
+        database_before = _database_bytes()
+        with override_settings(VOTE_STORAGE=storage):
+            started = time.perf_counter()
+            for voter, selection in ballots:
+                record_ballot(voter, election.id, selection)
+            elapsed = time.perf_counter() - started
+
+        table_bytes = _table_bytes(VOTE_TABLES[storage])
+        database_after = _database_bytes()
+        results[storage] = {
+            'ballots': len(ballots),
+            'rows': Vote.objects.count() if storage == STORAGE_ROWS else Ballot.objects.count(),
+            'seconds': round(elapsed, 3),
+            'ballots_per_second': round(len(ballots) / elapsed, 1) if elapsed > 0 else 0,
+            'table_bytes': table_bytes,
+            'bytes_per_ballot': round(table_bytes / len(ballots), 1) if table_bytes is not None and ballots else None,
+            'database_growth_bytes': (
+                database_after - database_before if database_after is not None and database_before is not None else None
+            ),
+        }
+        log(f'{storage}: {results[storage]["ballots_per_second"]} ballots/s, '
+            f'{results[storage]["table_bytes"]} bytes in {VOTE_TABLES[storage]}')
+
+        # Start the other layout from an empty election
+        Vote.objects.filter(post__election=election).delete()
+        Ballot.objects.filter(election=election).delete()
+        rebuild_tallies(election)
+
+    return {
+        'database': connection.vendor,
+        'database_profile': database_profile(),
+        'parameters': {
+            'voters': voters,
+            'posts': posts,
+            'candidates': candidates,
+            'restricted_posts': restricted_posts,
+            'multi_seat_posts': multi_seat_posts,
+            'selections': selections,
+            'seed': seed,
+        },
+        'storage': results,
+    }
@@ -0,0 +1,304 @@
+"""
+Double-submission stress test.
+
+For every voter a group of threads is released at the same moment, each sending
+one ballot for that voter straight into the ASGI application (the same callable
+daphne serves, one ThreadSensitiveContext per request as under a real server).
+The races cover every way a voter can submit twice:
+
+- duplicate: the same full ballot from every thread; exactly one may be accepted.
+- conflicting: a different full ballot from every thread; exactly one may be accepted.
+- split: the positions of one ballot are dealt out to the threads, about half
+  of them to two threads; each position may be accepted at most once, and a
+  ballot whose positions no other thread sent must be accepted.
+
+Nothing here checks before inserting: the votes' (voter, post, seat) and the
+ballots' (voter, election) unique constraints serialize the races. Afterwards the
+stored votes of every voter must equal exactly what the accepted responses said,
+and the ballot log, the tallies and the participation rows must agree with them.
+"""
+import asyncio
+import json
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.core.asgi import get_asgi_application
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+
+from posts.models import Post
+from voting.audit import verify_ballot_log
+from voting.ballot_store import STORAGE_BALLOTS, STORAGE_ROWS, candidate_posts, iter_ballot_votes
+from voting.ingest import INGEST_DIRECT, INGEST_GROUP
+from voting.models import (
+    Ballot, BallotLogCheckpoint, BallotLogEntry, BallotLogHead, IdempotencyKey, Participation, Vote, Voter
+)
+from voting.tallies import rebuild_tallies
+from .database import database_profile
+from .seed import random_ballot, seed_election
+from .stats import summarize
+
+
+RACES = ['duplicate', 'conflicting', 'split']
+ENDPOINTS = {'sync': '/api/vote/cast/', 'async': '/api/async/vote/cast/'}
+STORAGES = [STORAGE_ROWS, STORAGE_BALLOTS]
+INGEST_MODES = [INGEST_DIRECT, INGEST_GROUP]
+MAX_REPORTED_VIOLATIONS = 50
+
+
+async def _never_disconnect():
+    await asyncio.Future()
+
+
+def asgi_post(application, path, body, token):
+    """POST a JSON body through an ASGI application in this thread; returns (status, parsed body)."""
+    payload = json.dumps(body).encode()
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'POST',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': [
+            (b'host', b'testserver'),
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(payload)).encode()),
+            (b'authorization', f'Bearer {token}'.encode()),
+        ],
+        'client': ('127.0.0.1', 0),
+        'server': ('testserver', 80),
+    }
+    messages = [{'type': 'http.request', 'body': payload, 'more_body': False}]
+    response = {'status': None, 'body': b''}
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        # Django listens for a disconnect while the view runs; the client never leaves
+        return await _never_disconnect()
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+        elif message['type'] == 'http.response.body':
+            response['body'] += message.get('body', b'')
+
+    asyncio.run(application(scope, receive, send))
+    try:
+        parsed = json.loads(response['body'] or b'null')
+    except ValueError:
+        parsed = None
+    return response['status'], parsed
+
+
+def _race_ballots(race, election, voter, attempts, rng):
+    """The ballots, as lists of {'post', 'candidate'}, that the threads of one race send."""
+    if race == 'duplicate':
+        return [random_ballot(election, voter, rng)] * attempts
+    if race == 'conflicting':
+        return [random_ballot(election, voter, rng) for _ in range(attempts)]
+
+    # split: deal the positions of one ballot out to the threads, about half of them to two threads
+    by_post = defaultdict(list)
+    for vote in random_ballot(election, voter, rng):
+        by_post[vote['post']].append(vote)
+    parts = [[] for _ in range(attempts)]
+    for index, votes in enumerate(by_post.values()):
+        owners = {index % attempts}
+        if rng.random() < 0.5:
+            owners.add(rng.randrange(attempts))
+        for owner in owners:
+            parts[owner].extend(votes)
+    return [part for part in parts if part]
+
+
+def _race(application, path, token, ballots):
+    """Release one thread per ballot at once; returns [(ballot, status, body, seconds)]."""
+    barrier = threading.Barrier(len(ballots))
+    outcomes = [None] * len(ballots)
+
+    def worker(index, ballot):
+        try:
+            barrier.wait()
+            started = time.perf_counter()
+            try:
+                status, body = asgi_post(application, path, {'votes': ballot}, token)
+            except Exception as exc:
+                status, body = None, f'{type(exc).__name__}: {exc}'[:80]
+            outcomes[index] = (ballot, status, body, time.perf_counter() - started)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker, args=(index, ballot)) for index, ballot in enumerate(ballots)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return outcomes
+
+
+def _selections(ballot):
+    return Counter((vote['post'], vote['candidate']) for vote in ballot)
+
+
+def _stored_selections(election):
+    """Map voter id -> Counter of (post id, candidate id) the database holds, from both stores."""
+    stored = defaultdict(Counter)
+    for voter_id, post_id, candidate_id in Vote.objects.filter(post__election=election).values_list(
+        'voter_id', 'post_id', 'candidate_id'
+    ):
+        stored[voter_id][(post_id, candidate_id)] += 1
+    posts_by_candidate = candidate_posts(election)
+    for ballot, candidate_id, post_id in iter_ballot_votes(Ballot.objects.filter(election=election), posts_by_candidate):
+        stored[ballot.voter_id][(post_id, candidate_id)] += 1
+    return stored
+
+
+def _check(election, races, accepted):
+    """Compare the stored state with the race outcomes; returns a list of violations."""
+    violations = []
+
+    def violation(message):
+        if len(violations) < MAX_REPORTED_VIOLATIONS:
+            violations.append(message)
+
+    for voter_id, (race, outcomes) in races.items():
+        statuses = Counter(status for _, status, _, _ in outcomes)
+        unexpected = {status: count for status, count in statuses.items() if status not in (201, 400)}
+        if unexpected:
+            violation(f'Voter {voter_id} ({race}): unexpected responses {unexpected}')
+        if race in ('duplicate', 'conflicting') and statuses[201] != 1 and not unexpected:
+            violation(f'Voter {voter_id} ({race}): {statuses[201]} ballots accepted instead of 1')
+        if race == 'split':
+            raced = Counter(post_id for ballot, _, _, _ in outcomes for post_id in {vote['post'] for vote in ballot})
+            for ballot, status, _, _ in outcomes:
+                if status == 400 and all(raced[vote['post']] == 1 for vote in ballot):
+                    violation(f'Voter {voter_id} (split): a ballot no other thread raced was rejected')
+
+    stored = _stored_selections(election)
+    required = dict(Post.objects.filter(election=election).values_list('id', 'required_selections'))
+    for voter_id in races:
+        if stored.get(voter_id, Counter()) != accepted.get(voter_id, Counter()):
+            violation(f'Voter {voter_id}: stored votes differ from the accepted ballots')
+        seats = Counter()
+        for (post_id, _), count in stored.get(voter_id, Counter()).items():
+            seats[post_id] += count
+        for post_id, count in seats.items():
+            if count > required[post_id]:
+                violation(f'Voter {voter_id}: {count} votes stored for position {post_id}')
+
+    participation = dict(Participation.objects.filter(election=election).values_list('voter_id', 'votes_cast'))
+    for voter_id, selections in stored.items():
+        if participation.get(voter_id) != sum(selections.values()):
+            violation(f'Voter {voter_id}: participation counts {participation.get(voter_id)} votes, '
+                      f'{sum(selections.values())} stored')
+    extra = set(participation) - set(stored)
+    if extra:
+        violation(f'{len(extra)} voters have a participation row but no votes')
+
+    report = verify_ballot_log(election, full=True)
+    violations.extend(f'Ballot log: {error}' for error in report['errors'][:MAX_REPORTED_VIOLATIONS])
+    return violations
+
+
+def reset_election(election):
+    """Remove every ballot of the election and everything derived from it."""
+    Vote.objects.filter(post__election=election).delete()
+    Ballot.objects.filter(election=election).delete()
+    IdempotencyKey.objects.filter(election=election).delete()
+    BallotLogEntry.objects.filter(election=election).delete()
+    BallotLogCheckpoint.objects.filter(election=election).delete()
+    BallotLogHead.objects.filter(election=election).delete()
+    rebuild_tallies(election)
+
+
+def run_stress(application, election, voters, attempts=8, storage=STORAGE_ROWS, ingest=INGEST_DIRECT,
+               endpoint='sync', tokens=None, seed=0):
+    """
+    Race attempts concurrent submissions for each of the voters, cycling through RACES,
+    with the given vote storage, ingestion mode and cast endpoint. tokens maps voter id
+    to an access token. Returns the summary, including the list of violations.
+    """
+    rng = random.Random(seed)
+    path = ENDPOINTS[endpoint]
+    races = {}
+    accepted = defaultdict(Counter)
+    latencies = []
+    statuses = Counter()
+    options = {'MODE': ingest, 'MAX_BATCH': 64, 'MAX_DELAY_MS': 5, 'TIMEOUT': 60}
+
+    started = time.perf_counter()
+    with override_settings(VOTE_STORAGE=storage, VOTE_INGEST=options):
+        for index, voter in enumerate(voters):
+            race = RACES[index % len(RACES)]
+            ballots = _race_ballots(race, election, voter, attempts, rng)
+            outcomes = _race(application, path, tokens[voter.id], ballots)
+            races[voter.id] = (race, outcomes)
+            for ballot, status, _, seconds in outcomes:
+                statuses[status] += 1
+                latencies.append(seconds)
+                if status == 201:
+                    accepted[voter.id].update(_selections(ballot))
+    elapsed = time.perf_counter() - started
+
+    with override_settings(VOTE_STORAGE=storage):
+        violations = _check(election, races, accepted)
+    summary = summarize(latencies, elapsed, statuses)
+    summary['races'] = dict(Counter(race for race, _ in races.values()))
+    summary['violations'] = violations
+    return summary
+
+
+def login_tokens(voters):
+    """Log the voters in through the login endpoint; returns voter id -> access token."""
+    client = Client()
+    tokens = {}
+    for voter in voters:
+        response = client.post(
+            '/api/auth/voter/login/', {'voter_no': voter.voter_no, 'pin': '123456'}, content_type='application/json'
+        )
+        tokens[voter.id] = response.json()['data']['access']
+    return tokens
+
+
+def run_stress_suite(voters=60, posts=4, candidates=4, attempts=8, storages=None, ingest_modes=None,
+                     endpoints=None, seed=0, log=None):
+    """Seed a synthetic election and run the races for every storage, ingestion mode and endpoint combination."""
+    log = log or (lambda message: None)
+    election = seed_election(voters=voters, posts=posts, candidates=candidates, restricted_posts=1,
+                             multi_seat_posts=1, seed=seed)
+    bench_voters = list(Voter.objects.order_by('id'))
+    tokens = login_tokens(bench_voters)
+    application = get_asgi_application()
+
+    results = {}
+    for storage in storages or STORAGES:
+        for ingest in ingest_modes or INGEST_MODES:
+            for endpoint in endpoints or list(ENDPOINTS):
+                name = f'{storage}/{ingest}/{endpoint}'
+                result = run_stress(application, election, bench_voters, attempts=attempts, storage=storage,
+                                    ingest=ingest, endpoint=endpoint, tokens=tokens, seed=seed)
+                results[name] = result
+                log(f'{name}: {result["requests"]} submissions in {result["seconds"]}s, '
+                    f'statuses {result["statuses"]}, {len(result["violations"])} violations')
+                reset_election(election)
+
+    return {
+        'database': connection.vendor,
+        'database_profile': database_profile(),
+        'parameters': {
+            'voters': voters,
+            'posts': posts,
+            'candidates': candidates,
+            'attempts': attempts,
+            'seed': seed,
+        },
+        'stress': results,
+    }
@@ -0,0 +1,170 @@
+"""
+In-process election-day benchmark.
+
+Every scenario drives the real URL configuration through Django's test client
+against a throwaway test database, so the numbers cover routing, auth,
+serialization and the ORM but not the network or the ASGI server.
+"""
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import django
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from voting.models import Voter
+from voting.results_cache import get_results_cache
+from .database import database_profile
+from .seed import random_ballot, seed_election
+from .stats import summarize
+
+
+SCENARIOS = ['voter_login', 'voter_status', 'positions', 'cast_bulk_votes', 'live_results', 'live_results_cold']
+
+
+class Scenario:
+    """One measured endpoint: `prepare(i)` runs untimed, `request(i)` is timed."""
+
+    def __init__(self, name, request, prepare=None):
+        self.name = name
+        self.request = request
+        self.prepare = prepare
+
+    def run(self, iterations, warmup):
+        for i in range(warmup):
+            self._call(i)
+
+        if self.prepare is not None:
+            self.prepare(warmup)
+        with CaptureQueriesContext(connection) as queries:
+            self.request(warmup)
+        query_count = len(queries)
+
+        latencies = []
+        statuses = {}
+        started = time.perf_counter()
+        for i in range(warmup + 1, warmup + 1 + iterations):
+            if self.prepare is not None:
+                self.prepare(i)
+            begin = time.perf_counter()
+            response = self.request(i)
+            latencies.append(time.perf_counter() - begin)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        elapsed = time.perf_counter() - started
+
+        summary = summarize(latencies, elapsed, statuses)
+        # Throughput counts only the timed requests, not the untimed preparation
+        summary['throughput_rps'] = round(len(latencies) / sum(latencies), 1) if latencies else 0
+        summary['queries'] = query_count
+        return summary
+
+    def _call(self, i):
+        if self.prepare is not None:
+            self.prepare(i)
+        return self.request(i)
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_suite(voters=1000, posts=6, candidates=4, restricted_posts=2, multi_seat_posts=1,
+              iterations=200, warmup=10, seed=0, scenarios=None, log=None):
+    """Seed a synthetic election in the current database and measure the selected scenarios."""
+    scenarios = scenarios or SCENARIOS
+    log = log or (lambda message: None)
+    needed = iterations + warmup + 1
+    if voters < needed:
+        raise ValueError(f'Need at least {needed} voters for {iterations} iterations and {warmup} warm-up requests.')
+
+    rng = random.Random(seed)
+    seeding_started = time.perf_counter()
+    election = seed_election(
+        voters=voters, posts=posts, candidates=candidates,
+        restricted_posts=restricted_posts, multi_seat_posts=multi_seat_posts, seed=seed,
+    )
+    log(f'Seeded {voters} voters and {posts} positions in {time.perf_counter() - seeding_started:.1f}s')
+
+    client = Client()
+    bench_voters = list(Voter.objects.order_by('voter_no')[:needed])
+    tokens = {}
+
+    def login(i):
+        voter = bench_voters[i]
+        response = client.post(
+            '/api/auth/voter/login/', {'voter_no': voter.voter_no, 'pin': '123456'}, content_type='application/json'
+        )
+        if response.status_code == 200:
+            tokens[i] = response.json()['data']['access']
+        return response
+
+    def ensure_token(i):
+        if i not in tokens:
+            login(i)
+
+    def auth(i):
+        return {'HTTP_AUTHORIZATION': f'Bearer {tokens[i]}'}
+
+    ballots = {}
+
+    def prepare_cast(i):
+        ensure_token(i)
+        ballots[i] = random_ballot(election, bench_voters[i], rng)
+
+    measured = [
+        Scenario('voter_login', login),
+        Scenario('voter_status', lambda i: client.get('/api/voter/status/', **auth(i)), prepare=ensure_token),
+        Scenario('positions', lambda i: client.get('/api/positions/', **auth(i)), prepare=ensure_token),
+        Scenario(
+            'cast_bulk_votes',
+            lambda i: client.post('/api/vote/cast/', {'votes': ballots[i]}, content_type='application/json', **auth(i)),
+            prepare=prepare_cast,
+        ),
+        Scenario('live_results', lambda i: client.get('/api/results/live/')),
+        Scenario(
+            'live_results_cold',
+            lambda i: client.get('/api/results/live/'),
+            prepare=lambda i: get_results_cache().clear(),
+        ),
+    ]
+
+    results = {}
+    for scenario in measured:
+        if scenario.name not in scenarios:
+            continue
+        results[scenario.name] = scenario.run(iterations, warmup)
+        log(f'{scenario.name}: {results[scenario.name]["throughput_rps"]} req/s, '
+            f'p50 {results[scenario.name]["p50_ms"]} ms, p99 {results[scenario.name]["p99_ms"]} ms')
+
+    return {
+        'meta': {
+            'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'git_revision': _git_revision(),
+            'python': sys.version.split()[0],
+            'django': django.get_version(),
+            'platform': platform.platform(),
+            'database': connection.vendor,
+            'database_profile': database_profile(),
+        },
+        'parameters': {
+            'voters': voters,
+            'posts': posts,
+            'candidates': candidates,
+            'restricted_posts': restricted_posts,
+            'multi_seat_posts': multi_seat_posts,
+            'iterations': iterations,
+            'warmup': warmup,
+            'seed': seed,
+        },
+        'scenarios': results,
+    }
@@ -0,0 +1,101 @@
+"""
+Idempotency-Key support for ballot submission.
+
+Clients may send an Idempotency-Key header with a cast request. The 201 response
+of an accepted ballot is stored under (voter, key) in the same transaction as the
+ballot itself, so a retried request is answered from that row with one indexed
+lookup and is never validated or cast again. A retry that arrives while the
+first request is still being cast runs into the same row's unique constraint
+and replays it too (IdempotentReplay). Rejected requests are not stored: they
+changed nothing, and a retry simply runs again.
+
+A hash of the request body is stored with the key, and a key reused with a
+different body is refused with 422 instead of replaying the other request.
+"""
+import hashlib
+import json
+
+from .models import IdempotencyKey
+
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = IdempotencyKey._meta.get_field('key').max_length
+
+INVALID_KEY_BODY = {
+    'success': False,
+    'message': f'The {IDEMPOTENCY_HEADER} header must be between 1 and {MAX_KEY_LENGTH} characters.'
+}
+
+KEY_REUSED_STATUS = 422
+KEY_REUSED_BODY = {
+    'success': False,
+    'message': f'This {IDEMPOTENCY_HEADER} has already been used with a different request body.'
+}
+
+
+class IdempotentReplay(Exception):
+    """Another request with the same key stored its ballot first; answer with its (status_code, body, headers)."""
+
+    def __init__(self, response):
+        self.status_code, self.body, self.headers = response
+        super().__init__(self.status_code)
+
+
+def get_idempotency_key(request):
+    """Read the request's Idempotency-Key header; returns (key or None, error body or None)."""
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if key is None:
+        return None, None
+    key = key.strip()
+    if not key or len(key) > MAX_KEY_LENGTH:
+        return None, INVALID_KEY_BODY
+    return key, None
+
+
+def request_hash(data):
+    """SHA-256 of a parsed request body, independent of key order and formatting."""
+    canonical = json.dumps(data, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _replay(row, body_hash):
+    if row is None:
+        return None
+    status_code, body, stored_hash = row
+    # Keys stored before request hashes were recorded have none to compare
+    if stored_hash and body_hash and stored_hash != body_hash:
+        return KEY_REUSED_STATUS, KEY_REUSED_BODY, {}
+    return status_code, body, {REPLAYED_HEADER: 'true'}
+
+
+def _stored(voter, key):
+    return IdempotencyKey.objects.filter(voter=voter, key=key).values_list('status_code', 'response', 'request_hash')
+
+
+def stored_response(voter, key, body_hash=''):
+    """
+    The (status_code, body, headers) to answer a request carrying a key the voter
+    has already used, or None: the stored response, or 422 if the body differs.
+    """
+    return _replay(_stored(voter, key).first(), body_hash)
+
+
+async def astored_response(voter, key, body_hash=''):
+    return _replay(await _stored(voter, key).afirst(), body_hash)
+
+
+def remember_response(voter, election_id, key, status_code, body, body_hash=''):
+    """Store a response under the voter's key; must run inside the ballot's transaction."""
+    IdempotencyKey.objects.create(
+        voter=voter, election_id=election_id, key=key, status_code=status_code, response=body,
+        request_hash=body_hash,
+    )
+
+
+def cast_success_body(votes_count):
+    return {
+        'success': True,
+        'message': f'{votes_count} votes cast successfully',
+        'votes_count': votes_count
+    }
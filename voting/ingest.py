@@ -0,0 +1,163 @@
+"""
+Ballot ingestion.
+
+By default each request writes its own ballot (record_ballot in the request
+thread). With VOTE_INGEST['MODE'] = 'group', validated ballots are handed to one
+writer thread per process that commits them in grouped transactions: a group
+closes after MAX_BATCH ballots or MAX_DELAY_MS milliseconds, whichever comes
+first. SQLite then sees one writer instead of a crowd fighting for the lock, and
+the tally, timeline and version updates are applied once per group rather than
+once per ballot (see record_ballots()).
+submit_ballot() only returns once the transaction holding its ballot has
+committed, so a 201 still means the ballot is stored.
+"""
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from .ballots import record_ballot, record_ballots
+
+
+logger = logging.getLogger(__name__)
+
+INGEST_DIRECT = 'direct'
+INGEST_GROUP = 'group'
+
+
+def _options():
+    options = {'MODE': INGEST_DIRECT, 'MAX_BATCH': 64, 'MAX_DELAY_MS': 5, 'TIMEOUT': 30}
+    options.update(getattr(settings, 'VOTE_INGEST', {}))
+    return options
+
+
+class IngestTimeout(Exception):
+    """The writer did not confirm the ballot in time; its outcome is unknown to the caller."""
+
+
+INGEST_TIMEOUT_BODY = {
+    'success': False,
+    'message': 'Your ballot could not be confirmed in time. Please check your voting status before trying again.'
+}
+
+
+class _PendingBallot:
+    def __init__(self, voter, election_id, selections, idempotency_key=None, request_hash=''):
+        self.voter = voter
+        self.election_id = election_id
+        self.selections = selections
+        self.idempotency_key = idempotency_key
+        self.request_hash = request_hash
+        self.done = threading.Event()
+        self.votes = None
+        self.error = None
+
+
+class GroupCommitWriter:
+    """A single writer thread committing queued ballots in grouped transactions."""
+
+    def __init__(self, max_batch=64, max_delay=0.005):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.queue = queue.Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+        self.stats = {'groups': 0, 'ballots': 0}
+
+    def submit(self, voter, election_id, selections, idempotency_key=None, request_hash='', timeout=30):
+        """Queue a ballot and wait until its group has committed; returns the votes or raises."""
+        pending = _PendingBallot(voter, election_id, selections, idempotency_key, request_hash)
+        self._ensure_running()
+        self.queue.put(pending)
+        if not pending.done.wait(timeout):
+            raise IngestTimeout(f'Ballot of voter {voter.pk} was not confirmed within {timeout}s')
+        if pending.error is not None:
+            raise pending.error
+        return pending.votes
+
+    def _ensure_running(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name='ballot-group-commit', daemon=True)
+                self.thread.start()
+
+    def _next_group(self):
+        group = [self.queue.get()]
+        deadline = time.monotonic() + self.max_delay
+        while len(group) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                group.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return group
+
+    def _run(self):
+        try:
+            while True:
+                group = self._next_group()
+                try:
+                    self._commit_group(group)
+                except Exception:
+                    # The group transaction failed as a whole; retry its ballots one by one
+                    logger.exception('Group commit of %d ballots failed, retrying individually', len(group))
+                    connection.close_if_unusable_or_obsolete()
+                    for pending in group:
+                        pending.votes, pending.error = None, None
+                        try:
+                            self._commit_group([pending])
+                        except Exception as exc:
+                            pending.error = exc
+                finally:
+                    for pending in group:
+                        pending.done.set()
+                self.stats['groups'] += 1
+                self.stats['ballots'] += len(group)
+        finally:
+            connection.close()
+
+    def _commit_group(self, group):
+        results = record_ballots([
+            (pending.voter, pending.election_id, pending.selections, pending.idempotency_key, pending.request_hash)
+            for pending in group
+        ])
+        for pending, result in zip(group, results):
+            if isinstance(result, Exception):
+                pending.error = result
+            else:
+                pending.votes = result
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                options = _options()
+                _writer = GroupCommitWriter(
+                    max_batch=options['MAX_BATCH'], max_delay=options['MAX_DELAY_MS'] / 1000
+                )
+    return _writer
+
+
+def submit_ballot(voter, election_id, selections, idempotency_key=None, request_hash=''):
+    """
+    Store an accepted ballot with the configured ingestion mode.
+    Same contract as record_ballot(): returns the votes or raises BallotRejected, IdempotentReplay
+    or VoterNotFound.
+    """
+    options = _options()
+    if options['MODE'] != INGEST_GROUP:
+        return record_ballot(voter, election_id, selections, idempotency_key, request_hash)
+    return get_writer().submit(
+        voter, election_id, selections, idempotency_key, request_hash, timeout=options['TIMEOUT']
+    )
@@ -0,0 +1,67 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.models import Election
+from voting.audit import verify_ballot_log
+
+
+class Command(BaseCommand):
+    help = (
+        'Verify the hash-chained ballot log of one or all elections against its signed checkpoints, '
+        'its head and the maintained candidate tallies.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--election',
+            type=int,
+            help='Only verify the election with this id (default: every election with a ballot log)',
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Walk the whole log from the first entry instead of resuming from the last checkpoint',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='Log entries fetched per database round trip (default: 2000)',
+        )
+        parser.add_argument('-o', '--output', help='Also write the reports as JSON to this file')
+
+    def handle(self, *args, **options):
+        if options['election'] is not None:
+            elections = Election.objects.filter(pk=options['election'])
+            if not elections.exists():
+                raise CommandError(f'Election with id {options["election"]} does not exist')
+        else:
+            elections = Election.objects.filter(ballot_log_head__isnull=False).order_by('id')
+
+        reports = []
+        for election in elections:
+            report = verify_ballot_log(
+                election, full=options['full'], chunk_size=options['chunk_size'], log=self.stdout.write
+            )
+            reports.append(report)
+            if report['entries']:
+                summary = (
+                    f'Election "{election.title}": {report["mode"]} check of {report["entries"]} entries '
+                    f'(#{report["from_seq"] + 1} to #{report["to_seq"]}) in {report["seconds"]}s, '
+                    f'{report["entries_per_second"]} entries/s'
+                )
+            else:
+                summary = f'Election "{election.title}": no entries after checkpoint #{report["from_seq"]}'
+            if report['errors']:
+                self.stdout.write(self.style.ERROR(f'{summary}: FAILED'))
+                for error in report['errors']:
+                    self.stdout.write(self.style.ERROR(f'  {error}'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'{summary}: OK, tally digest {report["tally_digest"]}'))
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(reports, f, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f'Wrote audit reports to {options["output"]}'))
+
+        if any(report['errors'] for report in reports):
+            raise CommandError('The ballot log failed verification')
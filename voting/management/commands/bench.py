@@ -0,0 +1,62 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from voting.bench.database import throwaway_database
+from voting.bench.suite import SCENARIOS, run_suite
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a synthetic election in a throwaway test database and measure latency and throughput '
+        'of the election-day endpoints. Writes a JSON report that can be diffed between releases.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--voters', type=int, default=1000, help='Number of voters to seed (default: 1000)')
+        parser.add_argument('--posts', type=int, default=6, help='Number of positions (default: 6)')
+        parser.add_argument('--candidates', type=int, default=4, help='Candidates per position (default: 4)')
+        parser.add_argument(
+            '--restricted-posts', type=int, default=2,
+            help='Positions open to a single house only (default: 2)',
+        )
+        parser.add_argument(
+            '--multi-seat-posts', type=int, default=1,
+            help='Positions that need two selections (default: 1)',
+        )
+        parser.add_argument('--iterations', type=int, default=200, help='Timed requests per scenario (default: 200)')
+        parser.add_argument('--warmup', type=int, default=10, help='Untimed requests per scenario (default: 10)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the synthetic data (default: 0)')
+        parser.add_argument(
+            '--scenario', action='append', choices=SCENARIOS,
+            help='Only run this scenario (repeatable; default: all)',
+        )
+        parser.add_argument(
+            '-o', '--output', default='bench-report.json',
+            help='Output file for the JSON report (default: bench-report.json)',
+        )
+
+    def handle(self, *args, **options):
+        if options['restricted_posts'] + options['multi_seat_posts'] > options['posts']:
+            raise CommandError('--restricted-posts plus --multi-seat-posts cannot exceed --posts')
+
+        try:
+            with throwaway_database():
+                report = run_suite(
+                    voters=options['voters'],
+                    posts=options['posts'],
+                    candidates=options['candidates'],
+                    restricted_posts=options['restricted_posts'],
+                    multi_seat_posts=options['multi_seat_posts'],
+                    iterations=options['iterations'],
+                    warmup=options['warmup'],
+                    seed=options['seed'],
+                    scenarios=options['scenario'],
+                    log=self.stdout.write,
+                )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        with open(options['output'], 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        self.stdout.write(self.style.SUCCESS(f'Wrote benchmark report to {options["output"]}'))
@@ -0,0 +1,151 @@
+import json
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from voting.bench.http_load import HttpTarget, run_load
+from voting.bench.seed import random_ballot, seed_election
+from voting.bench.stress import reset_election
+from voting.models import Voter
+
+
+# (name, method, sync path, async path, needs token, body)
+ENDPOINTS = [
+    ('voter_login', 'POST', '/api/auth/voter/login/', '/api/async/auth/voter/login/', False, 'credentials'),
+    ('voter_status', 'GET', '/api/voter/status/', '/api/async/voter/status/', True, None),
+    ('live_results', 'GET', '/api/results/live/', '/api/async/results/live/', False, None),
+    # Each request casts a full ballot for a different seeded voter
+    ('cast_bulk_votes', 'POST', '/api/vote/cast/', '/api/async/vote/cast/', True, 'ballots'),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare concurrent-request throughput and latency of the sync API views with their '
+        'async-native versions on a running server (e.g. daphne core.asgi:application). '
+        'Start the server with DJANGO_LOGIN_THROTTLE=0, or the voter_login runs are throttled. '
+        'cast_bulk_votes needs --seed-voters, which seeds a benchmark election in the database this '
+        'command is configured with; it must be the server\'s database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000', help='Server to benchmark')
+        parser.add_argument('--voter-no', help='Voter number used to log in (default: the first seeded voter)')
+        parser.add_argument('--pin', help='PIN of that voter')
+        parser.add_argument(
+            '--seed-voters',
+            type=int,
+            default=0,
+            help='Seed a benchmark election (it becomes the active one) with this many voters and cast '
+                 'real ballots from them; their ballots are removed between runs (default: 0, no casting)',
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the seeded election and ballots')
+        parser.add_argument('--concurrency', type=int, default=32, help='Requests in flight at once (default: 32)')
+        parser.add_argument('--requests', type=int, default=1000, help='Requests per endpoint and variant (default: 1000)')
+        parser.add_argument(
+            '--endpoint',
+            action='append',
+            choices=[name for name, *_ in ENDPOINTS],
+            help='Only benchmark this endpoint (repeatable; default: all)',
+        )
+        parser.add_argument('--output', help='Also write the results as JSON to this file')
+
+    def handle(self, *args, **options):
+        target = HttpTarget(options['base_url'])
+        selected = options['endpoint']
+        election = None
+        cast_voters = []
+        if options['seed_voters']:
+            if options['seed_voters'] <= options['requests']:
+                raise CommandError('--seed-voters must exceed --requests: every cast needs its own voter.')
+            try:
+                election = seed_election(voters=options['seed_voters'], seed=options['seed'])
+            except IntegrityError:
+                raise CommandError('Benchmark voters are already seeded in this database; use a fresh one.')
+            seeded = list(Voter.objects.filter(voter_no__startswith='BENCH').order_by('voter_no'))
+            if not options['voter_no']:
+                options['voter_no'], options['pin'] = seeded[0].voter_no, '123456'
+            cast_voters = [voter for voter in seeded if voter.voter_no != options['voter_no']][:options['requests']]
+            self.stdout.write(f'Seeded {options["seed_voters"]} voters in "{election.title}"')
+        elif not selected or 'cast_bulk_votes' in selected:
+            self.stdout.write(self.style.WARNING('Skipping cast_bulk_votes: it needs --seed-voters.'))
+        if not options['voter_no'] or not options['pin']:
+            raise CommandError('Give --voter-no and --pin, or --seed-voters.')
+        credentials = {'voter_no': options['voter_no'], 'pin': options['pin']}
+
+        token = self.login(target, options['base_url'], credentials)
+        ballots = None
+        if cast_voters and (not selected or 'cast_bulk_votes' in selected):
+            ballots = self.cast_requests(target, options['base_url'], election, cast_voters, options['seed'])
+
+        results = {}
+        for name, method, sync_path, async_path, needs_token, body in ENDPOINTS:
+            if selected and name not in selected:
+                continue
+            if body == 'ballots' and ballots is None:
+                continue
+            headers = {'Authorization': f'Bearer {token}'} if needs_token else None
+            body = credentials if body == 'credentials' else body
+
+            results[name] = {}
+            for variant, path in (('sync', sync_path), ('async', async_path)):
+                # Warm up connections, caches and the ORM before measuring
+                warmup = min(options['concurrency'], options['requests'])
+                per_request = ballots[:warmup] if body == 'ballots' else None
+                run_load(target, method, path, warmup, options['concurrency'], body=body, headers=headers,
+                         per_request=per_request)
+                if body == 'ballots':
+                    reset_election(election)
+                results[name][variant] = run_load(
+                    target, method, path, options['requests'], options['concurrency'], body=body, headers=headers,
+                    per_request=ballots if body == 'ballots' else None,
+                )
+                if body == 'ballots':
+                    reset_election(election)
+
+            sync, async_ = results[name]['sync'], results[name]['async']
+            speedup = async_['throughput_rps'] / sync['throughput_rps'] if sync['throughput_rps'] else 0
+            self.stdout.write(f'{name}:')
+            for variant, summary in (('sync', sync), ('async', async_)):
+                self.stdout.write(
+                    f'  {variant:<5} {summary["throughput_rps"]:>8} req/s  p50 {summary["p50_ms"]} ms  '
+                    f'p95 {summary["p95_ms"]} ms  p99 {summary["p99_ms"]} ms  statuses {summary["statuses"]}'
+                )
+            self.stdout.write(self.style.SUCCESS(f'  async/sync throughput: {speedup:.2f}x'))
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({
+                    'base_url': options['base_url'],
+                    'concurrency': options['concurrency'],
+                    'requests': options['requests'],
+                    'results': results,
+                }, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Wrote results to {options["output"]}'))
+
+    def login(self, target, base_url, credentials):
+        """Log a voter in on the server; returns the access token."""
+        connection = target.connect()
+        try:
+            status, body = target.request(connection, 'POST', '/api/auth/voter/login/', body=credentials)
+        except OSError as exc:
+            raise CommandError(f'Could not reach {base_url}: {exc}')
+        finally:
+            connection.close()
+        if status != 200:
+            raise CommandError(
+                f'Login of {credentials["voter_no"]} failed with HTTP {status}; '
+                f'use a voter who has not voted for every position yet.'
+            )
+        return json.loads(body)['data']['access']
+
+    def cast_requests(self, target, base_url, election, voters, seed):
+        """Log the voters in and pair each with a full random ballot: one (body, headers) per cast."""
+        rng = random.Random(seed)
+        requests = []
+        for voter in voters:
+            token = self.login(target, base_url, {'voter_no': voter.voter_no, 'pin': '123456'})
+            requests.append(({'votes': random_ballot(election, voter, rng)}, {'Authorization': f'Bearer {token}'}))
+        self.stdout.write(f'Logged in {len(requests)} voters to cast from')
+        return requests
@@ -0,0 +1,46 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from voting.bench.database import throwaway_database
+from voting.bench.ingest import run_ingest_bench
+
+
+class Command(BaseCommand):
+    help = (
+        'Cast ballots from concurrent threads into a throwaway on-disk database, once with direct '
+        'commits and once through the group-commit writer, and compare ballots/s and latency.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--voters', type=int, default=2000, help='Number of voters / ballots (default: 2000)')
+        parser.add_argument('--posts', type=int, default=8, help='Number of positions (default: 8)')
+        parser.add_argument('--candidates', type=int, default=4, help='Candidates per position (default: 4)')
+        parser.add_argument('--concurrency', type=int, default=16, help='Concurrent submitting threads (default: 16)')
+        parser.add_argument('--max-batch', type=int, default=64, help='Group size limit (default: 64)')
+        parser.add_argument('--max-delay-ms', type=float, default=5, help='Group time limit in ms (default: 5)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+        parser.add_argument('-o', '--output', help='Also write the results as JSON to this file')
+
+    def handle(self, *args, **options):
+        with throwaway_database(on_disk=True):
+            report = run_ingest_bench(
+                voters=options['voters'],
+                posts=options['posts'],
+                candidates=options['candidates'],
+                concurrency=options['concurrency'],
+                max_batch=options['max_batch'],
+                max_delay_ms=options['max_delay_ms'],
+                seed=options['seed'],
+                log=self.stdout.write,
+            )
+
+        direct, group = report['ingest']['direct'], report['ingest']['group']
+        if direct['throughput_rps']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Group commit ingests {group["throughput_rps"] / direct["throughput_rps"]:.2f}x the ballots/s of direct commits.'
+            ))
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f'Wrote results to {options["output"]}'))
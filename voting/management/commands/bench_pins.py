@@ -0,0 +1,41 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from voting.bench.database import throwaway_database
+from voting.bench.pins import SCHEMES, run_pin_bench
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure voter logins per second on one core with PINs stored in plaintext, as a keyed '
+        'HMAC digest and as a PBKDF2 password hash, in a throwaway test database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--voters', type=int, default=500, help='Number of voters to seed (default: 500)')
+        parser.add_argument('--iterations', type=int, default=500, help='Timed logins per scheme (default: 500)')
+        parser.add_argument(
+            '--slow-iterations', type=int, default=20,
+            help='Timed logins with PBKDF2, which is far slower (default: 20)',
+        )
+        parser.add_argument(
+            '--scheme', action='append', choices=SCHEMES,
+            help='Only measure this scheme (repeatable; default: all)',
+        )
+        parser.add_argument('-o', '--output', help='Also write the results as JSON to this file')
+
+    def handle(self, *args, **options):
+        with throwaway_database():
+            report = run_pin_bench(
+                voters=options['voters'],
+                iterations=options['iterations'],
+                slow_iterations=options['slow_iterations'],
+                schemes=options['scheme'],
+                log=self.stdout.write,
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f'Wrote results to {options["output"]}'))
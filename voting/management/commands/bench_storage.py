@@ -0,0 +1,45 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from voting.bench.database import throwaway_database
+from voting.bench.storage import run_storage_bench
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare insert throughput and database size of row-per-vote and compact ballot storage '
+        'on a synthetic election in a throwaway test database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--voters', type=int, default=2000, help='Number of voters / ballots (default: 2000)')
+        parser.add_argument('--posts', type=int, default=10, help='Number of positions (default: 10)')
+        parser.add_argument('--candidates', type=int, default=4, help='Candidates per position (default: 4)')
+        parser.add_argument('--restricted-posts', type=int, default=2, help='Single-house positions (default: 2)')
+        parser.add_argument('--multi-seat-posts', type=int, default=3, help='Two-seat positions (default: 3)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+        parser.add_argument('-o', '--output', help='Also write the results as JSON to this file')
+
+    def handle(self, *args, **options):
+        with throwaway_database(on_disk=True):
+            report = run_storage_bench(
+                voters=options['voters'],
+                posts=options['posts'],
+                candidates=options['candidates'],
+                restricted_posts=options['restricted_posts'],
+                multi_seat_posts=options['multi_seat_posts'],
+                seed=options['seed'],
+                log=self.stdout.write,
+            )
+
+        rows, ballots = report['storage']['rows'], report['storage']['ballots']
+        if rows['table_bytes'] and ballots['table_bytes']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Ballot storage uses {ballots["table_bytes"] / rows["table_bytes"]:.0%} of the row storage size '
+                f'and inserts at {ballots["ballots_per_second"] / rows["ballots_per_second"]:.2f}x the rate.'
+            ))
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f'Wrote results to {options["output"]}'))
@@ -0,0 +1,146 @@
+from collections import Counter, defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max, Min
+
+from posts.models import Election
+from voting.ballot_store import (
+    STORAGE_BALLOTS, STORAGE_ROWS, candidate_posts, pack_selections, unpack_selections, vote_storage
+)
+from voting.models import Ballot, Vote
+from voting.tallies import rebuild_tallies
+
+
+class Command(BaseCommand):
+    help = 'Convert stored votes between per-selection Vote rows and compact per-voter Ballot rows.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--to',
+            choices=[STORAGE_BALLOTS, STORAGE_ROWS],
+            required=True,
+            help='Target storage layout',
+        )
+        parser.add_argument(
+            '--election',
+            type=int,
+            help='Only convert the votes of the election with this id (default: all elections)',
+        )
+
+    def handle(self, *args, **options):
+        election = None
+        if options['election'] is not None:
+            try:
+                election = Election.objects.get(pk=options['election'])
+            except Election.DoesNotExist:
+                raise CommandError(f'Election with id {options["election"]} does not exist')
+
+        scope = f'election "{election.title}"' if election else 'all elections'
+        self.stdout.write(f'Converting votes of {scope} to {options["to"]} storage...')
+
+        with transaction.atomic():
+            if options['to'] == STORAGE_BALLOTS:
+                converted, written = self.rows_to_ballots(election)
+                self.stdout.write(self.style.SUCCESS(
+                    f'Successfully packed {converted} votes into {written} ballots.'
+                ))
+            else:
+                converted, written = self.ballots_to_rows(election)
+                self.stdout.write(self.style.SUCCESS(
+                    f'Successfully unpacked {converted} ballots into {written} votes.'
+                ))
+            rebuild_tallies(election)
+
+        if vote_storage() != options['to']:
+            self.stdout.write(self.style.WARNING(
+                f'VOTE_STORAGE is "{vote_storage()}"; set DJANGO_VOTE_STORAGE={options["to"]} '
+                f'so new ballots use the same layout.'
+            ))
+
+    def rows_to_ballots(self, election):
+        votes = Vote.objects.all()
+        if election is not None:
+            votes = votes.filter(post__election=election)
+
+        selections = defaultdict(list)
+        houses = {}
+        for voter_id, election_id, house, candidate_id in votes.order_by('voter_id', 'post_id', 'seat').values_list(
+            'voter_id', 'post__election_id', 'voter__house', 'candidate_id'
+        ):
+            selections[(voter_id, election_id)].append(candidate_id)
+            houses[(voter_id, election_id)] = house or ''
+        first_votes = {
+            (row['voter_id'], row['post__election_id']): row['first_vote']
+            for row in votes.values('voter_id', 'post__election_id').annotate(first_vote=Min('timestamp')).order_by()
+        }
+
+        existing = {
+            (ballot.voter_id, ballot.election_id): ballot
+            for ballot in Ballot.objects.filter(
+                election_id__in={election_id for _, election_id in selections}
+            ).select_for_update()
+        }
+        new_ballots = []
+        updated_ballots = []
+        for key, candidate_ids in selections.items():
+            ballot = existing.get(key)
+            if ballot is None:
+                new_ballots.append(Ballot(
+                    voter_id=key[0], election_id=key[1], house=houses[key], selections=pack_selections(candidate_ids)
+                ))
+            else:
+                ballot.selections = pack_selections(unpack_selections(ballot.selections) + candidate_ids)
+                updated_ballots.append(ballot)
+
+        created = Ballot.objects.bulk_create(new_ballots, batch_size=500)
+        # created_at defaults to now; keep the time of the voter's first vote instead
+        for ballot in created:
+            ballot.created_at = first_votes[(ballot.voter_id, ballot.election_id)]
+        Ballot.objects.bulk_update(created, ['created_at'], batch_size=500)
+        Ballot.objects.bulk_update(updated_ballots, ['selections'], batch_size=500)
+
+        converted = sum(len(candidate_ids) for candidate_ids in selections.values())
+        votes.delete()
+        return converted, len(created) + len(updated_ballots)
+
+    def ballots_to_rows(self, election):
+        ballots = Ballot.objects.all()
+        if election is not None:
+            ballots = ballots.filter(election=election)
+        ballots = list(ballots)
+
+        posts_by_candidate = candidate_posts(election)
+
+        # Continue the seat numbering of any votes already stored as rows
+        seats = Counter({
+            (row['voter_id'], row['post_id']): row['last_seat']
+            for row in Vote.objects.filter(voter_id__in={ballot.voter_id for ballot in ballots})
+                                   .values('voter_id', 'post_id')
+                                   .annotate(last_seat=Max('seat'))
+                                   .order_by()
+        })
+        new_votes = []
+        for ballot in ballots:
+            for candidate_id in unpack_selections(ballot.selections):
+                post_id = posts_by_candidate.get(candidate_id)
+                if post_id is None:
+                    continue
+                seats[(ballot.voter_id, post_id)] += 1
+                new_votes.append(Vote(
+                    voter_id=ballot.voter_id,
+                    post_id=post_id,
+                    candidate_id=candidate_id,
+                    seat=seats[(ballot.voter_id, post_id)],
+                    timestamp=ballot.created_at,
+                ))
+
+        # auto_now_add overrides the timestamp on insert; restore the ballot's time afterwards
+        timestamps = [vote.timestamp for vote in new_votes]
+        created = Vote.objects.bulk_create(new_votes, batch_size=500)
+        for vote, ballot_time in zip(created, timestamps):
+            vote.timestamp = ballot_time
+        Vote.objects.bulk_update(created, ['timestamp'], batch_size=500)
+
+        Ballot.objects.filter(pk__in=[ballot.pk for ballot in ballots]).delete()
+        return len(ballots), len(created)
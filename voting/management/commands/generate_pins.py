@@ -1,11 +1,9 @@
 import os
-import random
-import string
 import pandas as pd
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
-from django.db.models import Q
 from voting.models import Voter
+from voting.pins import assign_new_pins, voters_without_pin
 
 class Command(BaseCommand):
     help = 'Generate PINs for voters and export the complete list to an Excel file.'
@@ -39,31 +37,31 @@ class Command(BaseCommand):
             voters_to_update = Voter.objects.all()
             self.stdout.write('Generating/overwriting PINs for ALL voters...')
         else:
-            voters_to_update = Voter.objects.filter(Q(pin__isnull=True) | Q(pin=''))
+            voters_to_update = voters_without_pin()
             self.stdout.write('Checking for voters without a PIN...')
 
+        pins = {}
         count = voters_to_update.count()
         if count > 0:
             with transaction.atomic():
-                voters_list = list(voters_to_update)
-                for voter in voters_list:
-                    voter.pin = "".join(random.choices(string.digits, k=6))
-                
-                Voter.objects.bulk_update(voters_list, ['pin'])
+                pins = assign_new_pins(list(voters_to_update))
             self.stdout.write(self.style.SUCCESS(f'Successfully generated PINs for {count} voters.'))
         else:
             self.stdout.write(self.style.SUCCESS('All voters already have a PIN assigned. No new PINs generated.'))
 
         # Now export ALL voters to Excel using values() to prevent model instantiation and minimize memory usage
-        voters_data = Voter.objects.values('voter_no', 'full_name', 'house', 'pin').order_by('full_name')
-        if not voters_data.exists():
+        # PINs only stored as digests can't be exported, only those generated just now
+        voters_data = list(Voter.objects.values('id', 'voter_no', 'full_name', 'house', 'pin').order_by('full_name'))
+        if not voters_data:
             self.stdout.write(self.style.WARNING('No voters found in database to export.'))
             return
 
         self.stdout.write(f'Exporting all voters to {output_path}...')
+        for row in voters_data:
+            row['pin'] = pins.get(row['id'], row['pin'])
 
         # Construct DataFrame directly from the list of dictionaries
-        df = pd.DataFrame(list(voters_data))
+        df = pd.DataFrame(voters_data)
         # Ensure column order matches expectation
         df = df[['voter_no', 'full_name', 'house', 'pin']]
         df = df.rename(columns={
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from voting.models import Voter
+from voting.pins import make_pin_digest
+
+
+class Command(BaseCommand):
+    help = (
+        'Store a keyed digest of every plaintext voter PIN that has none yet, and optionally '
+        'remove the plaintext PINs once every voter has a digest.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rehash',
+            action='store_true',
+            help='Recompute the digest of every voter with a plaintext PIN, e.g. after changing VOTER_PIN_KEY',
+        )
+        parser.add_argument(
+            '--clear-plaintext',
+            action='store_true',
+            help='Then remove the plaintext PINs; they can no longer be exported afterwards',
+        )
+
+    def handle(self, *args, **options):
+        voters = Voter.objects.exclude(pin__isnull=True).exclude(pin='')
+        if not options['rehash']:
+            voters = voters.filter(pin_digest='')
+
+        with transaction.atomic():
+            voters_list = list(voters.only('id', 'pin'))
+            for voter in voters_list:
+                voter.pin_digest = make_pin_digest(voter.id, voter.pin)
+            Voter.objects.bulk_update(voters_list, ['pin_digest'], batch_size=1000)
+        self.stdout.write(self.style.SUCCESS(f'Stored PIN digests for {len(voters_list)} voters.'))
+
+        if options['clear_plaintext']:
+            if Voter.objects.exclude(pin__isnull=True).exclude(pin='').filter(pin_digest='').exists():
+                raise CommandError('Some plaintext PINs have no digest; not clearing them')
+            cleared = Voter.objects.exclude(pin__isnull=True).update(pin=None)
+            self.stdout.write(self.style.SUCCESS(f'Removed the plaintext PINs of {cleared} voters.'))
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from posts.models import Election
+from posts.versioning import bump_all_election_versions, bump_version, election_key
+from voting.tallies import rebuild_timeline, rebuild_turnout, rebuild_vote_tallies
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the vote tallies, turnout counters and turnout timeline from the raw votes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--election',
+            type=int,
+            help='Only rebuild tallies for the election with this id (default: all elections)',
+        )
+        parser.add_argument(
+            '--only',
+            choices=['votes', 'turnout', 'timeline'],
+            help='Only rebuild one kind of derived data (default: all of them)',
+        )
+
+    def handle(self, *args, **options):
+        election = None
+        if options['election'] is not None:
+            try:
+                election = Election.objects.get(pk=options['election'])
+            except Election.DoesNotExist:
+                raise CommandError(f'Election with id {options["election"]} does not exist')
+
+        only = options['only']
+        scope = f'election "{election.title}"' if election else 'all elections'
+        self.stdout.write(f'Rebuilding vote tallies for {scope}...')
+
+        with transaction.atomic():
+            if only in (None, 'votes'):
+                candidate_count, post_count = rebuild_vote_tallies(election)
+                self.stdout.write(self.style.SUCCESS(
+                    f'Successfully rebuilt tallies for {candidate_count} candidates across {post_count} positions.'
+                ))
+            if only in (None, 'turnout'):
+                participation_count = rebuild_turnout(election)
+                self.stdout.write(self.style.SUCCESS(
+                    f'Successfully rebuilt turnout for {participation_count} participating voters.'
+                ))
+            if only in (None, 'timeline'):
+                bucket_count = rebuild_timeline(election)
+                self.stdout.write(self.style.SUCCESS(
+                    f'Successfully back-filled {bucket_count} turnout timeline buckets.'
+                ))
+
+            if election is not None:
+                bump_version(election_key(election.id))
+            else:
+                bump_all_election_versions()
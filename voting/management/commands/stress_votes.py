@@ -0,0 +1,64 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from voting.bench.database import throwaway_database
+from voting.bench.stress import ENDPOINTS, INGEST_MODES, STORAGES, run_stress_suite
+
+
+class Command(BaseCommand):
+    help = (
+        'Race concurrent ballot submissions for the same voters through the ASGI application in a '
+        'throwaway on-disk database, then check that every voter holds exactly the accepted ballots.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--voters', type=int, default=60, help='Voters, one race each (default: 60)')
+        parser.add_argument('--posts', type=int, default=4, help='Number of positions (default: 4)')
+        parser.add_argument('--candidates', type=int, default=4, help='Candidates per position (default: 4)')
+        parser.add_argument('--attempts', type=int, default=8, help='Concurrent submissions per voter (default: 8)')
+        parser.add_argument(
+            '--storage', action='append', choices=STORAGES,
+            help='Only run with this vote storage (repeatable; default: all)',
+        )
+        parser.add_argument(
+            '--ingest', action='append', choices=INGEST_MODES,
+            help='Only run with this ingestion mode (repeatable; default: all)',
+        )
+        parser.add_argument(
+            '--endpoint', action='append', choices=list(ENDPOINTS),
+            help='Only cast through this endpoint (repeatable; default: all)',
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+        parser.add_argument('-o', '--output', help='Also write the results as JSON to this file')
+
+    def handle(self, *args, **options):
+        if options['attempts'] < 2:
+            raise CommandError('--attempts must be at least 2 for submissions to race')
+
+        with throwaway_database(on_disk=True):
+            report = run_stress_suite(
+                voters=options['voters'],
+                posts=options['posts'],
+                candidates=options['candidates'],
+                attempts=options['attempts'],
+                storages=options['storage'],
+                ingest_modes=options['ingest'],
+                endpoints=options['endpoint'],
+                seed=options['seed'],
+                log=self.stdout.write,
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f'Wrote results to {options["output"]}'))
+
+        failed = {name: result['violations'] for name, result in report['stress'].items() if result['violations']}
+        for name, violations in failed.items():
+            self.stdout.write(self.style.ERROR(f'{name}:'))
+            for violation in violations:
+                self.stdout.write(self.style.ERROR(f'  {violation}'))
+        if failed:
+            raise CommandError('Concurrent submissions left the database inconsistent')
+        self.stdout.write(self.style.SUCCESS('Every race stored exactly the accepted ballots.'))
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.7 on 2026-10-18 00:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_tallies(apps, schema_editor):
+    Candidate = apps.get_model('candidates', 'Candidate')
+    Post = apps.get_model('posts', 'Post')
+    Vote = apps.get_model('voting', 'Vote')
+    CandidateTally = apps.get_model('voting', 'CandidateTally')
+    PostTally = apps.get_model('voting', 'PostTally')
+
+    candidate_counts = dict(Vote.objects.values_list('candidate_id').annotate(Count('id')).order_by())
+    post_counts = dict(Vote.objects.values_list('post_id').annotate(Count('id')).order_by())
+
+    CandidateTally.objects.bulk_create([
+        CandidateTally(candidate_id=candidate_id, post_id=post_id, votes=candidate_counts.get(candidate_id, 0))
+        for candidate_id, post_id in Candidate.objects.values_list('id', 'post_id')
+    ])
+    PostTally.objects.bulk_create([
+        PostTally(post_id=post_id, votes=post_counts.get(post_id, 0))
+        for post_id in Post.objects.values_list('id', flat=True)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('candidates', '0001_initial'),
+        ('posts', '0004_post_required_selections'),
+        ('voting', '0008_voter_pin'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostTally',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='tally', serialize=False, to='posts.post')),
+                ('votes', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CandidateTally',
+            fields=[
+                ('candidate', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='tally', serialize=False, to='candidates.candidate')),
+                ('votes', models.PositiveIntegerField(default=0)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='candidate_tallies', to='posts.post')),
+            ],
+        ),
+        migrations.RunPython(populate_tallies, migrations.RunPython.noop),
+    ]
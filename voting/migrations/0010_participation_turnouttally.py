@@ -0,0 +1,61 @@
+# Generated by Django 5.2.7 on 2026-10-18 00:27
+
+import django.db.models.deletion
+from collections import Counter
+
+from django.db import migrations, models
+
+
+def populate_turnout(apps, schema_editor):
+    Vote = apps.get_model('voting', 'Vote')
+    Participation = apps.get_model('voting', 'Participation')
+    TurnoutTally = apps.get_model('voting', 'TurnoutTally')
+
+    rows = Vote.objects.values_list('voter_id', 'post__election_id', 'voter__house').distinct().order_by()
+    house_counts = Counter()
+    participations = []
+    for voter_id, election_id, house in rows:
+        participations.append(Participation(voter_id=voter_id, election_id=election_id, house=house or ''))
+        house_counts[(election_id, house or '')] += 1
+    Participation.objects.bulk_create(participations, batch_size=500)
+    TurnoutTally.objects.bulk_create([
+        TurnoutTally(election_id=election_id, house=house, voters=count)
+        for (election_id, house), count in house_counts.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_dataversion'),
+        ('voting', '0009_posttally_candidatetally'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Participation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('house', models.CharField(blank=True, max_length=50)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('election', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participations', to='posts.election')),
+                ('voter', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participations', to='voting.voter')),
+            ],
+            options={
+                'unique_together': {('voter', 'election')},
+            },
+        ),
+        migrations.CreateModel(
+            name='TurnoutTally',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('house', models.CharField(blank=True, max_length=50)),
+                ('voters', models.PositiveIntegerField(default=0)),
+                ('election', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='turnout_tallies', to='posts.election')),
+            ],
+            options={
+                'unique_together': {('election', 'house')},
+            },
+        ),
+        migrations.RunPython(populate_turnout, migrations.RunPython.noop),
+    ]
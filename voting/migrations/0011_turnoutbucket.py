@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-18 00:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_dataversion'),
+        ('voting', '0010_participation_turnouttally'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TurnoutBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('house', models.CharField(blank=True, max_length=50)),
+                ('minute', models.DateTimeField()),
+                ('ballots', models.PositiveIntegerField(default=0)),
+                ('votes', models.PositiveIntegerField(default=0)),
+                ('election', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='turnout_buckets', to='posts.election')),
+            ],
+            options={
+                'unique_together': {('election', 'minute', 'house')},
+            },
+        ),
+    ]
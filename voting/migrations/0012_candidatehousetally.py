@@ -0,0 +1,46 @@
+# Generated by Django 5.2.7 on 2026-10-18 00:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_house_tallies(apps, schema_editor):
+    Vote = apps.get_model('voting', 'Vote')
+    CandidateHouseTally = apps.get_model('voting', 'CandidateHouseTally')
+    rows = Vote.objects.values('candidate_id', 'post_id', 'voter__house').annotate(vote_count=Count('id')).order_by()
+    CandidateHouseTally.objects.bulk_create([
+        CandidateHouseTally(
+            candidate_id=row['candidate_id'],
+            post_id=row['post_id'],
+            house=row['voter__house'] or '',
+            votes=row['vote_count'],
+        )
+        for row in rows
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('candidates', '0001_initial'),
+        ('posts', '0005_dataversion'),
+        ('voting', '0011_turnoutbucket'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CandidateHouseTally',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('house', models.CharField(blank=True, max_length=50)),
+                ('votes', models.PositiveIntegerField(default=0)),
+                ('candidate', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='house_tallies', to='candidates.candidate')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='candidate_house_tallies', to='posts.post')),
+            ],
+            options={
+                'unique_together': {('candidate', 'house')},
+            },
+        ),
+        migrations.RunPython(populate_house_tallies, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-18 00:35
+
+from django.db import migrations, models
+
+
+def number_seats(apps, schema_editor):
+    # Number each voter's existing votes for a position 1, 2, ... in the order they were cast
+    Vote = apps.get_model('voting', 'Vote')
+    seats = {}
+    to_update = []
+    for vote in Vote.objects.order_by('voter_id', 'post_id', 'id').only('id', 'voter_id', 'post_id', 'seat'):
+        key = (vote.voter_id, vote.post_id)
+        seats[key] = seats.get(key, 0) + 1
+        if vote.seat != seats[key]:
+            vote.seat = seats[key]
+            to_update.append(vote)
+    Vote.objects.bulk_update(to_update, ['seat'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('candidates', '0001_initial'),
+        ('posts', '0005_dataversion'),
+        ('voting', '0012_candidatehousetally'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vote',
+            name='seat',
+            field=models.PositiveSmallIntegerField(default=1, help_text="Which of the position's required selections this vote fills (1-based)."),
+        ),
+        migrations.RunPython(number_seats, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='vote',
+            unique_together={('voter', 'post', 'candidate'), ('voter', 'post', 'seat')},
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-18 00:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_dataversion'),
+        ('voting', '0013_vote_seat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Ballot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('house', models.CharField(blank=True, max_length=50)),
+                ('selections', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('election', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ballots', to='posts.election')),
+                ('voter', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ballots', to='voting.voter')),
+            ],
+            options={
+                'unique_together': {('voter', 'election')},
+            },
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.7 on 2026-10-18 00:49
+
+import struct
+from collections import Counter, defaultdict
+
+from django.db import migrations, models
+
+
+# Copy of voting.ballot_store.unpack_selections as of this migration
+def unpack_selections(data):
+    data = bytes(data)
+    return list(struct.unpack(f'<{len(data) // 4}I', data))
+
+
+def fill_completion(apps, schema_editor):
+    # Count each participant's votes per position (from both vote stores) and
+    # compare them with the positions open to their house
+    Participation = apps.get_model('voting', 'Participation')
+    Vote = apps.get_model('voting', 'Vote')
+    Ballot = apps.get_model('voting', 'Ballot')
+    Candidate = apps.get_model('candidates', 'Candidate')
+    Post = apps.get_model('posts', 'Post')
+    EligibleHouse = apps.get_model('posts', 'EligibleHouse')
+
+    votes_by_post = defaultdict(Counter)
+    for voter_id, election_id, post_id in Vote.objects.values_list('voter_id', 'post__election_id', 'post_id'):
+        votes_by_post[(voter_id, election_id)][post_id] += 1
+    posts_by_candidate = dict(Candidate.objects.values_list('id', 'post_id'))
+    for voter_id, election_id, selections in Ballot.objects.values_list('voter_id', 'election_id', 'selections'):
+        for candidate_id in unpack_selections(selections):
+            if candidate_id in posts_by_candidate:
+                votes_by_post[(voter_id, election_id)][posts_by_candidate[candidate_id]] += 1
+
+    posts = defaultdict(dict)
+    for post_id, election_id, required in Post.objects.values_list('id', 'election_id', 'required_selections'):
+        posts[election_id][post_id] = required or 1
+    houses = defaultdict(set)
+    for post_id, house in EligibleHouse.objects.values_list('post_id', 'house'):
+        houses[post_id].add(house)
+
+    participations = list(Participation.objects.all())
+    for participation in participations:
+        counts = votes_by_post[(participation.voter_id, participation.election_id)]
+        eligible = {
+            post_id: required for post_id, required in posts[participation.election_id].items()
+            if not houses[post_id] or (participation.house and participation.house in houses[post_id])
+        }
+        participation.votes_cast = sum(counts.values())
+        participation.is_complete = bool(eligible) and all(
+            counts.get(post_id, 0) >= required for post_id, required in eligible.items()
+        )
+    Participation.objects.bulk_update(participations, ['votes_cast', 'is_complete'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('candidates', '0001_initial'),
+        ('posts', '0005_dataversion'),
+        ('voting', '0015_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='participation',
+            name='is_complete',
+            field=models.BooleanField(default=False, help_text='The voter has filled every position they are eligible for.'),
+        ),
+        migrations.AddField(
+            model_name='participation',
+            name='votes_cast',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_completion, migrations.RunPython.noop),
+    ]
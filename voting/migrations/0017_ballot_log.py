@@ -0,0 +1,57 @@
+# Generated by Django 5.2.7 on 2026-10-18 00:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_dataversion'),
+        ('voting', '0016_participation_completion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BallotLogHead',
+            fields=[
+                ('election', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ballot_log_head', serialize=False, to='posts.election')),
+                ('seq', models.PositiveBigIntegerField(default=0)),
+                ('hash', models.CharField(max_length=64)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='BallotLogCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seq', models.PositiveBigIntegerField()),
+                ('chain_hash', models.CharField(max_length=64)),
+                ('tally', models.JSONField(help_text='Candidate id -> votes in the log up to seq.')),
+                ('tally_digest', models.CharField(max_length=64)),
+                ('signature', models.CharField(max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('verified_at', models.DateTimeField(blank=True, help_text='When audit_verify last walked the log through this checkpoint.', null=True)),
+                ('election', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ballot_log_checkpoints', to='posts.election')),
+            ],
+            options={
+                'unique_together': {('election', 'seq')},
+            },
+        ),
+        migrations.CreateModel(
+            name='BallotLogEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seq', models.PositiveBigIntegerField()),
+                ('voter_id', models.PositiveIntegerField()),
+                ('house', models.CharField(blank=True, max_length=50)),
+                ('selections', models.BinaryField()),
+                ('created_at', models.DateTimeField()),
+                ('prev_hash', models.CharField(max_length=64)),
+                ('hash', models.CharField(max_length=64)),
+                ('election', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ballot_log', to='posts.election')),
+            ],
+            options={
+                'unique_together': {('election', 'seq')},
+            },
+        ),
+    ]
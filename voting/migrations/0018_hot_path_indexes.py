@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-18 00:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('candidates', '0001_initial'),
+        ('posts', '0006_single_active_election'),
+        ('voting', '0017_ballot_log'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='voter',
+            name='house',
+            field=models.CharField(choices=[('AGAKHAN', 'Agakhan'), ('AFRICA', 'Africa'), ('KAKUNGULU', 'Kakungulu'), ('LUWANGULA', 'Luwangula')], db_index=True, max_length=50),
+        ),
+        migrations.AddIndex(
+            model_name='vote',
+            index=models.Index(fields=['post', 'candidate'], name='vote_post_candidate_idx'),
+        ),
+    ]
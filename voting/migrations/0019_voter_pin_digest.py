@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-18 01:28
+
+import hashlib
+import hmac
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Copy of voting.pins.hmac_pin_digest as of this migration
+def hmac_pin_digest(voter_id, pin):
+    key = (getattr(settings, 'VOTER_PIN_KEY', None) or settings.SECRET_KEY).encode()
+    mac = hmac.new(key, f'{voter_id}:{pin}'.encode(), hashlib.sha256).hexdigest()
+    return f'hmac_sha256${mac}'
+
+
+def fill_pin_digests(apps, schema_editor):
+    Voter = apps.get_model('voting', 'Voter')
+    voters = list(Voter.objects.exclude(pin__isnull=True).exclude(pin='').only('id', 'pin'))
+    for voter in voters:
+        voter.pin_digest = hmac_pin_digest(voter.id, voter.pin)
+    Voter.objects.bulk_update(voters, ['pin_digest'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0018_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='voter',
+            name='pin_digest',
+            field=models.CharField(blank=True, default='', max_length=128),
+        ),
+        migrations.RunPython(fill_pin_digests, migrations.RunPython.noop),
+    ]
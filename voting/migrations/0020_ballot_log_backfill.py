@@ -0,0 +1,118 @@
+# Generated by Django 5.2.7 on 2026-10-18 01:46
+
+import hashlib
+import struct
+from collections import Counter, defaultdict
+
+from django.db import migrations, models
+
+
+GENESIS_HASH = '0' * 64
+
+
+# Copies of voting.ballot_store.pack_selections/unpack_selections and
+# voting.audit.entry_hash as of this migration
+def pack_selections(candidate_ids):
+    return struct.pack(f'<{len(candidate_ids)}I', *candidate_ids)
+
+
+def unpack_selections(data):
+    data = bytes(data)
+    return list(struct.unpack(f'<{len(data) // 4}I', data))
+
+
+def entry_hash(prev_hash, seq, election_id, voter_id, house, created_at, candidate_ids):
+    payload = '|'.join([
+        prev_hash, str(seq), str(election_id), str(voter_id), house or '',
+        str(int(created_at.timestamp())), ','.join(str(candidate_id) for candidate_id in candidate_ids),
+    ])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def log_unlogged_ballots(apps, schema_editor):
+    """
+    Append the votes cast before the ballot log existed to it: one entry per voter
+    and election for the stored votes their log entries don't account for, in the
+    order of their first vote, after any entries already logged.
+    """
+    Ballot = apps.get_model('voting', 'Ballot')
+    BallotLogEntry = apps.get_model('voting', 'BallotLogEntry')
+    BallotLogHead = apps.get_model('voting', 'BallotLogHead')
+    Vote = apps.get_model('voting', 'Vote')
+
+    # election id -> voter id -> [created_at, house, candidate ids]
+    unlogged = defaultdict(dict)
+    for election_id, voter_id, house, candidate_id, timestamp in Vote.objects.order_by('id').values_list(
+        'post__election_id', 'voter_id', 'voter__house', 'candidate_id', 'timestamp'
+    ):
+        ballot = unlogged[election_id].setdefault(voter_id, [timestamp, house or '', []])
+        ballot[0] = min(ballot[0], timestamp)
+        ballot[2].append(candidate_id)
+    for election_id, voter_id, house, selections, created_at in Ballot.objects.order_by('id').values_list(
+        'election_id', 'voter_id', 'house', 'selections', 'created_at'
+    ):
+        ballot = unlogged[election_id].setdefault(voter_id, [created_at, house, []])
+        ballot[0] = min(ballot[0], created_at)
+        ballot[2].extend(unpack_selections(selections))
+
+    for election_id, ballots in unlogged.items():
+        if election_id is None:
+            continue
+        logged = defaultdict(Counter)
+        for voter_id, selections, removed in BallotLogEntry.objects.filter(election_id=election_id).values_list(
+            'voter_id', 'selections', 'removed'
+        ):
+            if removed:
+                logged[voter_id].subtract(unpack_selections(selections))
+            else:
+                logged[voter_id].update(unpack_selections(selections))
+
+        rows = []
+        for voter_id, (created_at, house, candidate_ids) in ballots.items():
+            remaining = logged[voter_id]
+            missing = []
+            for candidate_id in candidate_ids:
+                if remaining[candidate_id] > 0:
+                    remaining[candidate_id] -= 1
+                else:
+                    missing.append(candidate_id)
+            if missing:
+                rows.append((created_at, voter_id, house, missing))
+        rows.sort()
+        if not rows:
+            continue
+
+        head, _ = BallotLogHead.objects.get_or_create(election_id=election_id, defaults={'hash': GENESIS_HASH})
+        seq, chain = head.seq, head.hash
+        entries = []
+        for created_at, voter_id, house, candidate_ids in rows:
+            seq += 1
+            digest = entry_hash(chain, seq, election_id, voter_id, house, created_at, candidate_ids)
+            entries.append(BallotLogEntry(
+                election_id=election_id, seq=seq, voter_id=voter_id, house=house,
+                selections=pack_selections(candidate_ids), created_at=created_at, prev_hash=chain, hash=digest,
+            ))
+            chain = digest
+        BallotLogEntry.objects.bulk_create(entries, batch_size=1000)
+        BallotLogHead.objects.filter(pk=head.pk).update(seq=seq, hash=chain)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0019_voter_pin_digest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ballotlogentry',
+            name='removed',
+            field=models.BooleanField(default=False, help_text='The selections were deleted rather than cast.'),
+        ),
+        migrations.AlterField(
+            model_name='ballotlogentry',
+            name='voter_id',
+            field=models.PositiveBigIntegerField(),
+        ),
+        migrations.RunPython(log_unlogged_ballots, migrations.RunPython.noop),
+    ]
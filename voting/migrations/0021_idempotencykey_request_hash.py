@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 01:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0020_ballot_log_backfill'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='idempotencykey',
+            name='request_hash',
+            field=models.CharField(blank=True, help_text='SHA-256 of the request body.', max_length=64),
+        ),
+    ]
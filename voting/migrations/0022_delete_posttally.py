@@ -0,0 +1,16 @@
+# Generated by Django 5.2.7 on 2026-10-18 01:51
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0021_idempotencykey_request_hash'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='PostTally',
+        ),
+    ]
@@ -16,8 +16,10 @@ class Voter(models.Model):
 
     voter_no = models.CharField(max_length=50, unique=True)
     full_name = models.CharField(max_length=100)
-    house = models.CharField(max_length=50, choices=HOUSE_CHOICES)
+    house = models.CharField(max_length=50, choices=HOUSE_CHOICES, db_index=True)
     pin = models.CharField(max_length=6, blank=True, null=True)
+    # Keyed digest of the PIN checked at login; see voting/pins.py
+    pin_digest = models.CharField(max_length=128, blank=True, default='')
 
     @property
     def is_authenticated(self):
@@ -30,7 +32,185 @@ class Vote(models.Model):
     voter = models.ForeignKey(Voter, on_delete=models.CASCADE)
     post = models.ForeignKey('posts.Post', on_delete=models.CASCADE)
     candidate = models.ForeignKey(Candidate, on_delete=models.CASCADE)
+    seat = models.PositiveSmallIntegerField(
+        default=1,
+        help_text="Which of the position's required selections this vote fills (1-based)."
+    )
     timestamp = models.DateTimeField(auto_now_add=True)
 
     class Meta:
-        unique_together = ('voter', 'post', 'candidate')
+        # (voter, post, seat) lets the database reject a second ballot for a position
+        unique_together = [('voter', 'post', 'candidate'), ('voter', 'post', 'seat')]
+        indexes = [
+            # Covers per-candidate counts within a position or election without touching the table
+            models.Index(fields=['post', 'candidate'], name='vote_post_candidate_idx'),
+        ]
+
+
+class Ballot(models.Model):
+    """
+    A whole ballot in one row, used instead of Vote rows when VOTE_STORAGE is 'ballots'.
+    `selections` holds the chosen candidate ids packed as unsigned 32-bit integers
+    (see voting.ballot_store); positions follow from the candidates.
+    """
+    voter = models.ForeignKey(Voter, on_delete=models.CASCADE, related_name='ballots')
+    election = models.ForeignKey('posts.Election', on_delete=models.CASCADE, related_name='ballots')
+    house = models.CharField(max_length=50, blank=True)
+    selections = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('voter', 'election')
+
+    def __str__(self):
+        return f"{self.voter} → {self.election}"
+
+
+class CandidateTally(models.Model):
+    """Running vote count per candidate, maintained in the same transaction as the votes."""
+    candidate = models.OneToOneField(Candidate, on_delete=models.CASCADE, primary_key=True, related_name='tally')
+    post = models.ForeignKey('posts.Post', on_delete=models.CASCADE, related_name='candidate_tallies')
+    votes = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.candidate.name}: {self.votes}"
+
+
+class CandidateHouseTally(models.Model):
+    """Running vote count per candidate and voter house, for the per-house results breakdown."""
+    candidate = models.ForeignKey(Candidate, on_delete=models.CASCADE, related_name='house_tallies')
+    post = models.ForeignKey('posts.Post', on_delete=models.CASCADE, related_name='candidate_house_tallies')
+    house = models.CharField(max_length=50, blank=True)
+    votes = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('candidate', 'house')
+
+    def __str__(self):
+        return f"{self.candidate.name} / {self.house or '-'}: {self.votes}"
+
+
+class Participation(models.Model):
+    """
+    One row per voter per election, written when the voter's first ballot is accepted
+    and updated with every later one, so "has this voter finished?" is a single lookup.
+    """
+    voter = models.ForeignKey(Voter, on_delete=models.CASCADE, related_name='participations')
+    election = models.ForeignKey('posts.Election', on_delete=models.CASCADE, related_name='participations')
+    house = models.CharField(max_length=50, blank=True)
+    votes_cast = models.PositiveIntegerField(default=0)
+    is_complete = models.BooleanField(
+        default=False, help_text='The voter has filled every position they are eligible for.'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('voter', 'election')
+
+    def __str__(self):
+        return f"{self.voter} → {self.election}"
+
+
+class TurnoutTally(models.Model):
+    """Running count of participating voters per election and house."""
+    election = models.ForeignKey('posts.Election', on_delete=models.CASCADE, related_name='turnout_tallies')
+    house = models.CharField(max_length=50, blank=True)
+    voters = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('election', 'house')
+
+    def __str__(self):
+        return f"{self.election} / {self.house or '-'}: {self.voters}"
+
+
+class TurnoutBucket(models.Model):
+    """Votes accepted, and voters casting their first ballot, per election, house and minute (turnout timeline)."""
+    election = models.ForeignKey('posts.Election', on_delete=models.CASCADE, related_name='turnout_buckets')
+    house = models.CharField(max_length=50, blank=True)
+    minute = models.DateTimeField()
+    ballots = models.PositiveIntegerField(default=0)
+    votes = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('election', 'minute', 'house')
+
+    def __str__(self):
+        return f"{self.election} / {self.house or '-'} @ {self.minute:%H:%M}: {self.ballots}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    The response to a ballot cast with an Idempotency-Key header, stored with the
+    ballot so that a retry of the same request replays it instead of casting again.
+    """
+    voter = models.ForeignKey(Voter, on_delete=models.CASCADE, related_name='idempotency_keys')
+    election = models.ForeignKey('posts.Election', on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=255)
+    status_code = models.PositiveSmallIntegerField()
+    response = models.JSONField()
+    request_hash = models.CharField(max_length=64, blank=True, help_text='SHA-256 of the request body.')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('voter', 'key')
+
+    def __str__(self):
+        return f"{self.voter} / {self.key}: {self.status_code}"
+
+
+class BallotLogEntry(models.Model):
+    """
+    One accepted ballot in an election's append-only, hash-chained ballot log
+    (see voting.audit), or the removal of a voter's votes by an administrator.
+    Voters are referenced by id only, so the log outlives changes to the voter register.
+    """
+    election = models.ForeignKey('posts.Election', on_delete=models.CASCADE, related_name='ballot_log')
+    seq = models.PositiveBigIntegerField()
+    voter_id = models.PositiveBigIntegerField()
+    house = models.CharField(max_length=50, blank=True)
+    selections = models.BinaryField()
+    created_at = models.DateTimeField()
+    removed = models.BooleanField(default=False, help_text='The selections were deleted rather than cast.')
+    prev_hash = models.CharField(max_length=64)
+    hash = models.CharField(max_length=64)
+
+    class Meta:
+        unique_together = ('election', 'seq')
+
+    def __str__(self):
+        return f"{self.election} #{self.seq}"
+
+
+class BallotLogHead(models.Model):
+    """The last sequence number and hash of an election's ballot log; locked while appending."""
+    election = models.OneToOneField(
+        'posts.Election', on_delete=models.CASCADE, primary_key=True, related_name='ballot_log_head'
+    )
+    seq = models.PositiveBigIntegerField(default=0)
+    hash = models.CharField(max_length=64)
+
+    def __str__(self):
+        return f"{self.election} #{self.seq}"
+
+
+class BallotLogCheckpoint(models.Model):
+    """
+    The running hash and candidate tally of an election's ballot log at a sequence
+    number, signed with the secret key, so verification can resume from the last
+    checkpoint it has already verified.
+    """
+    election = models.ForeignKey('posts.Election', on_delete=models.CASCADE, related_name='ballot_log_checkpoints')
+    seq = models.PositiveBigIntegerField()
+    chain_hash = models.CharField(max_length=64)
+    tally = models.JSONField(help_text='Candidate id -> votes in the log up to seq.')
+    tally_digest = models.CharField(max_length=64)
+    signature = models.CharField(max_length=64)
+    created_at = models.DateTimeField(auto_now_add=True)
+    verified_at = models.DateTimeField(null=True, blank=True, help_text='When audit_verify last walked the log through this checkpoint.')
+
+    class Meta:
+        unique_together = ('election', 'seq')
+
+    def __str__(self):
+        return f"{self.election} @ {self.seq}"
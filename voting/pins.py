@@ -0,0 +1,91 @@
+"""
+Voter PIN storage and verification.
+
+A PIN is six digits, so a slow password hash cannot make a stolen one much harder
+to guess but does make every login cost tens of milliseconds of CPU. Instead
+Voter.pin_digest holds an HMAC-SHA256 of the voter's id and PIN under a server key
+(VOTER_PIN_KEY, SECRET_KEY by default), as 'hmac_sha256$<hex>': without the key a
+leaked digest column reveals nothing, and checking a PIN costs microseconds.
+Digests in any Django password hasher format (VOTER_PIN_HASHER = 'django') are
+accepted too.
+
+Migrating from the plaintext Voter.pin column: migration 0019 fills pin_digest for
+every existing PIN, and login checks the digest when there is one. New PINs
+are exported when they are generated and only stored as digests, unless
+VOTER_PIN_STORE_PLAINTEXT opts in to also keeping them in the plaintext column
+for re-exporting PIN sheets; `manage.py hash_pins --clear-plaintext` removes
+stored ones. Changing VOTER_PIN_KEY invalidates every digest;
+run `manage.py hash_pins --rehash` while the plaintext column is still filled,
+or generate new PINs.
+"""
+import hashlib
+import hmac
+import secrets
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.db.models import Q
+
+from .models import Voter
+
+
+HMAC_ALGORITHM = 'hmac_sha256'
+HASHER_HMAC = 'hmac'
+HASHER_DJANGO = 'django'
+PIN_LENGTH = 6
+
+
+def _key():
+    return (getattr(settings, 'VOTER_PIN_KEY', None) or settings.SECRET_KEY).encode()
+
+
+def hmac_pin_digest(voter_id, pin):
+    mac = hmac.new(_key(), f'{voter_id}:{pin}'.encode(), hashlib.sha256).hexdigest()
+    return f'{HMAC_ALGORITHM}${mac}'
+
+
+def make_pin_digest(voter_id, pin, hasher=None):
+    """The digest of the voter's PIN with the given or configured hasher."""
+    hasher = hasher or getattr(settings, 'VOTER_PIN_HASHER', HASHER_HMAC)
+    if hasher == HASHER_DJANGO:
+        return make_password(pin)
+    return hmac_pin_digest(voter_id, pin)
+
+
+def has_pin(voter):
+    return bool(voter.pin_digest or voter.pin)
+
+
+def pin_matches(voter, pin):
+    """Whether pin is the voter's PIN, in constant time for the stored form."""
+    if voter.pin_digest:
+        if voter.pin_digest.startswith(f'{HMAC_ALGORITHM}$'):
+            return hmac.compare_digest(voter.pin_digest, hmac_pin_digest(voter.id, pin))
+        return check_password(pin, voter.pin_digest)
+    # Voters whose PIN predates pin_digest
+    return bool(voter.pin) and hmac.compare_digest(voter.pin.encode(), pin.encode())
+
+
+def voters_without_pin():
+    return Voter.objects.filter(Q(pin__isnull=True) | Q(pin=''), pin_digest='')
+
+
+def generate_pin():
+    return ''.join(secrets.choice('0123456789') for _ in range(PIN_LENGTH))
+
+
+def assign_new_pins(voters):
+    """
+    Give each voter a new random PIN and save them with one bulk update.
+    Returns voter id -> PIN; whether the PIN is also kept in plaintext follows
+    VOTER_PIN_STORE_PLAINTEXT, so exports should take PINs from this mapping.
+    """
+    store_plaintext = getattr(settings, 'VOTER_PIN_STORE_PLAINTEXT', False)
+    pins = {}
+    for voter in voters:
+        pin = generate_pin()
+        pins[voter.id] = pin
+        voter.pin = pin if store_plaintext else None
+        voter.pin_digest = make_pin_digest(voter.id, pin)
+    Voter.objects.bulk_update(voters, ['pin', 'pin_digest'], batch_size=1000)
+    return pins
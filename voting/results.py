@@ -0,0 +1,230 @@
+from collections import Counter, defaultdict
+
+from django.db.models import Count
+
+from candidates.models import Candidate
+from posts.models import Post, Election
+from voting.ballot_store import candidate_posts, iter_ballot_votes
+from voting.models import Ballot, Voter, Vote, CandidateTally, CandidateHouseTally, TurnoutTally, TurnoutBucket
+
+
+BREAKDOWNS = ('house',)
+
+
+def count_votes(election, from_votes=False):
+    """
+    Map candidate id -> votes for every candidate of the election in one query.
+    Reads the maintained tallies by default; from_votes=True aggregates the raw votes instead.
+    """
+    if from_votes:
+        counts = Counter(dict(
+            Vote.objects.filter(post__election=election)
+            .values_list('candidate_id')
+            .annotate(vote_count=Count('id'))
+            .order_by()
+        ))
+        ballots = Ballot.objects.filter(election=election).only('selections')
+        for _, candidate_id, _ in iter_ballot_votes(ballots, candidate_posts(election)):
+            counts[candidate_id] += 1
+        return dict(counts)
+    return dict(CandidateTally.objects.filter(post__election=election).values_list('candidate_id', 'votes'))
+
+
+def count_votes_by_house(election, from_votes=False):
+    """
+    Map candidate id -> {house: votes} for the election in one grouped query.
+    Reads the maintained per-house tallies by default; from_votes=True groups the
+    raw votes (and stored ballots) by candidate and voter house instead.
+    """
+    house_votes = defaultdict(Counter)
+    if from_votes:
+        rows = (
+            Vote.objects.filter(post__election=election)
+            .values_list('candidate_id', 'voter__house')
+            .annotate(vote_count=Count('id'))
+            .order_by()
+        )
+        ballots = Ballot.objects.filter(election=election).only('house', 'selections')
+        for ballot, candidate_id, _ in iter_ballot_votes(ballots, candidate_posts(election)):
+            house_votes[candidate_id][ballot.house] += 1
+    else:
+        rows = CandidateHouseTally.objects.filter(post__election=election).values_list('candidate_id', 'house', 'votes')
+
+    for candidate_id, house, votes in rows:
+        house_votes[candidate_id][house or ''] += votes
+    return house_votes
+
+
+def _photo_url(candidate, request=None):
+    if not candidate.photo:
+        return None
+    url = candidate.photo.url
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+def _rank_candidates(results, required_selections):
+    """Assign rank and Winner / Runner-up status, ordering by votes then name."""
+    ordered = sorted(results, key=lambda res: (-res['votes'], res['name']))
+    for rank, res in enumerate(ordered, start=1):
+        res['rank'] = rank
+        if res['votes'] == 0:
+            res['status'] = '-'
+        elif rank <= required_selections:
+            res['status'] = 'Winner'
+        else:
+            res['status'] = 'Runner-up'
+
+
+def build_election_results(election, request=None, from_votes=False, breakdown=None):
+    """
+    Build the per-position results of an election in memory.
+
+    Issues a fixed number of queries (posts, candidates, vote counts) regardless of
+    how many candidates or votes there are. Positions and candidates keep their
+    id order; each candidate carries its rank and status within the position.
+    With breakdown='house', positions and candidates also get a `houses` mapping
+    of votes per voter house, from one more grouped query.
+    """
+    posts = list(Post.objects.filter(election=election).order_by('id'))
+    candidates_by_post = defaultdict(list)
+    for candidate in Candidate.objects.filter(post__election=election).order_by('id'):
+        candidates_by_post[candidate.post_id].append(candidate)
+    votes_map = count_votes(election, from_votes=from_votes)
+    if breakdown == 'house':
+        house_votes = count_votes_by_house(election, from_votes=from_votes)
+        houses = [house for house, _ in Voter.HOUSE_CHOICES]
+        houses += sorted({house for votes in house_votes.values() for house in votes} - set(houses))
+
+    positions = []
+    for post in posts:
+        candidates = candidates_by_post[post.id]
+        total_votes = sum(votes_map.get(candidate.id, 0) for candidate in candidates)
+
+        candidate_results = []
+        for candidate in candidates:
+            votes = votes_map.get(candidate.id, 0)
+            candidate_results.append({
+                'id': candidate.id,
+                'name': candidate.name,
+                '_class': candidate._class,
+                'photo': _photo_url(candidate, request),
+                'stream': candidate.stream,
+                'slogan': candidate.slogan,
+                'votes': votes,
+                'percentage': round((votes / total_votes) * 100, 2) if total_votes > 0 else 0,
+            })
+            if breakdown == 'house':
+                candidate_results[-1]['houses'] = {
+                    house: house_votes[candidate.id].get(house, 0) for house in houses
+                }
+        _rank_candidates(candidate_results, post.required_selections)
+
+        position = {
+            'id': post.id,
+            'title': post.title,
+            'description': post.description,
+            'required_selections': post.required_selections,
+            'total_votes': total_votes,
+            'candidates': candidate_results,
+        }
+        if breakdown == 'house':
+            position['houses'] = {
+                house: sum(res['houses'][house] for res in candidate_results) for house in houses
+            }
+        positions.append(position)
+    return positions
+
+
+def _percentage(part, whole):
+    return round((part / whole * 100), 2) if whole > 0 else 0
+
+
+def turnout_statistics(election):
+    """
+    Registered voters, voters who took part and the turnout percentage, overall and per house.
+    Reads the maintained turnout counters instead of scanning the votes.
+    """
+    registered = dict(Voter.objects.values_list('house').annotate(total=Count('id')).order_by())
+    voted = dict(TurnoutTally.objects.filter(election=election).values_list('house', 'voters'))
+
+    total_voters = sum(registered.values())
+    voted_count = sum(voted.values())
+    houses = [
+        {
+            'house': house,
+            'total_voters': registered.get(house, 0),
+            'voted_count': voted.get(house, 0),
+            'voter_turnout_percentage': _percentage(voted.get(house, 0), registered.get(house, 0)),
+        }
+        for house in sorted(set(registered) | set(voted))
+    ]
+    return {
+        'total_voters': total_voters,
+        'voted_count': voted_count,
+        'voter_turnout_percentage': _percentage(voted_count, total_voters),
+        'houses': houses,
+    }
+
+
+def resolve_results_election(election_id=None):
+    """
+    The election whose results are requested: the given id, else the active
+    election, else the most recently created one. Raises Election.DoesNotExist
+    for an unknown id.
+    """
+    if election_id:
+        return Election.objects.get(pk=election_id)
+    election = Election.objects.get_active()
+    if not election:
+        election = Election.objects.order_by('-created_at').first()
+    return election
+
+
+async def aresolve_results_election(election_id=None):
+    """Async counterpart of resolve_results_election()."""
+    if election_id:
+        return await Election.objects.aget(pk=election_id)
+    election = await Election.objects.aget_active()
+    if not election:
+        election = await Election.objects.order_by('-created_at').afirst()
+    return election
+
+
+def election_results_payload(election, request=None, breakdown=None):
+    """The `data` body served by the live results endpoints."""
+    if election is None:
+        return {
+            'positions': [],
+            'statistics': {
+                'total_voters': 0,
+                'voted_count': 0,
+                'voter_turnout_percentage': 0
+            }
+        }
+    return {
+        'election': {
+            'id': election.id,
+            'title': election.title,
+            'is_active': election.is_active,
+            'is_demo': election.is_demo,
+        },
+        'positions': build_election_results(election, request=request, breakdown=breakdown),
+        'statistics': turnout_statistics(election)
+    }
+
+
+def turnout_timeline(election, since=None):
+    """
+    Per-house series of the votes accepted and the voters casting their first
+    ballot per minute, read from the maintained buckets in one indexed range query.
+    """
+    buckets = TurnoutBucket.objects.filter(election=election)
+    if since is not None:
+        buckets = buckets.filter(minute__gte=since)
+
+    series = defaultdict(list)
+    for house, minute, ballots, votes in buckets.order_by('minute', 'house').values_list(
+        'house', 'minute', 'ballots', 'votes'
+    ):
+        series[house].append({'minute': minute.isoformat(), 'ballots': ballots, 'votes': votes})
+    return [{'house': house, 'points': points} for house, points in sorted(series.items())]
@@ -0,0 +1,150 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class _PendingBuild:
+    def __init__(self):
+        self.event = threading.Event()
+        self.body = None
+
+
+class ResultsCache:
+    """
+    Rendered results bodies keyed by scope (which election/representation) and
+    tag (its data version).
+
+    Each scope holds at most one version, so a version bump replaces the old body
+    instead of accumulating stale ones, and the whole store is bounded by entry
+    count and total bytes with least-recently-used eviction. Concurrent misses on
+    the same (scope, tag) wait for a single build. An optional shared Django cache
+    (e.g. the file-based 'results' alias) lets the worker processes of one host
+    reuse each other's builds; a short-lived lock key there keeps them from
+    building the same version at the same time.
+    """
+
+    def __init__(self, max_entries=64, max_bytes=8 * 1024 * 1024, shared_alias=None,
+                 shared_timeout=300, build_wait=10.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.shared_alias = shared_alias
+        self.shared_timeout = shared_timeout
+        self.build_wait = build_wait
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._builds = {}
+
+    @classmethod
+    def from_settings(cls):
+        options = getattr(settings, 'RESULTS_CACHE', {})
+        shared_alias = options.get('SHARED_ALIAS')
+        if shared_alias not in settings.CACHES:
+            shared_alias = None
+        return cls(
+            max_entries=options.get('MAX_ENTRIES', 64),
+            max_bytes=options.get('MAX_BYTES', 8 * 1024 * 1024),
+            shared_alias=shared_alias,
+            shared_timeout=options.get('SHARED_TIMEOUT', 300),
+        )
+
+    def get_or_build(self, scope, tag, build):
+        """Return the cached body for (scope, tag), calling build() at most once per process."""
+        with self._lock:
+            entry = self._entries.get(scope)
+            if entry is not None and entry[0] == tag:
+                self._entries.move_to_end(scope)
+                return entry[1]
+            pending = self._builds.get((scope, tag))
+            is_builder = pending is None
+            if is_builder:
+                pending = self._builds[(scope, tag)] = _PendingBuild()
+
+        if not is_builder:
+            pending.event.wait(self.build_wait)
+            if pending.body is not None:
+                return pending.body
+            # The build failed or is taking too long; serve this request on its own.
+            return build()
+
+        try:
+            body = self._shared_get_or_build(scope, tag, build)
+            pending.body = body
+            self._store(scope, tag, body)
+            return body
+        finally:
+            with self._lock:
+                self._builds.pop((scope, tag), None)
+            pending.event.set()
+
+    def peek(self, scope, tag):
+        """Return the cached body for (scope, tag) without building, or None."""
+        with self._lock:
+            entry = self._entries.get(scope)
+            if entry is not None and entry[0] == tag:
+                self._entries.move_to_end(scope)
+                return entry[1]
+        return None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _store(self, scope, tag, body):
+        size = len(body)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(scope, None)
+            if previous is not None:
+                self._bytes -= len(previous[1])
+            self._entries[scope] = (tag, body)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def _shared_get_or_build(self, scope, tag, build):
+        if self.shared_alias is None:
+            return build()
+
+        shared = caches[self.shared_alias]
+        key = f'results:{scope}:{tag}'
+        body = shared.get(key)
+        if body is not None:
+            return body
+
+        lock_key = f'{key}:building'
+        if shared.add(lock_key, 1, timeout=int(self.build_wait) + 1):
+            try:
+                body = build()
+                shared.set(key, body, timeout=self.shared_timeout)
+                return body
+            finally:
+                shared.delete(lock_key)
+
+        # Another worker process is building this version; wait for its result.
+        deadline = time.monotonic() + self.build_wait
+        while time.monotonic() < deadline:
+            time.sleep(0.025)
+            body = shared.get(key)
+            if body is not None:
+                return body
+        return build()
+
+
+_results_cache = None
+_results_cache_lock = threading.Lock()
+
+
+def get_results_cache():
+    global _results_cache
+    if _results_cache is None:
+        with _results_cache_lock:
+            if _results_cache is None:
+                _results_cache = ResultsCache.from_settings()
+    return _results_cache
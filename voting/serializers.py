@@ -1,21 +1,11 @@
 from rest_framework import serializers
-from candidates.serializers import CandidateResultSerializer
 
-from posts.models import Post, Election
+from candidates.models import Candidate
+from posts.models import Post
+from voting.ballot_schema import get_active_election_id, get_ballot_schema
+from voting.ingest import submit_ballot
 from voting.models import Vote
 
-class LiveResultsSerializer(serializers.ModelSerializer):
-    candidates = CandidateResultSerializer(many=True, read_only=True)
-    total_votes = serializers.SerializerMethodField()
-    
-    class Meta:
-        model = Post
-        fields = ['id', 'title', 'description', 'total_votes', 'candidates']
-    
-    def get_total_votes(self, obj):
-        return Vote.objects.filter(post=obj).count()
-
-
 class VoteSerializer(serializers.ModelSerializer):
     class Meta:
         model = Vote
@@ -27,14 +17,14 @@ class VoteSerializer(serializers.ModelSerializer):
         candidate = data['candidate']
         
         # Check active election
-        active_election = Election.objects.filter(is_active=True).first()
-        if not active_election:
+        active_election_id = get_active_election_id()
+        if not active_election_id:
             raise serializers.ValidationError("There is no active election at the moment.")
-        if post.election != active_election:
+        if post.election_id != active_election_id:
             raise serializers.ValidationError("This position is not part of the active election.")
         
         # Check if voter is eligible for this post
-        if not post.is_voter_eligible(voter):
+        if not get_ballot_schema(active_election_id).is_eligible(post.id, voter.house):
             raise serializers.ValidationError("You are not eligible to vote for this position.")
         
         # Enforce required_selections if voting via the single vote endpoint
@@ -43,24 +33,27 @@ class VoteSerializer(serializers.ModelSerializer):
                 f"Position {post.title} requires exactly {post.required_selections} selections. Please use the bulk voting endpoint."
             )
         
-        # Check if voter already voted for this post in DB
-        if Vote.objects.filter(voter=voter, post=post).exists():
-            raise serializers.ValidationError("You have already voted for this position.")
-        
         # Check if candidate belongs to the post
-        if candidate.post != post:
+        if candidate.post_id != post.id:
             raise serializers.ValidationError("Candidate does not belong to this position.")
         
         return data
     
     def create(self, validated_data):
         voter = self.context['request'].user
-        vote = Vote.objects.create(voter=voter, **validated_data)
+        post = validated_data['post']
+        [vote] = submit_ballot(voter, post.election_id, [(post.id, validated_data['candidate'].id)])
         return vote
  
  
+class BallotSelectionSerializer(serializers.Serializer):
+    """One selection of a ballot, by id; checked against the compiled ballot schema."""
+    post = serializers.IntegerField()
+    candidate = serializers.IntegerField()
+
+
 class BulkVoteSerializer(serializers.Serializer):
-    votes = VoteSerializer(many=True)
+    votes = BallotSelectionSerializer(many=True)
     
     def validate_votes(self, votes_data):
         if not votes_data:
@@ -68,70 +61,76 @@ class BulkVoteSerializer(serializers.Serializer):
         return votes_data
     
     def validate(self, data):
+        """
+        Checks the ballot against the active election's compiled schema, without
+        queries for a valid ballot. Positions the voter already voted for are
+        rejected by the database when the ballot is saved.
+        """
         voter = self.context['request'].user
         votes_data = data['votes']
         
-        active_election = Election.objects.filter(is_active=True).first()
-        if not active_election:
+        schema = get_ballot_schema()
+        if schema is None:
             raise serializers.ValidationError("There is no active election at the moment.")
+        eligible_post_ids = schema.eligible_post_ids(voter.house)
         
         # Group votes by post to validate quantities
         post_selections = {}
         for vote_data in votes_data:
-            post = vote_data['post']
-            candidate = vote_data['candidate']
-            post_selections.setdefault(post, []).append(candidate.id)
+            post_id = vote_data['post']
+            candidate_id = vote_data['candidate']
             
             # Verify basic election matching
-            if post.election != active_election:
+            if post_id not in schema.posts:
+                post_title = Post.objects.filter(pk=post_id).values_list('title', flat=True).first()
+                if post_title is None:
+                    raise serializers.ValidationError(f'Invalid position id "{post_id}" - object does not exist.')
                 raise serializers.ValidationError(
-                    f"Position {post.title} is not part of the active election."
+                    f"Position {post_title} is not part of the active election."
                 )
+            post_title, _ = schema.posts[post_id]
+            post_selections.setdefault(post_id, []).append(candidate_id)
             
             # Check voter eligibility for this post
-            if not post.is_voter_eligible(voter):
+            if post_id not in eligible_post_ids:
                 raise serializers.ValidationError(
-                    f"You are not eligible to vote for position: {post.title}"
+                    f"You are not eligible to vote for position: {post_title}"
                 )
             
             # Check if candidate belongs to the post
-            if candidate.post != post:
+            candidate_post_id, candidate_name = schema.candidates.get(candidate_id, (None, None))
+            if candidate_post_id != post_id:
+                if candidate_name is None:
+                    candidate_name = Candidate.objects.filter(pk=candidate_id).values_list('name', flat=True).first()
+                    if candidate_name is None:
+                        raise serializers.ValidationError(f'Invalid candidate id "{candidate_id}" - object does not exist.')
                 raise serializers.ValidationError(
-                    f"Candidate {candidate.name} does not belong to position: {post.title}"
+                    f"Candidate {candidate_name} does not belong to position: {post_title}"
                 )
         
         # Validate grouped selections per post
-        for post, candidate_ids in post_selections.items():
+        for post_id, candidate_ids in post_selections.items():
+            post_title, required_selections = schema.posts[post_id]
             # Check if selection count matches required_selections
-            if len(candidate_ids) != post.required_selections:
+            if len(candidate_ids) != required_selections:
                 raise serializers.ValidationError(
-                    f"You must select exactly {post.required_selections} candidate(s) for position: {post.title}."
+                    f"You must select exactly {required_selections} candidate(s) for position: {post_title}."
                 )
             # Check for duplicate candidates in the same post
             if len(candidate_ids) != len(set(candidate_ids)):
                 raise serializers.ValidationError(
-                    f"Cannot vote for the same candidate multiple times for position: {post.title}."
-                )
-            # Check if voter already voted for this post in DB
-            if Vote.objects.filter(voter=voter, post=post).exists():
-                raise serializers.ValidationError(
-                    f"You have already voted for position: {post.title}"
+                    f"Cannot vote for the same candidate multiple times for position: {post_title}."
                 )
         
+        data['election_id'] = schema.election_id
         return data
     
     def create(self, validated_data):
         voter = self.context['request'].user
-        votes_data = validated_data['votes']
-        
-        # Create all votes
-        created_votes = []
-        for vote_data in votes_data:
-            vote = Vote.objects.create(
-                voter=voter,
-                post=vote_data['post'],
-                candidate=vote_data['candidate']
-            )
-            created_votes.append(vote)
-        
-        return created_votes
+        return submit_ballot(
+            voter,
+            validated_data['election_id'],
+            [(vote_data['post'], vote_data['candidate']) for vote_data in validated_data['votes']],
+            idempotency_key=validated_data.get('idempotency_key'),
+            request_hash=validated_data.get('request_hash', ''),
+        )
@@ -0,0 +1,159 @@
+import asyncio
+import json
+import logging
+import threading
+from urllib.parse import urljoin
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from posts.models import Election
+from posts.versioning import get_election_version
+from voting.results import election_results_payload
+
+
+logger = logging.getLogger(__name__)
+
+_broadcasters = {}
+_broadcasters_lock = threading.Lock()
+
+
+def _poll_interval():
+    return getattr(settings, 'RESULTS_STREAM_POLL_INTERVAL', 2.0)
+
+
+def _keepalive_interval():
+    return getattr(settings, 'RESULTS_STREAM_KEEPALIVE_INTERVAL', 15.0)
+
+
+class _BaseURL:
+    """Stands in for the request when snapshots build absolute photo URLs."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+
+    def build_absolute_uri(self, location):
+        return urljoin(self.base_url, location)
+
+
+def _results_snapshot(election_id):
+    """
+    The serialized results of an election. Photo URLs are made absolute against
+    RESULTS_STREAM_BASE_URL, and left site-relative when it is not set; they never
+    depend on a subscriber's request, which every subscriber shares.
+    """
+    election = Election.objects.get(pk=election_id)
+    base_url = getattr(settings, 'RESULTS_STREAM_BASE_URL', '')
+    payload = election_results_payload(election, request=_BaseURL(base_url) if base_url else None)
+    return json.dumps({'success': True, 'data': payload})
+
+
+class ResultsBroadcaster:
+    """
+    Shared producer of live results for one election.
+
+    A single task watches the election's data version and, when it changes, builds
+    the snapshot once and hands the same serialized payload to every subscriber.
+    Each subscriber queue only holds the latest snapshot, so slow clients skip
+    intermediate versions instead of growing a backlog.
+    """
+
+    def __init__(self, election_id, loop):
+        self.election_id = election_id
+        self.loop = loop
+        self.subscribers = set()
+        self.snapshot = None
+        self.wake = asyncio.Event()
+        self.task = None
+
+    def subscribe(self):
+        queue = asyncio.Queue(maxsize=1)
+        if self.snapshot is not None:
+            queue.put_nowait(self.snapshot)
+        self.subscribers.add(queue)
+        with _broadcasters_lock:
+            _broadcasters.setdefault(self.election_id, self)
+        if self.task is None or self.task.done():
+            self.task = self.loop.create_task(self._run())
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+        if not self.subscribers and self.task is not None:
+            self.task.cancel()
+            self.task = None
+            self.snapshot = None
+            with _broadcasters_lock:
+                if _broadcasters.get(self.election_id) is self:
+                    del _broadcasters[self.election_id]
+
+    def notify(self):
+        """Wake the producer early; safe to call from any thread."""
+        try:
+            self.loop.call_soon_threadsafe(self.wake.set)
+        except RuntimeError:
+            # The event loop that owned this broadcaster has been closed.
+            pass
+
+    def _publish(self, snapshot):
+        self.snapshot = snapshot
+        for queue in self.subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(snapshot)
+
+    async def _run(self):
+        version = None
+        while self.subscribers:
+            self.wake.clear()
+            try:
+                current = await sync_to_async(get_election_version)(self.election_id)
+                if current != version or self.snapshot is None:
+                    snapshot = await sync_to_async(_results_snapshot)(self.election_id)
+                    version = current
+                    self._publish(snapshot)
+            except Exception:
+                # Keep the producer alive: subscribers get the next good snapshot
+                # instead of keep-alives forever.
+                logger.exception('Building live results for election %s failed', self.election_id)
+            try:
+                await asyncio.wait_for(self.wake.wait(), timeout=_poll_interval())
+            except asyncio.TimeoutError:
+                pass
+
+
+def get_broadcaster(election_id):
+    """Return the broadcaster for an election, creating it on the running event loop."""
+    loop = asyncio.get_running_loop()
+    with _broadcasters_lock:
+        broadcaster = _broadcasters.get(election_id)
+        if broadcaster is None or broadcaster.loop is not loop:
+            broadcaster = ResultsBroadcaster(election_id, loop)
+            _broadcasters[election_id] = broadcaster
+        return broadcaster
+
+
+def notify_results_changed(election_id):
+    """Tell a running broadcaster that an election's tallies changed (no-op if nobody listens)."""
+    with _broadcasters_lock:
+        broadcaster = _broadcasters.get(election_id)
+    if broadcaster is not None:
+        broadcaster.notify()
+
+
+async def results_event_stream(broadcaster):
+    """Server-Sent Events for one subscriber; unsubscribes when the client goes away."""
+    queue = broadcaster.subscribe()
+    event_id = 0
+    try:
+        yield 'retry: 3000\n\n'
+        while True:
+            try:
+                snapshot = await asyncio.wait_for(queue.get(), timeout=_keepalive_interval())
+            except asyncio.TimeoutError:
+                yield ': keep-alive\n\n'
+                continue
+            event_id += 1
+            yield f'id: {event_id}\nevent: results\ndata: {snapshot}\n\n'
+    finally:
+        broadcaster.unsubscribe(queue)
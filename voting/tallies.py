@@ -0,0 +1,332 @@
+from collections import Counter, defaultdict
+
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.db.models import Count, F, Min
+from django.db.models.functions import TruncMinute
+from django.utils import timezone
+
+from candidates.models import Candidate
+from posts.models import Election, Post
+from posts.versioning import bump_all_election_versions, bump_version, election_key
+from voting.ballot_schema import BallotSchema
+from voting.ballot_store import candidate_posts, iter_ballot_votes, unpack_selections
+from voting.models import Ballot, Vote, CandidateTally, CandidateHouseTally, Participation, TurnoutTally, TurnoutBucket
+
+
+def _increment(model, key_field, counts, extra=None, scope=None):
+    """
+    Add counts[key] to the `votes` column of the tally row identified by key
+    (and the fixed `scope` fields, if any).
+    Rows are updated with one UPDATE per distinct amount; missing rows are
+    inserted at zero first so concurrent writers never lose an increment.
+    """
+    extra = extra or {}
+    scope = scope or {}
+    rows = model.objects.filter(**scope)
+    by_amount = defaultdict(list)
+    for key, amount in counts.items():
+        by_amount[amount].append(key)
+
+    missing = set()
+    for amount, keys in by_amount.items():
+        updated = rows.filter(**{f'{key_field}__in': keys}).update(votes=F('votes') + amount)
+        if updated < len(keys):
+            existing = set(rows.filter(**{f'{key_field}__in': keys}).values_list(key_field, flat=True))
+            missing.update(key for key in keys if key not in existing)
+
+    if missing:
+        model.objects.bulk_create(
+            [model(**{key_field: key, 'votes': 0}, **scope, **extra.get(key, {})) for key in missing],
+            ignore_conflicts=True,
+        )
+        for key in missing:
+            rows.filter(**{key_field: key}).update(votes=F('votes') + counts[key])
+
+
+def record_votes(votes, house=''):
+    """
+    Apply newly inserted votes of voters from one house to the tally tables.
+    Must be called inside the transaction that inserted the votes.
+    """
+    candidate_counts = Counter(vote.candidate_id for vote in votes)
+    candidate_posts = {vote.candidate_id: {'post_id': vote.post_id} for vote in votes}
+
+    _increment(CandidateTally, 'candidate_id', candidate_counts, candidate_posts)
+    _increment(CandidateHouseTally, 'candidate_id', candidate_counts, candidate_posts, scope={'house': house or ''})
+
+
+def record_participation(voter, election_id, votes_cast, is_complete):
+    """
+    Mark the voter as having taken part in the election and, the first time,
+    count them in the election's per-house turnout. votes_cast is the size of
+    the new ballot; is_complete says whether the voter has now filled every
+    eligible position. Must be called inside the ballot's transaction.
+    Returns True if this was the voter's first ballot in the election.
+    """
+    house = voter.house or ''
+    participation, created = Participation.objects.get_or_create(
+        voter_id=voter.id, election_id=election_id,
+        defaults={'house': house, 'votes_cast': votes_cast, 'is_complete': is_complete}
+    )
+    if created:
+        turnout, _ = TurnoutTally.objects.get_or_create(election_id=election_id, house=house)
+        TurnoutTally.objects.filter(pk=turnout.pk).update(voters=F('voters') + 1)
+    else:
+        Participation.objects.filter(pk=participation.pk).update(
+            votes_cast=F('votes_cast') + votes_cast, is_complete=is_complete or participation.is_complete
+        )
+    return created
+
+
+def record_timeline(house, election_id, vote_count, when=None, ballots=1):
+    """
+    Count accepted votes of one house, and the voters whose first ballot they are,
+    in the (election, house, minute) timeline bucket.
+    Must be called inside the ballots' transaction.
+    """
+    minute = (when or timezone.now()).replace(second=0, microsecond=0)
+    bucket, _ = TurnoutBucket.objects.get_or_create(election_id=election_id, house=house or '', minute=minute)
+    TurnoutBucket.objects.filter(pk=bucket.pk).update(
+        ballots=F('ballots') + ballots, votes=F('votes') + vote_count
+    )
+
+
+def _ballots(election=None):
+    ballots = Ballot.objects.all()
+    if election is not None:
+        ballots = ballots.filter(election=election)
+    return ballots
+
+
+def tally_votes(obj):
+    """Return the maintained vote count of a Candidate (0 if it has no tally row yet)."""
+    try:
+        return obj.tally.votes
+    except ObjectDoesNotExist:
+        return 0
+
+
+@transaction.atomic
+def rebuild_tallies(election=None):
+    """
+    Recompute every table derived from the raw votes (candidate tallies,
+    participation and turnout, timeline buckets), optionally for one election only.
+    """
+    rebuild_vote_tallies(election)
+    rebuild_turnout(election)
+    rebuild_timeline(election)
+
+    if election is not None:
+        bump_version(election_key(election.id))
+    else:
+        bump_all_election_versions()
+
+
+def rebuild_election_tallies(election_ids):
+    """Rebuild the tallies of just these elections, e.g. those whose votes an admin deleted."""
+    for election in Election.objects.filter(id__in=election_ids).order_by('id'):
+        rebuild_tallies(election)
+
+
+@transaction.atomic
+def rebuild_vote_tallies(election=None):
+    """
+    Recompute the candidate and per-house candidate tallies from the raw votes.
+    Returns the number of candidate tally rows written and of positions they cover.
+    """
+    candidates = Candidate.objects.all()
+    posts = Post.objects.all()
+    votes = Vote.objects.all()
+    if election is not None:
+        candidates = candidates.filter(post__election=election)
+        posts = posts.filter(election=election)
+        votes = votes.filter(post__election=election)
+
+    candidate_counts = Counter({
+        row['candidate_id']: row['vote_count']
+        for row in votes.values('candidate_id').annotate(vote_count=Count('id')).order_by()
+    })
+    house_counts = Counter({
+        (row['candidate_id'], row['post_id'], row['voter__house'] or ''): row['vote_count']
+        for row in votes.values('candidate_id', 'post_id', 'voter__house').annotate(vote_count=Count('id')).order_by()
+    })
+    for ballot, candidate_id, post_id in iter_ballot_votes(_ballots(election), candidate_posts(election)):
+        candidate_counts[candidate_id] += 1
+        house_counts[(candidate_id, post_id, ballot.house)] += 1
+
+    CandidateTally.objects.filter(candidate__in=candidates).delete()
+    CandidateHouseTally.objects.filter(candidate__in=candidates).delete()
+
+    candidate_tallies = CandidateTally.objects.bulk_create([
+        CandidateTally(candidate_id=candidate_id, post_id=post_id, votes=candidate_counts.get(candidate_id, 0))
+        for candidate_id, post_id in candidates.values_list('id', 'post_id')
+    ])
+    CandidateHouseTally.objects.bulk_create([
+        CandidateHouseTally(candidate_id=candidate_id, post_id=post_id, house=house, votes=count)
+        for (candidate_id, post_id, house), count in house_counts.items()
+    ])
+    return len(candidate_tallies), posts.count()
+
+
+@transaction.atomic
+def rebuild_turnout(election=None):
+    """
+    Recompute participation rows (with their ballot completion) and per-house
+    turnout from the raw votes.
+    Returns the number of participation rows written.
+    """
+    votes = Vote.objects.all()
+    participations = Participation.objects.all()
+    turnout = TurnoutTally.objects.all()
+    if election is not None:
+        votes = votes.filter(post__election=election)
+        participations = participations.filter(election=election)
+        turnout = turnout.filter(election=election)
+
+    # (voter, election) -> (house, time of the first vote) and votes per post, from both vote stores
+    first_votes = {}
+    votes_by_post = defaultdict(Counter)
+    for row in votes.values('voter_id', 'post__election_id', 'post_id', 'voter__house').annotate(
+        first_vote=Min('timestamp'), vote_count=Count('id')
+    ).order_by():
+        key = (row['voter_id'], row['post__election_id'])
+        if key not in first_votes or row['first_vote'] < first_votes[key][1]:
+            first_votes[key] = (row['voter__house'] or '', row['first_vote'])
+        votes_by_post[key][row['post_id']] += row['vote_count']
+    ballots = _ballots(election)
+    for voter_id, election_id, house, created_at in ballots.values_list(
+        'voter_id', 'election_id', 'house', 'created_at'
+    ):
+        key = (voter_id, election_id)
+        if key not in first_votes or created_at < first_votes[key][1]:
+            first_votes[key] = (house, created_at)
+    ballot_rows = ballots.only('voter_id', 'election_id', 'selections')
+    for ballot, _, post_id in iter_ballot_votes(ballot_rows, candidate_posts(election)):
+        votes_by_post[(ballot.voter_id, ballot.election_id)][post_id] += 1
+
+    participations.delete()
+    turnout.delete()
+
+    new_participations = []
+    house_counts = Counter()
+    schemas = {}
+    for (voter_id, election_id), (house, _) in first_votes.items():
+        if election_id not in schemas:
+            schemas[election_id] = BallotSchema.build(election_id)
+        counts = votes_by_post[(voter_id, election_id)]
+        new_participations.append(Participation(
+            voter_id=voter_id, election_id=election_id, house=house,
+            votes_cast=sum(counts.values()), is_complete=schemas[election_id].is_complete(house, counts)
+        ))
+        house_counts[(election_id, house)] += 1
+    created = Participation.objects.bulk_create(new_participations)
+
+    # created_at defaults to now; keep the time of the voter's first vote instead
+    for participation in created:
+        participation.created_at = first_votes[(participation.voter_id, participation.election_id)][1]
+    Participation.objects.bulk_update(created, ['created_at'], batch_size=500)
+
+    TurnoutTally.objects.bulk_create([
+        TurnoutTally(election_id=election_id, house=house, voters=count)
+        for (election_id, house), count in house_counts.items()
+    ])
+    return len(created)
+
+
+def _votes_by_voter(election_id):
+    """Map voter id -> Counter of post id -> votes for an election's votes in both stores."""
+    votes_by_voter = defaultdict(Counter)
+    for voter_id, post_id, vote_count in (
+        Vote.objects.filter(post__election_id=election_id)
+        .values_list('voter_id', 'post_id').annotate(vote_count=Count('id')).order_by()
+    ):
+        votes_by_voter[voter_id][post_id] += vote_count
+    ballots = Ballot.objects.filter(election_id=election_id).only('voter_id', 'selections')
+    for ballot, _, post_id in iter_ballot_votes(ballots, candidate_posts(election_id)):
+        votes_by_voter[ballot.voter_id][post_id] += 1
+    return votes_by_voter
+
+
+@transaction.atomic
+def refresh_completion(election_id):
+    """
+    Re-derive the vote counts and ballot completion of an election's participants
+    after its positions changed, updating only the rows that differ. Participants
+    left without votes (their positions were deleted) no longer count in turnout.
+    Returns the number of participation rows changed or removed.
+    """
+    participations = list(
+        Participation.objects.filter(election_id=election_id).only('id', 'voter_id', 'house', 'votes_cast', 'is_complete')
+    )
+    if not participations:
+        return 0
+
+    schema = BallotSchema.build(election_id)
+    votes_by_voter = _votes_by_voter(election_id)
+    changed = []
+    removed = []
+    for participation in participations:
+        counts = votes_by_voter.get(participation.voter_id)
+        if not counts:
+            removed.append(participation)
+            continue
+        votes_cast = sum(counts.values())
+        is_complete = schema.is_complete(participation.house, counts)
+        if (participation.votes_cast, participation.is_complete) != (votes_cast, is_complete):
+            participation.votes_cast, participation.is_complete = votes_cast, is_complete
+            changed.append(participation)
+
+    Participation.objects.bulk_update(changed, ['votes_cast', 'is_complete'], batch_size=500)
+    if removed:
+        Participation.objects.filter(pk__in=[participation.pk for participation in removed]).delete()
+        for house, count in Counter(participation.house for participation in removed).items():
+            TurnoutTally.objects.filter(election_id=election_id, house=house).update(voters=F('voters') - count)
+    return len(changed) + len(removed)
+
+
+@transaction.atomic
+def rebuild_timeline(election=None):
+    """
+    Back-fill the per-minute turnout buckets from the raw vote timestamps: the
+    votes cast in each minute, and the voters who cast their first ballot in it.
+    Returns the number of buckets written.
+    """
+    votes = Vote.objects.all()
+    buckets = TurnoutBucket.objects.all()
+    if election is not None:
+        votes = votes.filter(post__election=election)
+        buckets = buckets.filter(election=election)
+
+    rows = (
+        votes.annotate(minute=TruncMinute('timestamp'))
+        .values('post__election_id', 'voter__house', 'minute')
+        .annotate(vote_count=Count('id'))
+        .order_by()
+    )
+    counts = defaultdict(lambda: [0, 0])
+    for row in rows:
+        counts[(row['post__election_id'], row['voter__house'] or '', row['minute'])][1] += row['vote_count']
+
+    # A voter's ballot counts in the minute of their first vote
+    first_votes = {}
+    for election_id, voter_id, house, first_vote in votes.values_list(
+        'post__election_id', 'voter_id', 'voter__house'
+    ).annotate(first_vote=Min('timestamp')).order_by():
+        first_votes[(election_id, voter_id)] = (house or '', first_vote)
+    for ballot in _ballots(election).only('election_id', 'voter_id', 'house', 'created_at', 'selections'):
+        # Selections added to a stored ballot later are counted in the minute it was created
+        minute = ballot.created_at.replace(second=0, microsecond=0)
+        counts[(ballot.election_id, ballot.house, minute)][1] += len(unpack_selections(ballot.selections))
+        key = (ballot.election_id, ballot.voter_id)
+        if key not in first_votes or ballot.created_at < first_votes[key][1]:
+            first_votes[key] = (ballot.house, ballot.created_at)
+    for (election_id, _), (house, first_vote) in first_votes.items():
+        counts[(election_id, house, first_vote.replace(second=0, microsecond=0))][0] += 1
+
+    buckets.delete()
+    created = TurnoutBucket.objects.bulk_create([
+        TurnoutBucket(election_id=election_id, house=house, minute=minute, ballots=ballots, votes=vote_count)
+        for (election_id, house, minute), (ballots, vote_count) in counts.items()
+    ])
+    return len(created)
@@ -1,3 +1,1182 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from collections import Counter
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.contrib import admin
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from auth.throttling import reset_login_throttles
+from candidates.models import Candidate
+from posts.admin import ElectionAdmin
+from posts.models import Election, EligibleHouse, Post
+from posts.versioning import get_election_version
+from voting.admin import BallotAdmin, VoteAdmin
+from voting.audit import logging_removals, verify_ballot_log
+from voting.ballot_schema import get_ballot_schema
+from voting.ballot_store import STORAGE_BALLOTS, STORAGE_ROWS, candidate_posts, iter_ballot_votes, pack_selections
+from voting.ballots import VOTER_NOT_FOUND_BODY, BallotRejected, VoterNotFound, record_ballot, record_ballots
+from voting.idempotency import IdempotentReplay, request_hash
+from voting.ingest import GroupCommitWriter
+from voting.bench.seed import seed_election
+from voting.bench.stress import INGEST_MODES, STORAGES, login_tokens, reset_election, run_stress
+from voting.bench.suite import SCENARIOS
+from voting.models import (
+    Ballot, BallotLogEntry, IdempotencyKey, Participation, TurnoutBucket, TurnoutTally, Vote, Voter
+)
+from voting.results import build_election_results, count_votes, count_votes_by_house
+from voting.results_cache import ResultsCache, get_results_cache
+from voting.serializers import BulkVoteSerializer
+from voting.streams import ResultsBroadcaster, _results_snapshot, get_broadcaster, results_event_stream
+from voting.tallies import rebuild_tallies
+
+
+# "SCAN <table>" without "USING [COVERING] INDEX" is a full table scan in SQLite's query plan
+FULL_SCAN = re.compile(r'^SCAN (\S+)$')
+
+
+class TallyTests(TestCase):
+    """The tallies maintained with each ballot must equal a rebuild from the raw votes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.election = Election.objects.create(title='Tally election', is_active=True)
+        cls.head = Post.objects.create(election=cls.election, title='Head')
+        cls.council = Post.objects.create(election=cls.election, title='Council', required_selections=2)
+        cls.head_candidates = [Candidate.objects.create(name=f'Head {i}', post=cls.head) for i in range(2)]
+        cls.council_candidates = [Candidate.objects.create(name=f'Council {i}', post=cls.council) for i in range(3)]
+        cls.voters = [
+            Voter.objects.create(voter_no=f'TALLY{i}', full_name=f'Voter {i}', house=('AFRICA', 'AGAKHAN')[i % 2])
+            for i in range(6)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        # Half the ballots in each vote store, some cast in two parts
+        for i, voter in enumerate(self.voters):
+            head = [(self.head.id, self.head_candidates[i % 2].id)]
+            council = [(self.council.id, self.council_candidates[i % 3].id),
+                       (self.council.id, self.council_candidates[(i + 1) % 3].id)]
+            with self.settings(VOTE_STORAGE=STORAGES[i % 2]):
+                if i < 3:
+                    record_ballot(voter, self.election.id, head + council)
+                else:
+                    record_ballot(voter, self.election.id, head)
+                    record_ballot(voter, self.election.id, council)
+
+    def snapshot(self):
+        return {
+            'candidates': count_votes(self.election),
+            'houses': {candidate_id: dict(houses) for candidate_id, houses in count_votes_by_house(self.election).items()},
+            'turnout': sorted(TurnoutTally.objects.filter(election=self.election).values_list('house', 'voters')),
+            'participation': sorted(Participation.objects.filter(election=self.election).values_list(
+                'voter_id', 'house', 'votes_cast', 'is_complete'
+            )),
+            'timeline': sorted(TurnoutBucket.objects.filter(election=self.election).values_list(
+                'house', 'minute', 'ballots', 'votes'
+            )),
+        }
+
+    def assertMatchesRebuild(self, parts=None):
+        maintained = self.snapshot()
+        self.assertEqual(maintained['candidates'], count_votes(self.election, from_votes=True))
+        rebuild_tallies(self.election)
+        rebuilt = self.snapshot()
+        for part in parts or maintained:
+            self.assertEqual(rebuilt[part], maintained[part], part)
+        return maintained
+
+    def test_casts(self):
+        maintained = self.assertMatchesRebuild()
+        self.assertEqual(maintained['candidates'][self.head_candidates[0].id], 3)
+        self.assertEqual(maintained['houses'][self.head_candidates[0].id], {'AFRICA': 3})
+        self.assertEqual(maintained['turnout'], [('AFRICA', 3), ('AGAKHAN', 3)])
+        self.assertEqual(sum(ballots for _, _, ballots, _ in maintained['timeline']), 6)
+        self.assertEqual(sum(votes for _, _, _, votes in maintained['timeline']), 18)
+
+    def test_admin_delete_rebuilds_only_its_election(self):
+        other = Election.objects.create(title='Other election')
+        other_post = Post.objects.create(election=other, title='Head')
+        other_candidate = Candidate.objects.create(name='Other 0', post=other_post)
+        record_ballot(self.voters[0], other.id, [(other_post.id, other_candidate.id)])
+        other_version = get_election_version(other.id)
+
+        request = RequestFactory().post('/admin/')
+        VoteAdmin(Vote, admin.site).delete_queryset(request, Vote.objects.filter(voter=self.voters[2], post=self.head))
+        self.assertEqual(get_election_version(other.id), other_version)
+        self.assertEqual(count_votes(other), {other_candidate.id: 1})
+
+        maintained = self.assertMatchesRebuild(['candidates', 'houses', 'turnout', 'participation'])
+        self.assertEqual(maintained['candidates'][self.head_candidates[0].id], 2)
+
+    def test_admin_ballot_delete(self):
+        other = Election.objects.create(title='Other election')
+        other_version = get_election_version(other.id)
+        ballot = Ballot.objects.get(voter=self.voters[1], election=self.election)
+        BallotAdmin(Ballot, admin.site).delete_model(RequestFactory().post('/admin/'), ballot)
+        self.assertEqual(get_election_version(other.id), other_version)
+        maintained = self.assertMatchesRebuild(['candidates', 'houses', 'turnout', 'participation'])
+        self.assertEqual(maintained['turnout'], [('AFRICA', 3), ('AGAKHAN', 2)])
+        self.assertEqual(verify_ballot_log(self.election, full=True)['errors'], [])
+
+    def test_house_breakdown(self):
+        get_results_cache().clear()
+        client = APIClient()
+        for path in ('/api/results/live/', '/api/async/results/live/'):
+            with self.subTest(path=path):
+                response = client.get(path, {'breakdown': 'house'})
+                self.assertEqual(response.status_code, 200, response.content)
+                head, council = response.json()['data']['positions']
+                self.assertEqual([candidate['houses']['AFRICA'] for candidate in head['candidates']], [3, 0])
+                self.assertEqual([candidate['houses']['AGAKHAN'] for candidate in head['candidates']], [0, 3])
+                self.assertEqual(head['houses']['AFRICA'], 3)
+                for position in (head, council):
+                    for candidate in position['candidates']:
+                        self.assertEqual(sum(candidate['houses'].values()), candidate['votes'])
+                self.assertEqual(client.get(path, {'breakdown': 'stream'}).status_code, 400)
+
+    def test_turnout_statistics(self):
+        # The maintained counters must agree with a distinct count of voters over both vote stores
+        Voter.objects.create(voter_no='TALLY9', full_name='Absent voter', house='AFRICA')
+        voted = {house: set() for house, _ in Voter.HOUSE_CHOICES}
+        for voter_id, house in Vote.objects.filter(post__election=self.election).values_list('voter_id', 'voter__house'):
+            voted[house].add(voter_id)
+        for voter_id, house in Ballot.objects.filter(election=self.election).values_list('voter_id', 'voter__house'):
+            voted[house].add(voter_id)
+
+        get_results_cache().clear()
+        for path in ('/api/results/live/', '/api/async/results/live/'):
+            with self.subTest(path=path):
+                response = APIClient().get(path)
+                self.assertEqual(response.status_code, 200, response.content)
+                statistics = response.json()['data']['statistics']
+                self.assertEqual(statistics['total_voters'], 7)
+                self.assertEqual(statistics['voted_count'], len(set().union(*voted.values())))
+                houses = {house['house']: house for house in statistics['houses']}
+                self.assertEqual(
+                    {house: line['voted_count'] for house, line in houses.items()},
+                    {house: len(voter_ids) for house, voter_ids in voted.items() if house in houses}
+                )
+                self.assertEqual(houses['AFRICA']['total_voters'], 4)
+                self.assertEqual(houses['AFRICA']['voter_turnout_percentage'], 75.0)
+
+    def test_timeline(self):
+        client = APIClient()
+        response = client.get('/api/results/timeline/')
+        self.assertEqual(response.status_code, 200, response.content)
+        series = response.json()['data']['series']
+        self.assertEqual([line['house'] for line in series], ['AFRICA', 'AGAKHAN'])
+        for line in series:
+            # Three voters per house, each counted once however many ballots they cast
+            self.assertEqual(sum(point['ballots'] for point in line['points']), 3)
+            self.assertEqual(sum(point['votes'] for point in line['points']), 9)
+
+        later = max(point['minute'] for line in series for point in line['points'])
+        response = client.get('/api/results/timeline/', {'since': '2999-01-01T00:00:00Z'})
+        self.assertEqual(response.json()['data']['series'], [])
+        response = client.get('/api/results/timeline/', {'since': later})
+        minutes = {point['minute'] for line in response.json()['data']['series'] for point in line['points']}
+        self.assertEqual(minutes, {later})
+        self.assertEqual(client.get('/api/results/timeline/', {'since': 'yesterday'}).status_code, 400)
+
+    def test_deleted_candidate(self):
+        # Its votes and tally rows go with it, and ballots that chose it are no longer complete
+        with self.captureOnCommitCallbacks(execute=True):
+            self.council_candidates[0].delete()
+        maintained = self.assertMatchesRebuild(['candidates', 'houses', 'turnout', 'participation'])
+        self.assertEqual(sum(not complete for _, _, _, complete in maintained['participation']), 4)
+        self.assertNotIn(self.council_candidates[0].id, maintained['candidates'])
+
+
+class ResultsEngineTests(TestCase):
+    """Totals, percentages, rank and winner status of each position, built in memory."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.election = Election.objects.create(title='Results election', is_active=True)
+        cls.head = Post.objects.create(election=cls.election, title='Head')
+        cls.council = Post.objects.create(election=cls.election, title='Council', required_selections=2)
+        cls.treasurer = Post.objects.create(election=cls.election, title='Treasurer')
+        cls.candidates = {
+            name: Candidate.objects.create(name=name, post=post)
+            for post, names in ((cls.head, 'Bob Alice Carol'), (cls.council, 'Dan Eve Fay Gus'),
+                                (cls.treasurer, 'Hal Ivy'))
+            for name in names.split()
+        }
+        cls.voters = [Voter.objects.create(voter_no=f'RES{i}', full_name=f'Voter {i}', house='AFRICA') for i in range(5)]
+
+    def setUp(self):
+        cache.clear()
+        ballots = [
+            ['Alice', 'Eve', 'Dan'], ['Alice', 'Eve', 'Dan'], ['Bob', 'Eve', 'Fay'], ['Bob', 'Fay'], ['Carol'],
+        ]
+        for i, (voter, names) in enumerate(zip(self.voters, ballots)):
+            with self.settings(VOTE_STORAGE=STORAGES[i % 2]):
+                record_ballot(voter, self.election.id, [
+                    (self.candidates[name].post_id, self.candidates[name].id) for name in names
+                ])
+
+    def positions(self, **kwargs):
+        return {
+            position['title']: (position, {candidate['name']: candidate for candidate in position['candidates']})
+            for position in build_election_results(self.election, **kwargs)
+        }
+
+    def summary(self, candidates):
+        return {
+            name: (candidate['votes'], candidate['percentage'], candidate['rank'], candidate['status'])
+            for name, candidate in candidates.items()
+        }
+
+    def test_tie_at_the_seat_cutoff(self):
+        position, candidates = self.positions()['Head']
+        self.assertEqual(position['total_votes'], 5)
+        # Equal votes are ordered by name, so only the first of the tied pair wins the single seat
+        self.assertEqual(self.summary(candidates), {
+            'Alice': (2, 40.0, 1, 'Winner'),
+            'Bob': (2, 40.0, 2, 'Runner-up'),
+            'Carol': (1, 20.0, 3, 'Runner-up'),
+        })
+
+    def test_two_seat_position(self):
+        position, candidates = self.positions()['Council']
+        self.assertEqual(position['required_selections'], 2)
+        self.assertEqual(position['total_votes'], 7)
+        self.assertEqual(self.summary(candidates), {
+            'Eve': (3, 42.86, 1, 'Winner'),
+            'Dan': (2, 28.57, 2, 'Winner'),
+            'Fay': (2, 28.57, 3, 'Runner-up'),
+            'Gus': (0, 0, 4, '-'),
+        })
+
+    def test_position_without_votes(self):
+        position, candidates = self.positions()['Treasurer']
+        self.assertEqual(position['total_votes'], 0)
+        self.assertEqual(self.summary(candidates), {'Hal': (0, 0, 1, '-'), 'Ivy': (0, 0, 2, '-')})
+
+    def test_tallies_match_the_raw_votes(self):
+        self.assertEqual(count_votes(self.election), count_votes(self.election, from_votes=True))
+        self.assertEqual(self.positions(), self.positions(from_votes=True))
+
+
+class ResultsETagTests(TestCase):
+    """Live results answer If-None-Match with 304 until the data behind them changes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.election = Election.objects.create(title='ETag election', is_active=True)
+        cls.head = Post.objects.create(election=cls.election, title='Head')
+        cls.candidate = Candidate.objects.create(name='Head 0', post=cls.head)
+        cls.voter = Voter.objects.create(voter_no='ETAG1', full_name='Voter', house='AFRICA')
+
+    def setUp(self):
+        cache.clear()
+        get_results_cache().clear()
+        self.client = APIClient()
+
+    def etag(self, path='/api/results/live/'):
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response['ETag']
+
+    def assertNotModified(self, etag, path='/api/results/live/'):
+        response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_not_modified(self):
+        for path in ('/api/results/live/', '/api/async/results/live/', '/api/results/timeline/'):
+            with self.subTest(path=path):
+                self.assertNotModified(self.etag(path), path)
+
+    def test_cast_changes_the_etag(self):
+        etag = self.etag()
+        record_ballot(self.voter, self.election.id, [(self.head.id, self.candidate.id)])
+        response = self.client.get('/api/results/live/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['data']['positions'][0]['candidates'][0]['votes'], 1)
+
+    def test_voter_register_changes(self):
+        etag = self.etag()
+        self.voter.full_name = 'Renamed voter'
+        self.voter.save()
+        self.assertNotModified(etag)
+
+        # Registered voters per house are part of the statistics
+        self.voter.house = 'AGAKHAN'
+        self.voter.save()
+        moved = self.etag()
+        self.assertNotEqual(moved, etag)
+
+        Voter.objects.filter(pk=self.voter.pk).get().delete()
+        self.assertNotEqual(self.etag(), moved)
+
+    def test_candidate_moved_to_another_election(self):
+        other = Election.objects.create(title='Other election')
+        other_head = Post.objects.create(election=other, title='Head')
+        etag = self.etag()
+        other_version = get_election_version(other.id)
+
+        self.candidate.post = other_head
+        self.candidate.save()
+        response = self.client.get('/api/results/live/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data']['positions'][0]['candidates'], [])
+        self.assertNotEqual(get_election_version(other.id), other_version)
+
+
+class ResultsStreamTests(TestCase):
+    """The shared live results producer."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.election = Election.objects.create(title='Stream election', is_active=True)
+        cls.head = Post.objects.create(election=cls.election, title='Head')
+        cls.candidate = Candidate.objects.create(name='Head 0', post=cls.head, photo='candidates/photos/head.jpg')
+
+    def setUp(self):
+        cache.clear()
+
+    def snapshot_photo(self):
+        snapshot = json.loads(_results_snapshot(self.election.id))
+        return snapshot['data']['positions'][0]['candidates'][0]['photo']
+
+    def test_snapshot_photo_urls(self):
+        self.assertTrue(self.snapshot_photo().startswith('/'), self.snapshot_photo())
+        with self.settings(RESULTS_STREAM_BASE_URL='https://vote.example.org/'):
+            self.assertTrue(self.snapshot_photo().startswith('https://vote.example.org/'), self.snapshot_photo())
+
+    async def test_one_broadcaster_per_election(self):
+        self.assertIs(get_broadcaster(self.election.id), get_broadcaster(self.election.id))
+
+    async def test_event_stream(self):
+        stream = results_event_stream(get_broadcaster(self.election.id))
+        try:
+            self.assertEqual(await anext(stream), 'retry: 3000\n\n')
+            event = await asyncio.wait_for(anext(stream), timeout=5)
+        finally:
+            await stream.aclose()
+        header, data = event.rstrip('\n').split('\ndata: ')
+        self.assertEqual(header, 'id: 1\nevent: results')
+        self.assertEqual(json.loads(data)['data']['positions'][0]['candidates'][0]['name'], 'Head 0')
+
+    @mock.patch('voting.streams.get_election_version', return_value='1')
+    async def test_producer_survives_a_failed_snapshot(self, _version):
+        broadcaster = ResultsBroadcaster(self.election.id, asyncio.get_running_loop())
+        with self.settings(RESULTS_STREAM_POLL_INTERVAL=0.01), \
+                mock.patch('voting.streams._results_snapshot', side_effect=[RuntimeError('boom'), 'snapshot']), \
+                self.assertLogs('voting.streams', 'ERROR'):
+            queue = broadcaster.subscribe()
+            try:
+                self.assertEqual(await asyncio.wait_for(queue.get(), timeout=5), 'snapshot')
+            finally:
+                broadcaster.unsubscribe(queue)
+
+
+class ResultsCacheTests(TestCase):
+    """Rendered results are built once per version and bounded in memory."""
+
+    def builder(self, body=b'body', delay=0):
+        calls = []
+
+        def build():
+            calls.append(body)
+            time.sleep(delay)
+            return body
+        return build, calls
+
+    def test_one_version_per_scope(self):
+        results = ResultsCache()
+        build, calls = self.builder()
+        self.assertEqual(results.get_or_build('live', 'v1', build), b'body')
+        self.assertEqual(results.get_or_build('live', 'v1', build), b'body')
+        self.assertEqual(len(calls), 1)
+
+        new_build, new_calls = self.builder(b'new')
+        self.assertEqual(results.get_or_build('live', 'v2', new_build), b'new')
+        self.assertIsNone(results.peek('live', 'v1'))
+        self.assertEqual(len(new_calls), 1)
+
+    def test_bounded(self):
+        results = ResultsCache(max_entries=2, max_bytes=10)
+        for scope in ('a', 'b', 'c'):
+            results.get_or_build(scope, 'v1', self.builder(b'xxx')[0])
+        # 'a' was the least recently used
+        self.assertIsNone(results.peek('a', 'v1'))
+        self.assertEqual(results.peek('c', 'v1'), b'xxx')
+
+        results.get_or_build('d', 'v1', self.builder(b'y' * 9)[0])
+        self.assertIsNone(results.peek('c', 'v1'))
+        self.assertEqual(results.peek('d', 'v1'), b'y' * 9)
+        # A body larger than the whole budget is served but not kept
+        self.assertEqual(results.get_or_build('e', 'v1', self.builder(b'z' * 11)[0]), b'z' * 11)
+        self.assertIsNone(results.peek('e', 'v1'))
+
+    def test_concurrent_misses_build_once(self):
+        results = ResultsCache()
+        build, calls = self.builder(delay=0.2)
+        bodies = []
+        threads = [
+            threading.Thread(target=lambda: bodies.append(results.get_or_build('live', 'v1', build)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(bodies, [b'body'] * 8)
+        self.assertEqual(len(calls), 1)
+
+    def test_shared_tier(self):
+        cache.clear()
+        build, calls = self.builder()
+        first, second = ResultsCache(shared_alias='default'), ResultsCache(shared_alias='default')
+        self.assertEqual(first.get_or_build('live', 'v1', build), b'body')
+        # Another worker process finds the body in the shared cache
+        self.assertEqual(second.get_or_build('live', 'v1', build), b'body')
+        self.assertEqual(len(calls), 1)
+
+
+class EligibilityMatrixTests(TestCase):
+    """Who may vote for which position comes from the cached ballot schema, without queries."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.election = Election.objects.create(title='Matrix election', is_active=True)
+        cls.head = Post.objects.create(election=cls.election, title='Head')
+        cls.captain = Post.objects.create(election=cls.election, title='Captain')
+        EligibleHouse.objects.create(post=cls.captain, house='AFRICA')
+        cls.head_candidate = Candidate.objects.create(name='Head 0', post=cls.head)
+        cls.captain_candidate = Candidate.objects.create(name='Captain 0', post=cls.captain)
+
+    def setUp(self):
+        cache.clear()
+
+    def validate(self, voter, selections):
+        """Validate a ballot of (post, candidate) pairs for the voter; returns the serializer errors."""
+        request = RequestFactory().post('/api/vote/cast/')
+        request.user = voter
+        serializer = BulkVoteSerializer(
+            data={'votes': [{'post': post.id, 'candidate': candidate.id} for post, candidate in selections]},
+            context={'request': request},
+        )
+        serializer.is_valid()
+        return serializer.errors
+
+    def test_matrix(self):
+        schema = get_ballot_schema(self.election.id)
+        self.assertEqual(schema.eligibility['AFRICA'], {self.head.id, self.captain.id})
+        self.assertEqual(schema.eligibility['AGAKHAN'], {self.head.id})
+        self.assertEqual(schema.eligibility[''], {self.head.id})
+        self.assertEqual(schema.eligible_post_ids(None), {self.head.id})
+
+    def test_is_voter_eligible_needs_no_queries(self):
+        africa = Voter(voter_no='M1', full_name='Africa voter', house='AFRICA')
+        homeless = Voter(voter_no='M2', full_name='No house', house='')
+        self.assertTrue(self.captain.is_voter_eligible(africa))
+
+        with self.assertNumQueries(0):
+            self.assertTrue(self.captain.is_voter_eligible(africa))
+            self.assertFalse(self.captain.is_voter_eligible(homeless))
+            self.assertTrue(self.head.is_voter_eligible(homeless))
+
+    def test_house_rules_invalidate_the_matrix(self):
+        agakhan = Voter(voter_no='M3', full_name='Agakhan voter', house='AGAKHAN')
+        self.assertFalse(self.captain.is_voter_eligible(agakhan))
+        rule = EligibleHouse.objects.create(post=self.captain, house='AGAKHAN')
+        self.assertTrue(self.captain.is_voter_eligible(agakhan))
+        rule.delete()
+        self.assertFalse(self.captain.is_voter_eligible(agakhan))
+        EligibleHouse.objects.create(post=self.head, house='AFRICA')
+        self.assertFalse(self.head.is_voter_eligible(agakhan))
+
+    def test_valid_ballot_needs_no_queries(self):
+        africa = Voter(voter_no='M5', full_name='Africa voter', house='AFRICA')
+        ballot = [(self.head, self.head_candidate), (self.captain, self.captain_candidate)]
+        self.assertEqual(self.validate(africa, ballot), {})
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.validate(africa, ballot), {})
+            self.assertTrue(self.validate(africa, [(self.head, self.captain_candidate)]))
+            self.assertTrue(self.validate(Voter(voter_no='M6', full_name='No house', house=''), ballot))
+
+    def test_changes_invalidate_the_schema(self):
+        africa = Voter(voter_no='M7', full_name='Africa voter', house='AFRICA')
+        agakhan = Voter(voter_no='M8', full_name='Agakhan voter', house='AGAKHAN')
+        self.assertEqual(self.validate(africa, [(self.head, self.head_candidate)]), {})
+
+        candidate = Candidate.objects.create(name='Head 1', post=self.head)
+        self.assertEqual(self.validate(africa, [(self.head, candidate)]), {})
+        candidate.post = self.captain
+        candidate.save()
+        self.assertTrue(self.validate(africa, [(self.head, candidate)]))
+        self.assertEqual(self.validate(africa, [(self.captain, candidate)]), {})
+        candidate.delete()
+        self.assertTrue(self.validate(africa, [(self.captain, candidate)]))
+
+        deputy = Post.objects.create(election=self.election, title='Deputy', required_selections=2)
+        deputies = [Candidate.objects.create(name=f'Deputy {i}', post=deputy) for i in range(2)]
+        self.assertTrue(self.validate(africa, [(deputy, deputies[0])]))
+        self.assertEqual(self.validate(africa, [(deputy, deputies[0]), (deputy, deputies[1])]), {})
+        deputy.required_selections = 1
+        deputy.save()
+        self.assertEqual(self.validate(africa, [(deputy, deputies[0])]), {})
+
+        self.assertTrue(self.validate(agakhan, [(self.captain, self.captain_candidate)]))
+        rule = EligibleHouse.objects.create(post=self.captain, house='AGAKHAN')
+        self.assertEqual(self.validate(agakhan, [(self.captain, self.captain_candidate)]), {})
+        rule.delete()
+        self.assertTrue(self.validate(agakhan, [(self.captain, self.captain_candidate)]))
+
+    def test_positions_without_an_active_election(self):
+        voter = Voter.objects.create(voter_no='M4', full_name='Africa voter', house='AFRICA', pin='123456')
+        Election.objects.filter(pk=self.election.pk).update(is_active=False)
+        client = APIClient()
+        client.force_authenticate(user=voter)
+
+        response = client.get('/api/positions/')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['results'], [])
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN is SQLite syntax')
+class HotPathQueryPlanTests(TestCase):
+    """The queries behind the election-day endpoints must all be served by indexes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.election = Election.objects.create(title='Plan election', is_active=True)
+        cls.head = Post.objects.create(election=cls.election, title='Head', required_selections=1)
+        cls.council = Post.objects.create(election=cls.election, title='Council', required_selections=2)
+        cls.captain = Post.objects.create(election=cls.election, title='Captain', required_selections=1)
+        EligibleHouse.objects.create(post=cls.captain, house='AFRICA')
+        cls.candidates = {
+            post.id: [Candidate.objects.create(name=f'{post.title} {i}', post=post) for i in range(3)]
+            for post in (cls.head, cls.council, cls.captain)
+        }
+        cls.voters = [
+            Voter.objects.create(voter_no=f'PLAN{i}', full_name=f'Voter {i}', house='AFRICA', pin='123456')
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        reset_login_throttles()
+        get_results_cache().clear()
+        self.client = APIClient()
+
+    def ballot(self):
+        return {'votes': [
+            {'post': self.head.id, 'candidate': self.candidates[self.head.id][0].id},
+            {'post': self.council.id, 'candidate': self.candidates[self.council.id][0].id},
+            {'post': self.council.id, 'candidate': self.candidates[self.council.id][1].id},
+            {'post': self.captain.id, 'candidate': self.candidates[self.captain.id][2].id},
+        ]}
+
+    def login(self, voter):
+        response = self.client.post(
+            '/api/auth/voter/login/', {'voter_no': voter.voter_no, 'pin': '123456'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {response.json()["data"]["access"]}')
+
+    def assertNoFullScans(self, queries):
+        checked = 0
+        for query in queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE')):
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                plan = [row[-1] for row in cursor.fetchall()]
+            scans = [detail for detail in plan if FULL_SCAN.match(detail)]
+            self.assertFalse(scans, f'Full table scan {scans} in:\n{sql}\nPlan: {plan}')
+            checked += 1
+        self.assertGreater(checked, 0)
+
+    def capture(self, request):
+        with CaptureQueriesContext(connection) as context:
+            response = request()
+        return response, context.captured_queries
+
+    def test_voter_login(self):
+        # A voter who has already started voting takes the longest path
+        self.login(self.voters[0])
+        self.client.post('/api/vote/cast/', {'votes': self.ballot()['votes'][:1]}, format='json')
+
+        response, queries = self.capture(lambda: self.client.post(
+            '/api/auth/voter/login/', {'voter_no': self.voters[0].voter_no, 'pin': '123456'}, format='json'
+        ))
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertNoFullScans(queries)
+
+    def test_voter_status(self):
+        self.login(self.voters[0])
+        self.client.post('/api/vote/cast/', {'votes': self.ballot()['votes'][:1]}, format='json')
+
+        response, queries = self.capture(lambda: self.client.get('/api/voter/status/'))
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertNoFullScans(queries)
+
+    def test_cast_bulk_votes(self):
+        self.login(self.voters[1])
+        response, queries = self.capture(lambda: self.client.post('/api/vote/cast/', self.ballot(), format='json'))
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertNoFullScans(queries)
+
+    def test_rejected_recast(self):
+        self.login(self.voters[1])
+        self.client.post('/api/vote/cast/', self.ballot(), format='json')
+        response, queries = self.capture(lambda: self.client.post('/api/vote/cast/', self.ballot(), format='json'))
+        self.assertEqual(response.status_code, 400, response.content)
+        self.assertNoFullScans(queries)
+
+    def test_live_results(self):
+        self.login(self.voters[2])
+        self.client.post('/api/vote/cast/', self.ballot(), format='json')
+        self.client.credentials()
+
+        for breakdown in ('', '?breakdown=house'):
+            get_results_cache().clear()
+            response, queries = self.capture(lambda: self.client.get(f'/api/results/live/{breakdown}'))
+            self.assertEqual(response.status_code, 200, response.content)
+            self.assertNoFullScans(queries)
+
+
+class AsyncViewContractTests(TestCase):
+    """The async voter endpoints answer with the same status codes and bodies as the sync ones."""
+
+    PATHS = {
+        'status': ('/api/voter/status/', '/api/async/voter/status/'),
+        'cast': ('/api/vote/cast/', '/api/async/vote/cast/'),
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.election = Election.objects.create(title='Async election', is_active=True)
+        cls.head = Post.objects.create(election=cls.election, title='Head')
+        cls.captain = Post.objects.create(election=cls.election, title='Captain')
+        EligibleHouse.objects.create(post=cls.captain, house='AFRICA')
+        cls.head_candidates = [Candidate.objects.create(name=f'Head {i}', post=cls.head) for i in range(2)]
+        cls.captain_candidate = Candidate.objects.create(name='Captain 0', post=cls.captain)
+        cls.voters = [
+            Voter.objects.create(voter_no=f'ASYNC{i}', full_name='Voter', house='AFRICA', pin='123456')
+            for i in range(2)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        reset_login_throttles()
+        self.clients = [self.login(voter) for voter in self.voters]
+
+    def login(self, voter):
+        client = APIClient()
+        response = client.post('/api/auth/voter/login/', {'voter_no': voter.voter_no, 'pin': '123456'}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {response.json()["data"]["access"]}')
+        return client
+
+    def request(self, client, path, data=None):
+        if data is None:
+            response = client.get(path)
+        else:
+            response = client.post(path, data, format='json')
+        return response.status_code, response.json()
+
+    def assertSameContract(self, endpoint, data=None, clients=None, status_code=None):
+        """Send the request to the sync view with the first client and to the async view with the second."""
+        sync_path, async_path = self.PATHS[endpoint]
+        sync_client, async_client = clients or self.clients
+        sync_response = self.request(sync_client, sync_path, data)
+        async_response = self.request(async_client, async_path, data)
+        self.assertEqual(async_response, sync_response)
+        if status_code is not None:
+            self.assertEqual(sync_response[0], status_code, sync_response[1])
+        return sync_response[1]
+
+    def test_unauthenticated(self):
+        anonymous = APIClient()
+        forged = APIClient()
+        forged.credentials(HTTP_AUTHORIZATION='Bearer not-a-token')
+        ballot = {'votes': [{'post': self.head.id, 'candidate': self.head_candidates[0].id}]}
+        for endpoint, data in (('status', None), ('cast', ballot)):
+            for client in (anonymous, forged):
+                with self.subTest(endpoint=endpoint, token=client is forged):
+                    self.assertSameContract(endpoint, data, (client, client), 401)
+        self.assertFalse(Participation.objects.exists())
+
+    def test_status_and_cast(self):
+        # Both voters go through the same steps, one on the sync views and one on the async views
+        before = self.assertSameContract('status', clients=(self.clients[0], self.clients[0]), status_code=200)
+        self.assertEqual(len(before['data']['eligible_positions']), 2)
+
+        partial = {'votes': [{'post': self.head.id, 'candidate': self.head_candidates[0].id}]}
+        self.assertEqual(self.assertSameContract('cast', partial, status_code=201)['votes_count'], 1)
+        statuses = [self.request(client, path)[1]['data'] for client, path in zip(self.clients, self.PATHS['status'])]
+        self.assertEqual(*[{**data, 'voter': None} for data in statuses])
+        self.assertEqual(statuses[0]['voted_positions'], ['Head'])
+        self.assertFalse(statuses[0]['ballot_complete'])
+
+        invalid = {'votes': [{'post': self.captain.id, 'candidate': self.head_candidates[1].id}]}
+        body = self.assertSameContract('cast', invalid, status_code=400)
+        self.assertFalse(body['success'])
+        self.assertEqual(self.assertSameContract('cast', {'votes': []}, status_code=400)['message'], body['message'])
+
+        rest = {'votes': [{'post': self.captain.id, 'candidate': self.captain_candidate.id}]}
+        self.assertSameContract('cast', rest, status_code=201)
+        statuses = [self.request(client, path)[1]['data'] for client, path in zip(self.clients, self.PATHS['status'])]
+        self.assertEqual(*[{**data, 'voter': None} for data in statuses])
+        self.assertTrue(statuses[0]['ballot_complete'])
+        self.assertEqual(count_votes(self.election), {self.head_candidates[0].id: 2, self.captain_candidate.id: 2})
+
+    def test_revote_reports_rejected_positions(self):
+        head = {'post': self.head.id, 'candidate': self.head_candidates[0].id}
+        captain = {'post': self.captain.id, 'candidate': self.captain_candidate.id}
+        for i, storage in enumerate(STORAGES):
+            voters = [
+                Voter.objects.create(voter_no=f'REVOTE{i}{j}', full_name='Voter', house='AFRICA', pin='123456')
+                for j in range(2)
+            ]
+            clients = [self.login(voter) for voter in voters]
+            with self.subTest(storage=storage), self.settings(VOTE_STORAGE=storage):
+                self.assertSameContract('cast', {'votes': [head]}, clients, 201)
+                body = self.assertSameContract('cast', {'votes': [captain, head]}, clients, 400)
+                self.assertEqual(body['rejected_positions'], [{'id': self.head.id, 'title': 'Head'}])
+                self.assertEqual(body['errors'], {'non_field_errors': ['You have already voted for position: Head']})
+                # The whole ballot is refused, including the position not voted for yet
+                for voter in voters:
+                    participation = Participation.objects.get(voter=voter, election=self.election)
+                    self.assertEqual((participation.votes_cast, participation.is_complete), (1, False))
+
+
+class ParticipationCompletionTests(TestCase):
+    """Ballot completion follows position changes, recomputed in place and only when it can change."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.election = Election.objects.create(title='Completion election', is_active=True)
+        cls.head = Post.objects.create(election=cls.election, title='Head')
+        cls.captain = Post.objects.create(election=cls.election, title='Captain')
+        EligibleHouse.objects.create(post=cls.captain, house='AFRICA')
+        cls.head_candidates = [Candidate.objects.create(name=f'Head {i}', post=cls.head) for i in range(2)]
+        cls.voter = Voter.objects.create(voter_no='DONE1', full_name='Agakhan voter', house='AGAKHAN')
+
+    def setUp(self):
+        cache.clear()
+        record_ballot(self.voter, self.election.id, [(self.head.id, self.head_candidates[0].id)])
+        self.participation = Participation.objects.get(voter=self.voter, election=self.election)
+        self.assertTrue(self.participation.is_complete)
+
+    def refreshed(self):
+        participation = Participation.objects.get(voter=self.voter, election=self.election)
+        self.assertEqual(participation.pk, self.participation.pk)
+        return participation
+
+    def test_new_eligibility_rule(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            rule = EligibleHouse.objects.create(post=self.captain, house='AGAKHAN')
+        self.assertFalse(self.refreshed().is_complete)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            rule.delete()
+        self.assertTrue(self.refreshed().is_complete)
+
+    def test_resized_position(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.head.required_selections = 2
+            self.head.save()
+        self.assertFalse(self.refreshed().is_complete)
+
+    def test_edits_that_cannot_change_completion(self):
+        with mock.patch('posts.signals.refresh_completion') as refresh:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.head.description = 'Leads the school'
+                self.head.save()
+                rule = EligibleHouse.objects.get(post=self.captain)
+                rule.save()
+        refresh.assert_not_called()
+
+    def test_deleted_position(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.head.delete()
+        self.assertFalse(Participation.objects.filter(voter=self.voter).exists())
+        self.assertEqual(TurnoutTally.objects.get(election=self.election, house='AGAKHAN').voters, 0)
+
+
+class IdempotencyKeyTests(TestCase):
+    """A retried cast with the same Idempotency-Key replays the first response and casts nothing."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.election = Election.objects.create(title='Retry election', is_active=True)
+        cls.head = Post.objects.create(election=cls.election, title='Head')
+        cls.candidates = [Candidate.objects.create(name=f'Candidate {i}', post=cls.head) for i in range(2)]
+        cls.voter = Voter.objects.create(voter_no='RETRY1', full_name='Retrying voter', house='AFRICA', pin='123456')
+
+    def setUp(self):
+        cache.clear()
+        reset_login_throttles()
+        self.client = APIClient()
+        response = self.client.post(
+            '/api/auth/voter/login/', {'voter_no': self.voter.voter_no, 'pin': '123456'}, format='json'
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {response.json()["data"]["access"]}')
+
+    def ballot(self, index=0):
+        return {'votes': [{'post': self.head.id, 'candidate': self.candidates[index].id}]}
+
+    def cast(self, body, key='tablet-1', path='/api/vote/cast/'):
+        return self.client.post(path, body, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_the_first_response(self):
+        for path in ('/api/vote/cast/', '/api/async/vote/cast/'):
+            with self.subTest(path=path):
+                Vote.objects.all().delete()
+                first = self.cast(self.ballot(), key=path, path=path)
+                retry = self.cast(self.ballot(), key=path, path=path)
+                self.assertEqual(first.status_code, 201, first.content)
+                self.assertEqual(retry.status_code, 201, retry.content)
+                self.assertEqual(retry.json(), first.json())
+                self.assertEqual(retry['Idempotent-Replayed'], 'true')
+                self.assertEqual(Vote.objects.filter(voter=self.voter).count(), 1)
+
+    def test_key_reused_with_another_body(self):
+        self.assertEqual(self.cast(self.ballot(0)).status_code, 201)
+        for path in ('/api/vote/cast/', '/api/async/vote/cast/'):
+            response = self.cast(self.ballot(1), path=path)
+            self.assertEqual(response.status_code, 422, response.content)
+            self.assertFalse(response.has_header('Idempotent-Replayed'))
+        self.assertEqual(
+            list(Vote.objects.filter(voter=self.voter).values_list('candidate_id', flat=True)), [self.candidates[0].id]
+        )
+
+    def test_retry_racing_the_first_request(self):
+        for storage in STORAGES:
+            with self.subTest(storage=storage), self.settings(VOTE_STORAGE=storage):
+                Vote.objects.all().delete()
+                Ballot.objects.all().delete()
+                IdempotencyKey.objects.all().delete()
+                self.assertRacingRetryReplays()
+
+    def assertRacingRetryReplays(self):
+        # The retry passed the stored-response lookup before the first request committed
+        self.assertEqual(self.cast(self.ballot()).status_code, 201)
+        with self.assertRaises(IdempotentReplay) as raised:
+            record_ballot(
+                self.voter, self.election.id, [(self.head.id, self.candidates[0].id)],
+                'tablet-1', request_hash(self.ballot()),
+            )
+        self.assertEqual(raised.exception.status_code, 201)
+        self.assertEqual(raised.exception.headers, {'Idempotent-Replayed': 'true'})
+
+        with self.assertRaises(IdempotentReplay) as raised:
+            record_ballot(
+                self.voter, self.election.id, [(self.head.id, self.candidates[1].id)],
+                'tablet-1', request_hash(self.ballot(1)),
+            )
+        self.assertEqual(raised.exception.status_code, 422)
+        self.assertEqual(IdempotencyKey.objects.filter(voter=self.voter).count(), 1)
+
+
+class BallotLogTests(TestCase):
+    """The hash-chained ballot log must account for every stored vote and expose tampering."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.election = Election.objects.create(title='Log election', is_active=True)
+        cls.head = Post.objects.create(election=cls.election, title='Head')
+        cls.deputy = Post.objects.create(election=cls.election, title='Deputy')
+        cls.candidates = [Candidate.objects.create(name=f'Candidate {i}', post=cls.head) for i in range(2)]
+        cls.deputy_candidate = Candidate.objects.create(name='Deputy 0', post=cls.deputy)
+        cls.voters = [
+            Voter.objects.create(voter_no=f'LOG{i}', full_name=f'Voter {i}', house='AFRICA') for i in range(4)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        for i, voter in enumerate(self.voters):
+            record_ballot(voter, self.election.id, [
+                (self.head.id, self.candidates[i % 2].id), (self.deputy.id, self.deputy_candidate.id),
+            ])
+
+    def assertVerifies(self, full=True):
+        report = verify_ballot_log(self.election, full=full)
+        self.assertEqual(report['errors'], [])
+        return report
+
+    def assertFailsWith(self, text):
+        errors = verify_ballot_log(self.election, full=True)['errors']
+        self.assertTrue(any(text in error for error in errors), errors)
+
+    def test_intact_log(self):
+        report = self.assertVerifies()
+        self.assertEqual(report['entries'], 4)
+
+    def test_edited_entry(self):
+        entry = BallotLogEntry.objects.get(election=self.election, seq=2)
+        entry.selections = pack_selections([self.candidates[0].id, self.deputy_candidate.id])
+        entry.save()
+        self.assertFailsWith('Entry 2 has been altered')
+
+    def test_removed_entry(self):
+        BallotLogEntry.objects.filter(election=self.election, seq=2).delete()
+        self.assertFailsWith('Entries 2 to 2 are missing')
+
+    def test_vote_deleted_outside_the_log(self):
+        Vote.objects.filter(voter=self.voters[0], post=self.head).delete()
+        rebuild_tallies(self.election)
+        self.assertFailsWith('Candidate tallies differ from the log')
+
+    def test_logged_removals(self):
+        with logging_removals(votes=Vote.objects.filter(voter=self.voters[0], post=self.head)):
+            Vote.objects.filter(voter=self.voters[0], post=self.head).delete()
+        voters = Voter.objects.filter(pk=self.voters[1].pk)
+        with logging_removals(Vote.objects.filter(voter__in=voters), Ballot.objects.filter(voter__in=voters)):
+            voters.delete()
+        rebuild_tallies(self.election)
+
+        self.assertVerifies()
+        removals = BallotLogEntry.objects.filter(election=self.election, removed=True).order_by('seq')
+        self.assertEqual([entry.voter_id for entry in removals], [self.voters[0].id, self.voters[1].id])
+
+    def test_election_reset_keeps_the_log(self):
+        election_admin = ElectionAdmin(Election, admin.site)
+        with mock.patch.object(election_admin, 'message_user'):
+            election_admin.reset_election_votes(
+                RequestFactory().post('/admin/'), Election.objects.filter(pk=self.election.pk)
+            )
+
+        self.assertFalse(Vote.objects.filter(post__election=self.election).exists())
+        report = self.assertVerifies()
+        self.assertEqual(report['entries'], 8)
+        self.assertEqual(BallotLogEntry.objects.filter(election=self.election, removed=True).count(), 4)
+
+    def test_deleted_candidate(self):
+        self.candidates[1].delete()
+        rebuild_tallies(self.election)
+        self.assertVerifies()
+
+
+class VoteStorageConversionTests(TestCase):
+    """convert_vote_storage moves ballots between the two vote stores without changing them."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.election = Election.objects.create(title='Conversion election', is_active=True)
+        cls.head = Post.objects.create(election=cls.election, title='Head')
+        cls.council = Post.objects.create(election=cls.election, title='Council', required_selections=2)
+        cls.head_candidates = [Candidate.objects.create(name=f'Head {i}', post=cls.head) for i in range(2)]
+        cls.council_candidates = [Candidate.objects.create(name=f'Council {i}', post=cls.council) for i in range(3)]
+        cls.voters = [
+            Voter.objects.create(voter_no=f'CONV{i}', full_name=f'Voter {i}', house=('AFRICA', 'AGAKHAN')[i % 2])
+            for i in range(4)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        with self.settings(VOTE_STORAGE=STORAGE_ROWS):
+            for i, voter in enumerate(self.voters):
+                record_ballot(voter, self.election.id, [(self.head.id, self.head_candidates[i % 2].id)])
+                if i % 2:
+                    record_ballot(voter, self.election.id, [
+                        (self.council.id, self.council_candidates[i % 3].id),
+                        (self.council.id, self.council_candidates[(i + 1) % 3].id),
+                    ])
+
+    def convert(self, to):
+        call_command('convert_vote_storage', '--to', to, '--election', str(self.election.id), stdout=io.StringIO())
+
+    def stored(self):
+        selections = Counter(Vote.objects.values_list('voter_id', 'post_id', 'candidate_id'))
+        ballots = Ballot.objects.filter(election=self.election)
+        for ballot, candidate_id, post_id in iter_ballot_votes(ballots, candidate_posts(self.election)):
+            selections[(ballot.voter_id, post_id, candidate_id)] += 1
+        return selections
+
+    def snapshot(self):
+        return {
+            'selections': self.stored(),
+            'candidates': count_votes(self.election, from_votes=True),
+            'participation': sorted(Participation.objects.filter(election=self.election).values_list(
+                'voter_id', 'votes_cast', 'is_complete'
+            )),
+        }
+
+    def test_round_trip(self):
+        rows = sorted(Vote.objects.values_list('voter_id', 'post_id', 'candidate_id', 'seat', 'timestamp'))
+        before = self.snapshot()
+
+        self.convert(STORAGE_BALLOTS)
+        self.assertFalse(Vote.objects.exists())
+        self.assertEqual(Ballot.objects.filter(election=self.election).count(), len(self.voters))
+        with self.settings(VOTE_STORAGE=STORAGE_BALLOTS):
+            self.assertEqual(self.snapshot(), before)
+        self.assertEqual(verify_ballot_log(self.election, full=True)['errors'], [])
+
+        self.convert(STORAGE_ROWS)
+        self.assertFalse(Ballot.objects.exists())
+        self.assertEqual(self.snapshot(), before)
+        # Seats are renumbered in the same order; timestamps become the ballot's first vote
+        self.assertEqual(
+            sorted(Vote.objects.values_list('voter_id', 'post_id', 'candidate_id', 'seat')),
+            [row[:4] for row in rows],
+        )
+        self.assertEqual(verify_ballot_log(self.election, full=True)['errors'], [])
+
+
+class DeletedVoterCastTests(TransactionTestCase):
+    """A voter deleted while their token is still valid cannot cast, and does not fail other ballots."""
+
+    def setUp(self):
+        cache.clear()
+        reset_login_throttles()
+        self.election = seed_election(voters=5, posts=2, candidates=2, restricted_posts=0, multi_seat_posts=0)
+        self.voters = list(Voter.objects.order_by('id'))
+        self.tokens = login_tokens(self.voters)
+
+    def ballot(self):
+        return [(post.id, post.candidates.first().id) for post in Post.objects.filter(election=self.election)]
+
+    def test_cast_after_deletion(self):
+        client = APIClient()
+        cases = [(storage, path) for storage in STORAGES for path in ('/api/vote/cast/', '/api/async/vote/cast/')]
+        for voter, (storage, path) in zip(self.voters, cases):
+            with self.subTest(storage=storage, path=path), self.settings(VOTE_STORAGE=storage):
+                client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.tokens[voter.id]}')
+                voter.delete()
+                votes = [{'post': post_id, 'candidate': candidate_id} for post_id, candidate_id in self.ballot()]
+                response = client.post(path, {'votes': votes}, format='json')
+                self.assertEqual(response.status_code, 401, response.content)
+                self.assertEqual(response.json(), VOTER_NOT_FOUND_BODY)
+        self.assertFalse(Vote.objects.exists())
+        self.assertFalse(Ballot.objects.exists())
+
+    def test_batch_with_a_deleted_voter(self):
+        deleted, voter = Voter.objects.get(pk=self.voters[0].pk), self.voters[1]
+        Voter.objects.filter(pk=deleted.pk).delete()
+        missing, votes = record_ballots([
+            (deleted, self.election.id, self.ballot(), None, ''),
+            (voter, self.election.id, self.ballot(), None, ''),
+        ])
+        self.assertIsInstance(missing, VoterNotFound)
+        self.assertEqual(len(votes), 2)
+        self.assertEqual(Participation.objects.get(election=self.election).voter_id, voter.id)
+
+
+class GroupCommitTests(TransactionTestCase):
+    """The group-commit writer stores concurrent ballots together and rejects a re-vote on its own."""
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('needs an on-disk test database; set DJANGO_TEST_DB_NAME')
+        cache.clear()
+        self.election = seed_election(voters=8, posts=3, candidates=2, restricted_posts=0, multi_seat_posts=0)
+        self.voters = list(Voter.objects.order_by('id'))
+
+    def test_concurrent_ballots(self):
+        writer = GroupCommitWriter(max_batch=64, max_delay=0.2)
+        ballot = [(post.id, post.candidates.first().id) for post in Post.objects.filter(election=self.election)]
+        # The first voter submits twice
+        submitters = [self.voters[0]] + self.voters
+        barrier = threading.Barrier(len(submitters))
+        outcomes = [None] * len(submitters)
+
+        def submit(index, voter):
+            try:
+                barrier.wait()
+                outcomes[index] = writer.submit(voter, self.election.id, ballot, timeout=30)
+            except BallotRejected as exc:
+                outcomes[index] = exc
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=submit, args=item) for item in enumerate(submitters)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sum(isinstance(outcome, BallotRejected) for outcome in outcomes), 1)
+        self.assertEqual(sum(isinstance(outcome, list) and len(outcome) == 3 for outcome in outcomes), 8)
+        self.assertEqual(writer.stats['ballots'], 9)
+        self.assertLess(writer.stats['groups'], 9)
+        self.assertEqual(Vote.objects.count(), 24)
+        self.assertEqual(Participation.objects.filter(election=self.election, is_complete=True).count(), 8)
+        self.assertEqual(verify_ballot_log(self.election, full=True)['errors'], [])
+
+
+class DoubleSubmissionStressTests(TransactionTestCase):
+    """Concurrent submissions for one voter must store exactly the ballots that were accepted."""
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            # Threads share an in-memory database's cache and fail on its table locks instead of waiting
+            self.skipTest('needs an on-disk test database; set DJANGO_TEST_DB_NAME')
+        cache.clear()
+        reset_login_throttles()
+        get_results_cache().clear()
+        self.election = seed_election(voters=9, posts=4, candidates=3, restricted_posts=1, multi_seat_posts=1)
+        self.voters = list(Voter.objects.order_by('id'))
+        self.tokens = login_tokens(self.voters)
+
+    def test_races(self):
+        from core.asgi import application
+
+        for storage in STORAGES:
+            for ingest in INGEST_MODES:
+                for endpoint in ('sync', 'async'):
+                    with self.subTest(storage=storage, ingest=ingest, endpoint=endpoint):
+                        result = run_stress(
+                            application, self.election, self.voters, attempts=6, storage=storage,
+                            ingest=ingest, endpoint=endpoint, tokens=self.tokens,
+                        )
+                        self.assertEqual(result['violations'], [])
+                        self.assertEqual(result['races'], {'duplicate': 3, 'conflicting': 3, 'split': 3})
+                        reset_election(self.election)
+
+
+class BenchCommandTests(SimpleTestCase):
+    """`manage.py bench` runs end to end on a tiny election and writes its report."""
+
+    def test_smoke_run(self):
+        # A separate process, since the benchmark creates and destroys its own test database
+        env = {key: value for key, value in os.environ.items() if key != 'DJANGO_TEST_DB_NAME'}
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'report.json')
+            subprocess.run(
+                [sys.executable, 'manage.py', 'bench', '--voters', '12', '--posts', '3', '--candidates', '2',
+                 '--restricted-posts', '1', '--multi-seat-posts', '1', '--iterations', '3', '--warmup', '1',
+                 '--output', output],
+                cwd=settings.BASE_DIR, env=env, check=True, capture_output=True, timeout=300,
+            )
+            with open(output) as f:
+                report = json.load(f)
+
+        self.assertEqual(report['parameters']['voters'], 12)
+        self.assertEqual(report['meta']['database'], 'sqlite')
+        self.assertEqual(set(report['scenarios']), set(SCENARIOS))
+        for name, result in report['scenarios'].items():
+            with self.subTest(scenario=name):
+                self.assertEqual(result['requests'], 3)
+                self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+                self.assertTrue(all(200 <= int(code) < 300 for code in result['statuses']), result['statuses'])
+
+    def test_invalid_parameters(self):
+        with self.assertRaisesMessage(CommandError, 'cannot exceed --posts'):
+            call_command('bench', '--posts', '2', '--restricted-posts', '2', '--multi-seat-posts', '1')
@@ -1,69 +1,149 @@
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 
-from posts.models import Post, Election
-from voting.models import Voter, Vote
-from .serializers import LiveResultsSerializer, VoteSerializer, BulkVoteSerializer
+from posts.models import Election
+from posts.versioning import (
+    ELECTIONS_KEY, election_key, etag_from_fingerprint, etag_matches, make_etag, not_modified, set_etag,
+    version_fingerprint
+)
+from voting.ballot_store import voted_post_counts
+from voting.models import Participation, Voter
+from .ballot_schema import get_ballot_schema
+from .ballots import VOTER_NOT_FOUND_BODY, BallotRejected, VoterNotFound
+from .idempotency import IdempotentReplay, cast_success_body, get_idempotency_key, request_hash, stored_response
+from .ingest import INGEST_TIMEOUT_BODY, IngestTimeout
+from .results import BREAKDOWNS, election_results_payload, resolve_results_election, turnout_timeline
+from .results_cache import get_results_cache
+from .serializers import VoteSerializer, BulkVoteSerializer
+from .streams import get_broadcaster, results_event_stream
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def live_results(request):
     """
     Get live voting results grouped by position for a specific or active election.
+    Pass ?breakdown=house to also get each candidate's votes per voter house.
     """
-    election_id = request.query_params.get('election_id')
+    breakdown = request.query_params.get('breakdown') or None
+    if breakdown is not None and breakdown not in BREAKDOWNS:
+        return Response({
+            'success': False,
+            'message': f'Unsupported breakdown "{breakdown}". Supported: {", ".join(BREAKDOWNS)}.'
+        }, status=status.HTTP_400_BAD_REQUEST)
     
-    if election_id:
-        try:
-            election = Election.objects.get(pk=election_id)
-        except Election.DoesNotExist:
-            return Response({
-                'success': False,
-                'message': 'Election not found.'
-            }, status=status.HTTP_404_NOT_FOUND)
-    else:
-        election = Election.objects.filter(is_active=True).first()
-        if not election:
-            election = Election.objects.order_by('-created_at').first()
-            
-    if not election:
+    try:
+        election = resolve_results_election(request.query_params.get('election_id'))
+    except Election.DoesNotExist:
         return Response({
+            'success': False,
+            'message': 'Election not found.'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    # Photo URLs are absolute, so the representation also depends on the host
+    versions, digest = version_fingerprint(
+        request, [election_key(election.id) if election else ELECTIONS_KEY], variant=request.build_absolute_uri('/')
+    )
+    etag = etag_from_fingerprint(versions, digest)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    
+    def build():
+        return {
             'success': True,
-            'data': {
-                'positions': [],
-                'statistics': {
-                    'total_voters': 0,
-                    'voted_count': 0,
-                    'voter_turnout_percentage': 0
-                }
-            }
-        }, status=status.HTTP_200_OK)
+            'data': election_results_payload(election, request=request, breakdown=breakdown)
+        }
+    
+    if isinstance(request.accepted_renderer, JSONRenderer):
+        # Serve the rendered JSON shared by every viewer of this data version
+        body = get_results_cache().get_or_build(digest, versions, lambda: JSONRenderer().render(build()))
+        return set_etag(HttpResponse(body, content_type='application/json'), etag)
+    
+    return set_etag(Response(build(), status=status.HTTP_200_OK), etag)
+
 
-    posts = Post.objects.filter(election=election).prefetch_related('candidates')
-    serializer = LiveResultsSerializer(posts, many=True, context={'request': request})
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def results_timeline(request):
+    """
+    Votes accepted and voters casting their first ballot, per minute and house, for a specific or active election.
+    Pass ?since= (ISO 8601) to only get the buckets from that time on.
+    """
+    try:
+        election = resolve_results_election(request.query_params.get('election_id'))
+    except Election.DoesNotExist:
+        return Response({
+            'success': False,
+            'message': 'Election not found.'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    since = request.query_params.get('since')
+    if since:
+        since = parse_datetime(since)
+        if since is None:
+            return Response({
+                'success': False,
+                'message': 'Invalid "since" timestamp. Use ISO 8601, e.g. 2026-07-01T08:00:00Z.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
     
-    total_voters = Voter.objects.count()
-    voted_count = Voter.objects.filter(vote__post__election=election).distinct().count()
+    etag = make_etag(request, [election_key(election.id) if election else ELECTIONS_KEY])
+    if etag_matches(request, etag):
+        return not_modified(etag)
     
-    return Response({
+    if not election:
+        return set_etag(Response({
+            'success': True,
+            'data': {'series': []}
+        }, status=status.HTTP_200_OK), etag)
+    
+    return set_etag(Response({
         'success': True,
         'data': {
             'election': {
                 'id': election.id,
                 'title': election.title,
-                'is_active': election.is_active,
-                'is_demo': election.is_demo,
             },
-            'positions': serializer.data,
-            'statistics': {
-                'total_voters': total_voters,
-                'voted_count': voted_count,
-                'voter_turnout_percentage': round((voted_count / total_voters * 100), 2) if total_voters > 0 else 0
-            }
+            'bucket_minutes': 1,
+            'series': turnout_timeline(election, since=since)
         }
-    }, status=status.HTTP_200_OK)
+    }, status=status.HTTP_200_OK), etag)
+
+
+async def results_stream(request):
+    """
+    Stream live results as Server-Sent Events.
+    Every connected viewer of an election shares one producer, which pushes a
+    new snapshot whenever the tallies change.
+    """
+    try:
+        election = await sync_to_async(resolve_results_election)(request.GET.get('election_id'))
+    except Election.DoesNotExist:
+        return JsonResponse({
+            'success': False,
+            'message': 'Election not found.'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    if not election:
+        return JsonResponse({
+            'success': False,
+            'message': 'There is no election to stream results for.'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    response = StreamingHttpResponse(
+        results_event_stream(get_broadcaster(election.id)),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 
 @api_view(['POST'])
@@ -78,7 +158,14 @@ def cast_vote(request):
     serializer = VoteSerializer(data=request.data, context={'request': request})
     
     if serializer.is_valid():
-        serializer.save()
+        try:
+            serializer.save()
+        except BallotRejected as exc:
+            return Response(exc.as_error_body(), status=status.HTTP_400_BAD_REQUEST)
+        except VoterNotFound:
+            return Response(VOTER_NOT_FOUND_BODY, status=status.HTTP_401_UNAUTHORIZED)
+        except IngestTimeout:
+            return Response(INGEST_TIMEOUT_BODY, status=status.HTTP_503_SERVICE_UNAVAILABLE)
         return Response({
             'success': True,
             'message': 'Vote cast successfully'
@@ -98,7 +185,7 @@ def voter_status(request):
     Get current voter's voting status for the active election
     """
     voter = request.user
-    active_election = Election.objects.filter(is_active=True).first()
+    active_election = Election.objects.get_active()
     
     if not active_election:
         return Response({
@@ -113,19 +200,24 @@ def voter_status(request):
                 'active_election': None,
                 'eligible_positions': [],
                 'voted_positions': [],
-                'votes_cast': 0
+                'votes_cast': 0,
+                'ballot_complete': False
             }
         }, status=status.HTTP_200_OK)
         
-    voted_positions = Vote.objects.filter(voter=voter, post__election=active_election).values_list('post__title', flat=True).distinct()
-    
-    # Get positions this voter is eligible to vote for in the active election
-    all_posts = Post.objects.filter(election=active_election).prefetch_related('eligible_houses')
-    eligible_positions = [
-        {'id': post.id, 'title': post.title}
-        for post in all_posts
-        if post.is_voter_eligible(voter)
-    ]
+    participation = Participation.objects.filter(
+        voter=voter, election=active_election
+    ).only('votes_cast', 'is_complete').first()
+    schema = get_ballot_schema(active_election.id)
+    eligible_positions = schema.eligible_positions(voter.house)
+    if participation is None:
+        voted_post_ids = set()
+    elif participation.is_complete:
+        # A complete ballot covers every eligible position, nothing left to count
+        voted_post_ids = {position['id'] for position in eligible_positions}
+    else:
+        voted_post_ids = set(voted_post_counts(voter, active_election.id))
+    voted_positions = [title for post_id, (title, _) in schema.posts.items() if post_id in voted_post_ids]
     
     return Response({
         'success': True,
@@ -142,8 +234,9 @@ def voter_status(request):
                 'is_demo': active_election.is_demo
             },
             'eligible_positions': eligible_positions,
-            'voted_positions': list(voted_positions),
-            'votes_cast': Vote.objects.filter(voter=voter, post__election=active_election).count()
+            'voted_positions': voted_positions,
+            'votes_cast': participation.votes_cast if participation else 0,
+            'ballot_complete': bool(participation and participation.is_complete)
         }
     }, status=status.HTTP_200_OK)
 
@@ -163,18 +256,37 @@ def cast_bulk_votes(request):
             {"post": 3, "candidate": 7}
         ]
     }
+
+    An optional Idempotency-Key header makes retries safe: a repeated key
+    returns the stored response of the ballot it cast, and 422 if the body differs.
     """
     voter = request.user
-    
+
+    idempotency_key, error_body = get_idempotency_key(request)
+    if error_body is not None:
+        return Response(error_body, status=status.HTTP_400_BAD_REQUEST)
+    body_hash = ''
+    if idempotency_key:
+        body_hash = request_hash(request.data)
+        stored = stored_response(voter, idempotency_key, body_hash)
+        if stored is not None:
+            status_code, body, headers = stored
+            return Response(body, status=status_code, headers=headers)
+
     serializer = BulkVoteSerializer(data=request.data, context={'request': request})
     
     if serializer.is_valid():
-        created_votes = serializer.save()
-        return Response({
-            'success': True,
-            'message': f'{len(created_votes)} votes cast successfully',
-            'votes_count': len(created_votes)
-        }, status=status.HTTP_201_CREATED)
+        try:
+            created_votes = serializer.save(idempotency_key=idempotency_key, request_hash=body_hash)
+        except IdempotentReplay as replay:
+            return Response(replay.body, status=replay.status_code, headers=replay.headers)
+        except BallotRejected as exc:
+            return Response(exc.as_error_body(), status=status.HTTP_400_BAD_REQUEST)
+        except VoterNotFound:
+            return Response(VOTER_NOT_FOUND_BODY, status=status.HTTP_401_UNAUTHORIZED)
+        except IngestTimeout:
+            return Response(INGEST_TIMEOUT_BODY, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        return Response(cast_success_body(len(created_votes)), status=status.HTTP_201_CREATED)
     
     return Response({
         'success': False,